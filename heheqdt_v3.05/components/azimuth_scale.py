@@ -7,12 +7,17 @@ from PyQt5.QtWidgets import QWidget
 # Thêm Qt và QRectF để quản lý thuộc tính và hình chữ nhật
 from PyQt5.QtCore import Qt, QRectF
 # Thêm các lớp đồ họa từ PyQt5 để vẽ giao diện
-from PyQt5.QtGui import QPainter, QPen, QBrush, QColor, QFont, QPolygon
+from PyQt5.QtGui import QPainter, QPen, QBrush, QColor, QFont, QPolygon, QPixmap
 
 
 # Lớp AzimuthScale hiển thị thước đo góc hướng (-120 đến 120 độ)
 class AzimuthScale(QWidget):
-    """Widget hiển thị thước đo góc hướng (-120 đến 120 độ)."""
+    """Widget hiển thị thước đo góc hướng (-120 đến 120 độ).
+
+    Vạch chia và nhãn được vẽ một lần vào pixmap nền (vẽ lại khi đổi kích thước
+    hoặc chế độ ngày/đêm); mỗi lần cập nhật góc chỉ vẽ lại tam giác chỉ thị, và chỉ khi
+    tam giác dịch chuyển ít nhất một pixel (UiUpdateScheduler đã gộp set_angle theo tần số màn hình).
+    """
     def __init__(self, parent=None, day_mode=True):
         # Gọi hàm khởi tạo của lớp cha QWidget
         super().__init__(parent)
@@ -22,40 +27,66 @@ class AzimuthScale(QWidget):
         self.azimuth_angle = 0
         # Lưu chế độ ngày/đêm
         self.day_mode = day_mode
+        # Pixmap nền (vạch + nhãn) đã vẽ sẵn, None khi cần vẽ lại
+        self._background = None
+        # Bút tô và bút viền tam giác dựng sẵn (viền theo màu ngày/đêm, dày 2)
+        self._triangle_brush = QBrush(Qt.blue)
+        self._triangle_pen = QPen(Qt.white if day_mode else Qt.black, 2)
+        # Tọa độ x tam giác đã vẽ lần cuối, để bỏ qua lần vẽ không đổi pixel nào
+        self._painted_x = None
 
     def set_day_mode(self, day_mode):
         """Cập nhật chế độ ngày/đêm."""
+        if day_mode == self.day_mode:
+            return
         # Lưu chế độ ngày/đêm
         self.day_mode = day_mode
+        # Nền và viền tam giác phải vẽ lại theo màu mới
+        self._background = None
+        self._triangle_pen = QPen(Qt.white if day_mode else Qt.black, 2)
         # Yêu cầu vẽ lại widget
         self.update()
 
+    def resizeEvent(self, event):
+        """Đổi kích thước thì vẽ lại nền."""
+        self._background = None
+        super().resizeEvent(event)
+
+    def _triangle_x(self):
+        """Tọa độ x của tam giác chỉ thị theo góc hiện tại."""
+        # Cùng công thức với vạch chia trong _render_background
+        padding = 3
+        pixel_per_degree = (self.width() - 2 * padding) / 240
+        return int(self.width() / 2 + self.azimuth_angle * pixel_per_degree)
+
     def set_angle(self, angle):
         """Thiết lập góc hướng (-120 đến 120 độ)."""
         try:
             # Giới hạn góc trong khoảng -120 đến 120 độ
             self.azimuth_angle = max(-120, min(120, float(angle)))
-            # Yêu cầu vẽ lại widget
-            self.update()
+            # Chỉ vẽ lại khi tam giác thực sự dịch chuyển
+            if self._triangle_x() != self._painted_x:
+                self.update()
         except (ValueError, TypeError):
             # In thông báo lỗi nếu góc không hợp lệ
             print(f"Góc không hợp lệ cho AzimuthScale: {angle}")
 
-    def paintEvent(self, event):
-        """Vẽ thước đo góc hướng."""
-        # Tạo đối tượng vẽ
-        painter = QPainter(self)
+    def _render_background(self):
+        """Vẽ vạch chia và nhãn vào pixmap nền (chỉ khi đổi kích thước hoặc chế độ ngày/đêm)."""
+        # Lấy chiều rộng và cao của widget
+        width, height = self.width(), self.height()
+        # Tạo pixmap trong suốt cùng kích thước widget
+        background = QPixmap(width, height)
+        background.fill(Qt.transparent)
+        # Tạo đối tượng vẽ lên pixmap
+        painter = QPainter(background)
         # Bật chế độ chống răng cưa để vẽ mượt hơn
         painter.setRenderHint(QPainter.Antialiasing)
 
-        # Lấy chiều rộng và cao của widget
-        width, height = self.width(), self.height()
         # Chọn màu viền dựa trên chế độ ngày/đêm
         border_color = Qt.white if self.day_mode else Qt.black
         # Đặt màu văn bản là đỏ
         text_color = Qt.red
-        # Đặt khoảng cách từ viền để căn chỉnh
-        border_offset = 3
         # Giảm padding để hiển thị đầy đủ -120 đến 120 độ
         padding = 3  # 1.5 pixel mỗi bên, đủ cho viền 3 pixel
 
@@ -67,9 +98,15 @@ class AzimuthScale(QWidget):
         # Tính tọa độ x cho mốc 0 độ (giữa widget)
         zero_offset = width / 2
 
+        # Dựng sẵn bút và phông chữ, dùng lại cho mọi vạch
+        # (vạch trước nhãn đầu tiên dày 3, các vạch sau đó dày 2)
+        tick_pen = QPen(border_color, 3)
+        thin_tick_pen = QPen(border_color, 2)
+        label_pen = QPen(text_color, 2)
+        label_font = QFont("Arial", 14, QFont.Bold)
+
         # Vẽ thước đo
-        # Đặt bút màu viền, độ dày 3
-        painter.setPen(QPen(border_color, 3))
+        painter.setPen(tick_pen)
         # Vẽ các vạch và nhãn cho mỗi 15 độ từ -120 đến 120
         for degree in range(-120, 121, 15):
             # Tính tọa độ x của vạch
@@ -81,25 +118,42 @@ class AzimuthScale(QWidget):
             painter.drawLine(x, 0, x, 6)
             # Đặt bút màu đỏ cho văn bản
             if degree % 45 == 0:
-                painter.setPen(QPen(text_color, 2))
-                # Đặt phông chữ Arial, kích thước 14, đậm
-                painter.setFont(QFont("Arial", 14, QFont.Bold))
+                painter.setPen(label_pen)
+                painter.setFont(label_font)
                 # Vẽ số độ bên dưới vạch, dịch sang trái 15 độ
                 painter.drawText(x - 15, 30, str(degree))
                 # Đặt lại bút màu viền
-                painter.setPen(QPen(border_color, 2))
+                painter.setPen(thin_tick_pen)
+
+        # Kết thúc vẽ
+        painter.end()
+        return background
+
+    def paintEvent(self, event):
+        """Vẽ thước đo góc hướng: blit nền đã cache rồi vẽ tam giác chỉ thị."""
+        # Vẽ lại nền nếu cache không còn hợp lệ
+        if self._background is None:
+            self._background = self._render_background()
+        # Tạo đối tượng vẽ
+        painter = QPainter(self)
+        # Blit nền vạch + nhãn
+        painter.drawPixmap(0, 0, self._background)
+        # Bật chế độ chống răng cưa để vẽ mượt hơn
+        painter.setRenderHint(QPainter.Antialiasing)
 
         # Vẽ tam giác chỉ thị góc hướng, điều chỉnh để khớp với nhãn 0 độ
-        # Thêm offset 15 độ để bù đắp dịch nhãn
-        triangle_x = int(zero_offset + self.azimuth_angle * pixel_per_degree)
+        triangle_x = self._triangle_x()
         # Định nghĩa các điểm của tam giác
         points = [(triangle_x, 0), (triangle_x - 10, 20), (triangle_x + 10, 20)]
         # Tạo đa giác từ các điểm
         polygon = QPolygon([QtCore.QPoint(x, y) for x, y in points])
-        # Đặt màu tô là xanh dương
-        painter.setBrush(QBrush(Qt.blue))
+        # Đặt viền màu ngày/đêm và màu tô là xanh dương
+        painter.setPen(self._triangle_pen)
+        painter.setBrush(self._triangle_brush)
         # Vẽ đa giác với quy tắc tô lẻ-chẵn
         painter.drawPolygon(polygon, Qt.OddEvenFill)
+        # Ghi nhớ vị trí đã vẽ
+        self._painted_x = triangle_x
 
         # Kết thúc vẽ
-        painter.end()
\ No newline at end of file
+        painter.end()
@@ -0,0 +1,121 @@
+# Đo độ trễ từ lúc bấm zoom tới khi zoom ổn định, qua đúng đường code của VideoWidget.
+# Không cần camera thật: mỗi camera là một MockOnvifServer cục bộ (SOAP qua HTTP, có độ trễ
+# phản hồi và motor zoom chạy với tốc độ giới hạn). Mỗi lượt gọi VideoWidget.zoom_in()/zoom_out()
+# `burst` lần liên tiếp (như bấm dồn trên bảng CAN), rồi chờ tới khi PtzWorker báo zoom trùng
+# với đích của motor giả lập.
+#   python -m components.bench_zoom --presses 20 --burst 3 --latency 0.08 --zoom-speed 0.5
+import argparse
+import sys
+import time
+from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtWidgets import QApplication
+from .latency_stats import LatencyHistogram
+from .mock_onvif import MockOnvifClient, MockOnvifServer
+from .video_widget import CameraControl, VideoWidget
+
+
+class ZoomBench(QObject):
+    def __init__(self, widget, server, presses=20, burst=1, gap_ms=300, timeout=10.0):
+        super().__init__()
+        self.widget = widget
+        self.server = server
+        self.presses = presses
+        self.burst = burst
+        self.gap_ms = gap_ms
+        self.timeout = timeout
+        self.direction = 1
+        self.done = 0
+        self.timeouts = 0
+        self.t_press = None
+        self.settled = LatencyHistogram()      # Bấm → PtzWorker báo zoom đã tới đích
+        self.press_call = LatencyHistogram()   # Thời gian GUI thread bị chiếm trong zoom_in/zoom_out
+        self._deadline = QTimer(self)
+        self._deadline.setSingleShot(True)
+        self._deadline.timeout.connect(self._on_timeout)
+        widget.day_ptz.status_updated.connect(self._on_status)
+
+    def start(self):
+        QTimer.singleShot(self.gap_ms, self._press)
+
+    def _press(self):
+        if self.done >= self.presses:
+            QApplication.instance().quit()
+            return
+        step = self.widget.zoom_step * self.burst
+        if not 0.0 <= self.widget.local_zoom + self.direction * step <= 1.0:
+            self.direction = -self.direction
+        self.t_press = time.monotonic()
+        for _ in range(self.burst):
+            t0 = time.monotonic()
+            if self.direction > 0:
+                self.widget.zoom_in()
+            else:
+                self.widget.zoom_out()
+            self.press_call.add((time.monotonic() - t0) * 1000.0)
+        self._deadline.start(int(self.timeout * 1000))
+
+    def _on_status(self, name, status):
+        if self.t_press is None or self.widget.day_ptz.pending():
+            return
+        if abs(status["zoom"] - self.server.camera.zoom.target) > 1e-3:
+            return   # Motor còn đang chạy
+        self.settled.add((time.monotonic() - self.t_press) * 1000.0)
+        self._next()
+
+    def _on_timeout(self):
+        self.timeouts += 1
+        print(f"[BENCH] Lượt {self.done + 1}: quá {self.timeout}s chưa ổn định")
+        self._next()
+
+    def _next(self):
+        self._deadline.stop()
+        self.t_press = None
+        self.done += 1
+        QTimer.singleShot(self.gap_ms, self._press)
+
+    def report(self):
+        return {
+            "presses": self.done,
+            "burst": self.burst,
+            "timeouts": self.timeouts,
+            "press_to_settled_ms": self.settled.snapshot(),
+            "press_call_ms": self.press_call.snapshot(),
+            "soap_requests": dict(self.server.requests),
+            "ptz": self.widget.day_ptz.stats(),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark zoom qua MockOnvifServer")
+    parser.add_argument("--presses", type=int, default=20)
+    parser.add_argument("--burst", type=int, default=1, help="Số lần bấm liên tiếp mỗi lượt")
+    parser.add_argument("--gap-ms", type=int, default=300, help="Nghỉ giữa các lượt")
+    parser.add_argument("--latency", type=float, default=0.08, help="Độ trễ phản hồi SOAP (giây)")
+    parser.add_argument("--zoom-speed", type=float, default=0.5, help="Tốc độ motor zoom (đơn vị/giây)")
+    parser.add_argument("--source", default="bench_no_video", help="Nguồn video (mặc định: không có)")
+    args = parser.parse_args(argv)
+
+    app = QApplication(sys.argv[:1])
+    servers = [MockOnvifServer(latency=args.latency, zoom_speed=args.zoom_speed).start() for _ in range(2)]
+    CameraControl.client_factory = MockOnvifClient
+    onvif = {"ip": "127.0.0.1", "username": "admin", "password": "admin"}
+    widget = VideoWidget(day_source=args.source, night_source=args.source, day_mode=True,
+                         day_onvif=onvif, night_onvif=onvif,
+                         day_port=servers[0].port, night_port=servers[1].port)
+    widget.on_onvif_connected("day", widget.connect_onvif("day"))
+    widget.on_onvif_connected("night", widget.connect_onvif("night"))
+
+    bench = ZoomBench(widget, servers[0], presses=args.presses, burst=args.burst, gap_ms=args.gap_ms)
+    bench.start()
+    app.exec_()
+    report = bench.report()
+    widget.close()
+    for server in servers:
+        server.stop()
+    for key, value in report.items():
+        print(f"[BENCH] {key}: {value}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
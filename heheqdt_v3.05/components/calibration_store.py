@@ -0,0 +1,190 @@
+import json
+import os
+import threading
+import time
+
+
+def _zoom_key(key):
+    """Chuẩn hóa key zoom về dạng "0.35" (offset.json cũ ghi str(float) như "0.1")."""
+    return f"{float(key):.2f}"
+
+
+class CalibrationStore:
+    """Nơi lưu duy nhất của hiệu chỉnh dấu cộng {"day": {"0.35": [x, y]}, "night": {...}}.
+
+    - Đọc: chỉ từ bộ nhớ (`data`), file chỉ được đọc một lần lúc load().
+    - Ghi: set() sửa bộ nhớ rồi trả về ngay; thread nền gộp các lần sửa và ghi file khi đã
+      rảnh `idle` giây (hoặc muộn nhất `max_delay` giây sau lần sửa đầu chưa ghi), hoặc khi flush()/close().
+    - File được ghi nguyên tử: ghi file tạm cùng thư mục, fsync, os.replace, rồi fsync thư mục,
+      nên mất điện giữa chừng vẫn còn nguyên bản cũ hoặc bản mới.
+    - offset.json cũ (MainWindow) được gộp vào lúc load; key đã có trong file chính được giữ.
+    """
+
+    def __init__(self, path="crosshair.json", legacy_path=None, idle=1.0, max_delay=5.0):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.idle = idle
+        self.max_delay = max_delay
+        self.data = {}
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()   # flush() trên GUI và thread nền không ghi cùng lúc
+        self._dirty_since = None   # Lần sửa đầu tiên chưa được ghi
+        self._last_edit = 0.0
+        self._running = True
+        self._thread = None
+
+        # Bộ đếm
+        self.edits = 0
+        self.writes = 0
+        self.write_errors = 0
+        self.write_ms_max = 0.0
+
+    # ----- Đọc -----
+    def load(self):
+        """Đọc file hiệu chỉnh (và gộp file cũ nếu có) vào bộ nhớ, khởi động thread ghi nền."""
+        data = self._read(self.path) or {}
+        migrated = 0
+        if self.legacy_path:
+            for camera, entries in (self._read(self.legacy_path) or {}).items():
+                target = data.setdefault(camera, {})
+                for key, offset in (entries or {}).items():
+                    try:
+                        key = _zoom_key(key)
+                    except (TypeError, ValueError):
+                        continue
+                    if key not in target:
+                        target[key] = list(offset)
+                        migrated += 1
+        with self._cond:
+            self.data = data
+        if migrated:
+            print(f"[CALIBRATION] Gộp {migrated} điểm từ {self.legacy_path} vào {self.path}")
+            self._mark_dirty()
+        self._start()
+        return self.data
+
+    def _read(self, path):
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            # Giữ lại file lỗi để kiểm tra, không ghi đè lên nó
+            print(f"[CALIBRATION] Lỗi đọc {path}: {e}")
+            try:
+                os.replace(path, path + ".corrupt")
+            except OSError:
+                pass
+            return None
+
+    def get(self, camera, zoom_key, default=None):
+        with self._cond:
+            offset = self.data.get(camera, {}).get(zoom_key)
+        return list(offset) if offset is not None else default
+
+    # ----- Ghi -----
+    def set(self, camera, zoom_key, offset):
+        """Sửa một điểm hiệu chỉnh trong bộ nhớ; file được ghi sau (write-behind)."""
+        with self._cond:
+            self.data.setdefault(camera, {})[zoom_key] = list(offset)
+            self.edits += 1
+        self._mark_dirty()
+
+    def _mark_dirty(self):
+        with self._cond:
+            now = time.monotonic()
+            self._last_edit = now
+            if self._dirty_since is None:
+                self._dirty_since = now
+            self._cond.notify_all()
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="calibration-store", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    if self._dirty_since is None:
+                        self._cond.wait()
+                        continue
+                    now = time.monotonic()
+                    due = min(self._last_edit + self.idle, self._dirty_since + self.max_delay)
+                    if now >= due:
+                        break
+                    self._cond.wait(due - now)
+                if not self._running:
+                    return
+            self._write()
+
+    def flush(self):
+        """Ghi ngay nếu còn thay đổi chưa lưu (gọi từ GUI khi bấm lưu hoặc khi đóng)."""
+        with self._cond:
+            dirty = self._dirty_since is not None
+        if dirty:
+            self._write()
+        return dirty
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(2.0)
+            self._thread = None
+        self.flush()
+
+    def _write(self):
+        with self._write_lock:
+            self._write_locked()
+
+    def _write_locked(self):
+        with self._cond:
+            if self._dirty_since is None:
+                return
+            payload = json.dumps(self.data, indent=2, sort_keys=True)
+            self._dirty_since = None
+        t0 = time.monotonic()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._fsync_dir()
+        except OSError as e:
+            self.write_errors += 1
+            print(f"[CALIBRATION] Lỗi ghi {self.path}: {e}")
+            self._mark_dirty()   # Thử lại ở lần ghi sau
+            return
+        self.writes += 1
+        self.write_ms_max = max(self.write_ms_max, (time.monotonic() - t0) * 1000.0)
+
+    def _fsync_dir(self):
+        # Đảm bảo thao tác đổi tên cũng đã xuống đĩa (không hỗ trợ trên Windows)
+        try:
+            fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def stats(self):
+        with self._cond:
+            pending = self._dirty_since is not None
+        return {
+            "edits": self.edits,
+            "writes": self.writes,
+            "coalesced": max(0, self.edits - self.writes),
+            "pending": pending,
+            "errors": self.write_errors,
+            "write_ms_max": round(self.write_ms_max, 1),
+        }
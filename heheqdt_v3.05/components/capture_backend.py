@@ -0,0 +1,195 @@
+import time
+import numpy as np
+
+# cv2 được import trong các hàm mở capture (chạy trên VideoThread), không import lúc mở cửa sổ
+CAP_PROP_POS_MSEC = 0   # Giá trị của cv2.CAP_PROP_POS_MSEC
+
+# Pipeline mặc định: RTSP → giải mã phần mềm → BGR đúng kích thước hiển thị → appsink.
+# Trên Jetson đổi decoder thành "nvv4l2decoder ! nvvidconv" để giải mã bằng phần cứng.
+DEFAULT_PIPELINE = (
+    "rtspsrc location={uri} latency={latency} protocols=tcp ! rtph264depay ! h264parse ! {decoder} ! "
+    "videoconvert ! videoscale ! video/x-raw,format=BGR,width={width},height={height} ! "
+    "appsink name=sink max-buffers=1 drop=true sync=false"
+)
+
+
+class FramePool:
+    """Vòng các buffer numpy cấp phát sẵn, tránh cấp phát bộ nhớ cho mỗi frame.
+
+    Một buffer chỉ được dùng lại sau `size` frame, nên size phải lớn hơn độ sâu
+    ring của FrameBus (mặc định 8) để subscriber chậm không đọc phải frame bị ghi đè.
+    """
+
+    def __init__(self, size=12):
+        self.size = size
+        self._buffers = []
+        self._shape = None
+        self._index = 0
+
+    def acquire(self, shape):
+        if shape != self._shape:
+            self._buffers = [np.empty(shape, dtype=np.uint8) for _ in range(self.size)]
+            self._shape = shape
+            self._index = 0
+        buf = self._buffers[self._index]
+        self._index = (self._index + 1) % self.size
+        return buf
+
+
+class GStreamerCapture:
+    """Capture qua pipeline GStreamer (PyGObject) với appsink, cùng giao diện cv2.VideoCapture.
+
+    grab() kéo sample từ appsink, retrieve() chép dữ liệu đã map thẳng vào buffer
+    của FramePool (không cấp phát mới), get(CAP_PROP_POS_MSEC) trả về PTS của buffer.
+    """
+
+    def __init__(self, pipeline, pull_timeout=1.0, pool_size=12):
+        import gi
+        gi.require_version("Gst", "1.0")
+        from gi.repository import Gst
+        Gst.init(None)
+        self._gst = Gst
+        self.pull_timeout = pull_timeout
+        self.pool = FramePool(pool_size)
+        self._sample = None
+        self._pts_ms = 0.0
+        self.pipeline = Gst.parse_launch(pipeline)
+        self.sink = self.pipeline.get_by_name("sink")
+        if self.sink is None:
+            raise ValueError("Pipeline phải kết thúc bằng 'appsink name=sink'")
+        ret = self.pipeline.set_state(Gst.State.PLAYING)
+        self._opened = ret != Gst.StateChangeReturn.FAILURE
+
+    def isOpened(self):
+        return self._opened
+
+    def grab(self):
+        Gst = self._gst
+        sample = self.sink.emit("try-pull-sample", int(self.pull_timeout * Gst.SECOND))
+        if sample is None:
+            self._sample = None
+            return False
+        self._sample = sample
+        pts = sample.get_buffer().pts
+        if pts != Gst.CLOCK_TIME_NONE:
+            self._pts_ms = pts / Gst.MSECOND
+        return True
+
+    def retrieve(self):
+        sample = self._sample
+        if sample is None:
+            return False, None
+        structure = sample.get_caps().get_structure(0)
+        width = structure.get_value("width")
+        height = structure.get_value("height")
+        buffer = sample.get_buffer()
+        ok, info = buffer.map(self._gst.MapFlags.READ)
+        if not ok:
+            return False, None
+        try:
+            # Dòng BGR có thể được đệm cho thẳng hàng 4 byte → dùng stride thực tế
+            stride = info.size // height
+            src = np.ndarray((height, width, 3), dtype=np.uint8, buffer=info.data, strides=(stride, 3, 1))
+            frame = self.pool.acquire((height, width, 3))
+            np.copyto(frame, src)
+        finally:
+            buffer.unmap(info)
+        return True, frame
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def get(self, prop):
+        if prop == CAP_PROP_POS_MSEC:
+            return self._pts_ms
+        return 0.0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        if self.pipeline is not None:
+            self.pipeline.set_state(self._gst.State.NULL)
+            self.pipeline = None
+        self._opened = False
+
+
+def open_opencv(source, open_timeout=5.0, read_timeout=3.0):
+    """cv2.VideoCapture mặc định (FFmpeg) với timeout mở/đọc nếu bản OpenCV hỗ trợ."""
+    import cv2
+    params = []
+    open_prop = getattr(cv2, "CAP_PROP_OPEN_TIMEOUT_MSEC", None)
+    read_prop = getattr(cv2, "CAP_PROP_READ_TIMEOUT_MSEC", None)
+    if open_prop is not None:
+        params += [open_prop, int(open_timeout * 1000)]
+    if read_prop is not None:
+        params += [read_prop, int(read_timeout * 1000)]
+    cap = cv2.VideoCapture(source, cv2.CAP_ANY, params) if params else cv2.VideoCapture(source)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # giảm độ trễ
+    return cap
+
+
+def open_gstreamer(pipeline, read_timeout=3.0):
+    """Mở pipeline GStreamer qua PyGObject; nếu không có gi thì dùng backend GStreamer của OpenCV."""
+    try:
+        return GStreamerCapture(pipeline, pull_timeout=read_timeout)
+    except ImportError:
+        print("[CAPTURE] Không có PyGObject, dùng cv2.CAP_GSTREAMER")
+        import cv2
+        return cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
+
+
+def build_pipeline(options, source):
+    """Điền các tham số (uri, latency, decoder, width, height) vào pipeline trong config."""
+    template = options.get("pipeline", DEFAULT_PIPELINE)
+    return template.format(
+        uri=source,
+        latency=options.get("latency", 100),
+        decoder=options.get("decoder", "avdec_h264"),
+        width=options.get("width", 1280),
+        height=options.get("height", 720),
+    )
+
+
+def make_opener(options=None, open_timeout=5.0, read_timeout=3.0):
+    """Tạo hàm open_capture(source) cho StreamSupervisor theo backend trong config.
+
+    options: None / {"backend": "opencv"} hoặc
+             {"backend": "gstreamer", "pipeline": ..., "latency": ..., "decoder": ..., "width": ..., "height": ...}
+    """
+    options = options or {}
+    backend = options.get("backend", "opencv")
+    if backend == "gstreamer":
+        return lambda source: open_gstreamer(build_pipeline(options, source), read_timeout)
+    if backend != "opencv":
+        print(f"[CAPTURE] Backend không hợp lệ '{backend}', dùng opencv")
+    return lambda source: open_opencv(source, open_timeout, read_timeout)
+
+
+if __name__ == "__main__":
+    # Kiểm tra nhanh trên máy Linux thường, không cần camera:
+    #   python -m components.capture_backend
+    #   python -m components.capture_backend "filesrc location=test.mp4 ! decodebin ! videoconvert ! video/x-raw,format=BGR ! appsink name=sink sync=false"
+    import sys
+    pipeline = sys.argv[1] if len(sys.argv) > 1 else (
+        "videotestsrc is-live=true ! video/x-raw,width=640,height=480,framerate=30/1 ! "
+        "videoconvert ! video/x-raw,format=BGR ! appsink name=sink max-buffers=1 drop=true sync=false"
+    )
+    cap = open_gstreamer(pipeline)
+    if not cap.isOpened():
+        print("[CAPTURE] Không mở được pipeline")
+        sys.exit(1)
+    start = time.monotonic()
+    frames = 0
+    while frames < 150:
+        ret, frame = cap.read()
+        if not ret:
+            print("[CAPTURE] Hết dữ liệu hoặc timeout")
+            break
+        frames += 1
+    elapsed = time.monotonic() - start
+    cap.release()
+    shape = frame.shape if frames else None
+    print(f"[CAPTURE] {frames} frame {shape} trong {elapsed:.2f}s ({frames / max(elapsed, 1e-6):.1f} fps)")
@@ -0,0 +1,149 @@
+import bisect
+
+# Cách nội suy offset giữa hai mức zoom đã hiệu chỉnh
+LINEAR = "linear"
+SPLINE = "spline"     # Hermite đơn điệu (PCHIP): mượt, không vọt lố giữa các điểm
+INTERPOLATIONS = (LINEAR, SPLINE)
+
+
+def _pchip_slopes(xs, ys):
+    """Độ dốc tại từng điểm cho Hermite bậc ba đơn điệu (Fritsch–Carlson)."""
+    n = len(xs)
+    if n < 2:
+        return [0.0] * n
+    h = [xs[i + 1] - xs[i] for i in range(n - 1)]
+    delta = [(ys[i + 1] - ys[i]) / h[i] for i in range(n - 1)]
+    if n == 2:
+        return [delta[0], delta[0]]
+    slopes = [0.0] * n
+    for i in range(1, n - 1):
+        if delta[i - 1] * delta[i] <= 0:
+            slopes[i] = 0.0   # Cực trị cục bộ: giữ phẳng để không vọt lố
+        else:
+            w1 = 2 * h[i] + h[i - 1]
+            w2 = h[i] + 2 * h[i - 1]
+            slopes[i] = (w1 + w2) / (w1 / delta[i - 1] + w2 / delta[i])
+    # Hai đầu: công thức ba điểm, kẹp để giữ đơn điệu
+    for end, (d0, d1, h0, h1) in ((0, (delta[0], delta[1], h[0], h[1])),
+                                  (n - 1, (delta[-1], delta[-2], h[-1], h[-2]))):
+        slope = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+        if slope * d0 <= 0:
+            slope = 0.0
+        elif d0 * d1 <= 0 and abs(slope) > abs(3 * d0):
+            slope = 3 * d0
+        slopes[end] = slope
+    return slopes
+
+
+class _Curve:
+    """Các điểm hiệu chỉnh của một camera: zoom tăng dần cùng offset x, y."""
+
+    def __init__(self, points, interpolation):
+        points = sorted(points)
+        self.zooms = [p[0] for p in points]
+        self.xs = [float(p[1]) for p in points]
+        self.ys = [float(p[2]) for p in points]
+        self.interpolation = interpolation
+        if interpolation == SPLINE:
+            self.dx = _pchip_slopes(self.zooms, self.xs)
+            self.dy = _pchip_slopes(self.zooms, self.ys)
+
+    def __len__(self):
+        return len(self.zooms)
+
+    def at(self, zoom):
+        zooms = self.zooms
+        if not zooms:
+            return 0.0, 0.0
+        # Ngoài khoảng đã hiệu chỉnh: giữ giá trị của điểm gần nhất
+        if zoom <= zooms[0]:
+            return self.xs[0], self.ys[0]
+        if zoom >= zooms[-1]:
+            return self.xs[-1], self.ys[-1]
+        i = bisect.bisect_right(zooms, zoom) - 1
+        h = zooms[i + 1] - zooms[i]
+        t = (zoom - zooms[i]) / h
+        if self.interpolation == SPLINE:
+            h00 = (1 + 2 * t) * (1 - t) ** 2
+            h10 = t * (1 - t) ** 2
+            h01 = t * t * (3 - 2 * t)
+            h11 = t * t * (t - 1)
+            x = h00 * self.xs[i] + h10 * h * self.dx[i] + h01 * self.xs[i + 1] + h11 * h * self.dx[i + 1]
+            y = h00 * self.ys[i] + h10 * h * self.dy[i] + h01 * self.ys[i + 1] + h11 * h * self.dy[i + 1]
+            return x, y
+        return (self.xs[i] + (self.xs[i + 1] - self.xs[i]) * t,
+                self.ys[i] + (self.ys[i + 1] - self.ys[i]) * t)
+
+
+class CrosshairTable:
+    """Bảng offset dấu cộng theo zoom, biên dịch từ dữ liệu crosshair.json.
+
+    Dữ liệu gốc {"day": {"0.35": [x, y], ...}, "night": {...}} được chuyển một lần thành
+    các mảng zoom đã sắp xếp cho từng camera; lookup() tìm bằng bisect (O(log n)) rồi nội suy
+    tuyến tính hoặc spline giữa hai điểm hiệu chỉnh, nên zoom chưa hiệu chỉnh không còn về [0, 0].
+    Kết quả được cache theo lượng tử zoom (`quantum`): gọi lại với cùng mức zoom chỉ là tra dict.
+    """
+
+    def __init__(self, data=None, interpolation=LINEAR, quantum=0.005):
+        self.interpolation = interpolation if interpolation in INTERPOLATIONS else LINEAR
+        self.quantum = quantum
+        self._points = {}   # camera -> {zoom float: (x, y)}
+        self._curves = {}
+        self._cache = {}
+
+        # Bộ đếm
+        self.lookups = 0
+        self.cache_hits = 0
+        if data:
+            self.load(data)
+
+    def load(self, data):
+        """Nạp lại toàn bộ dữ liệu dạng crosshair.json; key zoom không hợp lệ bị bỏ qua."""
+        self._points = {}
+        for camera, entries in (data or {}).items():
+            points = {}
+            for key, offset in (entries or {}).items():
+                try:
+                    points[round(float(key), 6)] = (offset[0], offset[1])
+                except (TypeError, ValueError, IndexError):
+                    print(f"[CROSSHAIR] Bỏ qua điểm hiệu chỉnh lỗi {camera}/{key}: {offset}")
+            self._points[camera] = points
+        self._curves = {camera: self._compile(points) for camera, points in self._points.items()}
+        self._cache.clear()
+
+    def _compile(self, points):
+        return _Curve([(zoom, x, y) for zoom, (x, y) in points.items()], self.interpolation)
+
+    def set(self, camera, zoom, offset):
+        """Ghi (hoặc sửa) một điểm hiệu chỉnh và biên dịch lại đường cong của camera đó."""
+        points = self._points.setdefault(camera, {})
+        points[round(float(zoom), 6)] = (offset[0], offset[1])
+        self._curves[camera] = self._compile(points)
+        self._cache = {key: value for key, value in self._cache.items() if key[0] != camera}
+
+    def lookup(self, camera, zoom):
+        """Offset (x, y) nguyên pixel của dấu cộng tại mức zoom; (0, 0) nếu camera chưa hiệu chỉnh."""
+        self.lookups += 1
+        key = (camera, int(round(zoom / self.quantum)))
+        offset = self._cache.get(key)
+        if offset is not None:
+            self.cache_hits += 1
+            return offset
+        curve = self._curves.get(camera)
+        x, y = curve.at(key[1] * self.quantum) if curve is not None else (0.0, 0.0)
+        offset = (int(round(x)), int(round(y)))
+        self._cache[key] = offset
+        return offset
+
+    def points(self, camera):
+        """Các điểm hiệu chỉnh của một camera, theo zoom tăng dần: [(zoom, x, y), ...]."""
+        return sorted((zoom, x, y) for zoom, (x, y) in self._points.get(camera, {}).items())
+
+    def stats(self):
+        return {
+            "interpolation": self.interpolation,
+            "points": {camera: len(curve) for camera, curve in self._curves.items()},
+            "lookups": self.lookups,
+            "cache_hits": self.cache_hits,
+            "cache_size": len(self._cache),
+        }
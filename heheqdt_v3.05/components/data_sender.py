@@ -1,6 +1,6 @@
-import can    # @@
 import socket
 import json
+import threading
 import queue
 import time
 import struct
@@ -10,36 +10,50 @@ class DataSender(QThread):
     """Thread để gửi dữ liệu cảm biến qua CAN và TCP mỗi 2 giây."""
     error_occurred = pyqtSignal(str)
 
-    def __init__(self, can_interface="can0", can_bitrate=500000, tcp_address="192.168.100.20", tcp_port=12345):
+    def __init__(self, can_interface="can0", can_bitrate=500000, tcp_address="192.168.100.20", tcp_port=12345,
+                 connect_timeout=3.0):
         super().__init__()
         self.can_interface = can_interface
         self.can_bitrate = can_bitrate
         self.tcp_address = tcp_address
         self.tcp_port = tcp_port
+        self.connect_timeout = connect_timeout
         self.running = True
         self.can_bus = None
+        self._can = None   # Module python-can, nạp trong _setup_connections
         self.tcp_socket = None
         self.data_queue = queue.Queue()
         self.last_send_time = 0
-        self._setup_connections()
+        # Kết nối mở trong run() (không chặn GUI); StartupOrchestrator chờ qua `opened`
+        self.opened = threading.Event()
+        self.open_error = None
 
     def _setup_connections(self):
-        """Khởi tạo kết nối CAN và TCP."""
+        """Khởi tạo kết nối CAN và TCP (chạy trên thread này)."""
+        errors = []
         # @@
         try:
+            import can   # Nạp python-can trên thread gửi, không nạp lúc khởi động giao diện
+            self._can = can
             self.can_bus = can.interface.Bus(
                 channel=self.can_interface,
                 bustype="socketcan",
                 bitrate=self.can_bitrate
             )
         except Exception as e:
-            self.error_occurred.emit(f"Lỗi khởi tạo CAN: {e}")
+            errors.append(f"Lỗi khởi tạo CAN: {e}")
 
         try:
-            self.tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.tcp_socket.connect((self.tcp_address, self.tcp_port))
+            tcp_socket = socket.create_connection((self.tcp_address, self.tcp_port), timeout=self.connect_timeout)
+            tcp_socket.settimeout(None)
+            self.tcp_socket = tcp_socket
         except Exception as e:
-            self.error_occurred.emit(f"Lỗi khởi tạo TCP: {e}")
+            errors.append(f"Lỗi khởi tạo TCP: {e}")
+
+        self.open_error = "; ".join(errors) or None
+        self.opened.set()
+        for message in errors:
+            self.error_occurred.emit(message)
 
     def send_data(self, data):
         """Lưu dữ liệu vào hàng đợi để gửi định kỳ."""
@@ -50,6 +64,7 @@ class DataSender(QThread):
 
     def run(self):
         """Chạy luồng, gửi dữ liệu mỗi 2 giây."""
+        self._setup_connections()
         while self.running:
             current_time = time.time()
             if current_time - self.last_send_time >= 2:
@@ -66,7 +81,7 @@ class DataSender(QThread):
                                 # Frame CAN cho distance (ID 0x100)
                                 can_data_distance = struct.pack("<f", distance)
                                 # @@
-                                can_msg_distance = can.Message(
+                                can_msg_distance = self._can.Message(
                                     arbitration_id=0x100,
                                     data=can_data_distance,
                                     is_extended_id=False
@@ -77,7 +92,7 @@ class DataSender(QThread):
                                 # Frame CAN cho elevation_angle (ID 0x101)
                                 can_data_elevation = struct.pack("<f", elevation_angle)
                                 # @@
-                                can_msg_elevation = can.Message(
+                                can_msg_elevation = self._can.Message(
                                     arbitration_id=0x101,
                                     data=can_data_elevation,
                                     is_extended_id=False
@@ -88,7 +103,7 @@ class DataSender(QThread):
                                 # Frame CAN cho azimuth_angle (ID 0x102)
                                 can_data_azimuth = struct.pack("<f", azimuth_angle)
                                 # @@
-                                can_msg_azimuth = can.Message(
+                                can_msg_azimuth = self._can.Message(
                                     arbitration_id=0x102,
                                     data=can_data_azimuth,
                                     is_extended_id=False
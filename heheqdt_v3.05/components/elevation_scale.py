@@ -1,12 +1,16 @@
 from PyQt5 import QtCore
 from PyQt5.QtWidgets import QWidget
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QPainter, QPen, QBrush, QColor, QFont, QPolygon
+from PyQt5.QtGui import QPainter, QPen, QBrush, QColor, QFont, QPolygon, QPixmap
 
 
 # Lớp ElevationScale hiển thị thước đo góc tầm (0-60 độ)
 class ElevationScale(QWidget):
-    """Widget hiển thị thước đo góc tầm (0-60 độ)."""
+    """Widget hiển thị thước đo góc tầm (0-60 độ).
+
+    Giống AzimuthScale: nền vạch + nhãn được cache thành pixmap, chỉ tam giác
+    được vẽ lại, và chỉ khi tam giác dịch chuyển ít nhất một pixel.
+    """
     def __init__(self, parent=None, day_mode=True):
         # Gọi hàm khởi tạo của lớp cha QWidget
         super().__init__(parent)
@@ -16,41 +20,71 @@ class ElevationScale(QWidget):
         self.elevation_angle = 45
         # Lưu chế độ ngày/đêm
         self.day_mode = day_mode
+        # Pixmap nền (vạch + nhãn) đã vẽ sẵn, None khi cần vẽ lại
+        self._background = None
+        # Bút tô và bút viền tam giác dựng sẵn (viền theo màu ngày/đêm, dày 2)
+        self._triangle_brush = QBrush(Qt.blue)
+        self._triangle_pen = QPen(Qt.white if day_mode else Qt.black, 2)
+        # Tọa độ y tam giác đã vẽ lần cuối
+        self._painted_y = None
 
     def set_day_mode(self, day_mode):
         """Cập nhật chế độ ngày/đêm."""
+        if day_mode == self.day_mode:
+            return
         # Lưu chế độ ngày/đêm
         self.day_mode = day_mode
+        # Nền và viền tam giác phải vẽ lại theo màu mới
+        self._background = None
+        self._triangle_pen = QPen(Qt.white if day_mode else Qt.black, 2)
         # Yêu cầu vẽ lại widget
         self.update()
 
+    def resizeEvent(self, event):
+        """Đổi kích thước thì vẽ lại nền."""
+        self._background = None
+        super().resizeEvent(event)
+
+    def _triangle_y(self):
+        """Tọa độ y của tam giác chỉ thị theo góc hiện tại."""
+        return int(self.height() - (self.elevation_angle * self.height() / 60))
+
     def set_angle(self, angle):
         """Thiết lập góc tầm (0-60 độ)."""
         try:
             # Giới hạn góc trong khoảng 0-60 độ
             self.elevation_angle = max(0, min(60, float(angle)))
-            # Yêu cầu vẽ lại widget
-            self.update()
+            # Chỉ vẽ lại khi tam giác thực sự dịch chuyển
+            if self._triangle_y() != self._painted_y:
+                self.update()
         except (ValueError, TypeError):
             # In thông báo lỗi nếu góc không hợp lệ
             print(f"Góc không hợp lệ cho ElevationScale: {angle}")
 
-    def paintEvent(self, event):
-        """Vẽ thước đo góc tầm."""
-        # Tạo đối tượng vẽ
-        painter = QPainter(self)
+    def _render_background(self):
+        """Vẽ vạch chia và nhãn vào pixmap nền (chỉ khi đổi kích thước hoặc chế độ ngày/đêm)."""
+        # Lấy chiều rộng và cao của widget
+        width, height = self.width(), self.height()
+        # Tạo pixmap trong suốt cùng kích thước widget
+        background = QPixmap(width, height)
+        background.fill(Qt.transparent)
+        # Tạo đối tượng vẽ lên pixmap
+        painter = QPainter(background)
         # Bật chế độ chống răng cưa để vẽ mượt hơn
         painter.setRenderHint(QPainter.Antialiasing)
 
-        # Lấy chiều rộng và cao của widget
-        width, height = self.width(), self.height()
         border_color = Qt.white if self.day_mode else Qt.black
         text_color = Qt.red
         # Đặt khoảng cách từ viền để căn chỉnh (khớp với viền 3 pixel)
         border_offset = 3
 
+        # Dựng sẵn bút và phông chữ, dùng lại cho mọi vạch
+        tick_pen = QPen(border_color, 2)
+        label_pen = QPen(text_color, 1)
+        label_font = QFont("Arial", 12, QFont.Bold)
+
         # Vẽ thước đo
-        painter.setPen(QPen(border_color, 2))
+        painter.setPen(tick_pen)
         # Đặt góc tối đa là 60 độ
         max_angle = 60
         # Tính số pixel trên mỗi độ
@@ -67,20 +101,37 @@ class ElevationScale(QWidget):
                 # Vẽ từ cách mép phải 15 pixel đến cách mép 3 pixel
                 painter.drawLine(width - 15 - border_offset, y, width - border_offset, y)
                 # Đặt bút màu đỏ cho văn bản
-                painter.setPen(QPen(text_color, 1))
-                # Đặt phông chữ Arial, kích thước 12, đậm
-                painter.setFont(QFont("Arial", 12, QFont.Bold))
+                painter.setPen(label_pen)
+                painter.setFont(label_font)
                 # Vẽ số độ cách mép trái 8 pixel cho căn chỉnh đẹp
                 painter.drawText(8, y + 5, str(degree))
                 # Đặt lại bút màu viền
-                painter.setPen(QPen(border_color, 2))
+                painter.setPen(tick_pen)
             else:
                 # Vẽ vạch ngắn từ cách mép 9 pixel đến cách mép 3 pixel
                 painter.drawLine(width - 9 - border_offset, y, width - border_offset, y)
 
+        # Kết thúc vẽ
+        painter.end()
+        return background
+
+    def paintEvent(self, event):
+        """Vẽ thước đo góc tầm: blit nền đã cache rồi vẽ tam giác chỉ thị."""
+        # Vẽ lại nền nếu cache không còn hợp lệ
+        if self._background is None:
+            self._background = self._render_background()
+        # Tạo đối tượng vẽ
+        painter = QPainter(self)
+        # Blit nền vạch + nhãn
+        painter.drawPixmap(0, 0, self._background)
+        # Bật chế độ chống răng cưa để vẽ mượt hơn
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        width = self.width()
+        border_offset = 3
         # Vẽ tam giác chỉ thị góc tầm
         # Tính tọa độ y của tam giác
-        triangle_y = int(height - (self.elevation_angle * pixel_per_degree))
+        triangle_y = self._triangle_y()
         # Định nghĩa các điểm của tam giác, cách mép phải 3 pixel
         points = [
             (width - border_offset, triangle_y),
@@ -89,10 +140,13 @@ class ElevationScale(QWidget):
         ]
         # Tạo đa giác từ các điểm
         polygon = QPolygon([QtCore.QPoint(x, y) for x, y in points])
-        # Đặt màu tô là xanh dương
-        painter.setBrush(QBrush(Qt.blue))
+        # Đặt viền màu ngày/đêm và màu tô là xanh dương
+        painter.setPen(self._triangle_pen)
+        painter.setBrush(self._triangle_brush)
         # Vẽ đa giác với quy tắc tô lẻ-chẵn
         painter.drawPolygon(polygon, Qt.OddEvenFill)
+        # Ghi nhớ vị trí đã vẽ
+        self._painted_y = triangle_y
 
         # Kết thúc vẽ
-        painter.end()
\ No newline at end of file
+        painter.end()
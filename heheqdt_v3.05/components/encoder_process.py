@@ -0,0 +1,254 @@
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+# Dùng "spawn" để không fork một tiến trình đang có Qt và nhiều thread. Tiến trình con chạy lại
+# module __main__ của cha (main.py, dưới tên __mp_main__) rồi import module này: main.py chỉ import
+# thư viện chuẩn ở cấp module, nên tiến trình con chỉ nạp numpy + cv2, không nạp Qt/giao diện.
+# Frame được nhận qua shared memory.
+_CONTEXT = mp.get_context("spawn")
+
+
+def _encoder_main(shm_name, slot_count, frame_shape, commands, replies):
+    """Vòng lặp của tiến trình encoder.
+
+    Lệnh (tuple nhỏ, không chứa pixel):
+        ("open", path, fourcc, fps)   → ("opened", path, ok)
+        ("frame", path, slot)         → ("done", slot)
+        ("close", path)               → ("closed", path, frames)
+        ("stop",)
+    """
+    import cv2
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frames = np.ndarray((slot_count,) + tuple(frame_shape), dtype=np.uint8, buffer=shm.buf)
+    size = (frame_shape[1], frame_shape[0])
+    writers = {}   # path -> [VideoWriter, số frame]
+    try:
+        while True:
+            command = commands.get()
+            kind = command[0]
+            if kind == "frame":
+                _, path, slot = command
+                entry = writers.get(path)
+                if entry is not None:
+                    entry[0].write(frames[slot])
+                    entry[1] += 1
+                replies.put(("done", slot))
+            elif kind == "open":
+                _, path, fourcc, fps = command
+                writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+                ok = writer.isOpened()
+                if ok:
+                    writers[path] = [writer, 0]
+                replies.put(("opened", path, ok))
+            elif kind == "close":
+                _, path = command
+                entry = writers.pop(path, None)
+                if entry is not None:
+                    entry[0].release()
+                replies.put(("closed", path, entry[1] if entry else 0))
+            elif kind == "stop":
+                break
+    finally:
+        for writer, _ in writers.values():
+            writer.release()
+        del frames
+        shm.close()
+
+
+class EncoderProcess:
+    """Tiến trình encoder được giám sát, nhận frame qua ring shared memory.
+
+    - Ring `slot_count` slot kích thước cố định (H×W×3) trong multiprocessing.shared_memory;
+      phía GUI chỉ chép frame vào slot trống và gửi chỉ số slot (không pickle pixel).
+    - Thread `replies` nhận ("done", slot) để trả slot, ("opened"/"closed", path) để báo cho writer.
+    - Tiến trình con chết (crash codec, OOM...) thì được khởi động lại; các writer đang mở
+      trên tiến trình cũ bị đánh dấu hỏng để RecordingWorker mở đoạn mới.
+    """
+
+    def __init__(self, size=(1280, 720), slot_count=8, slot_timeout=0.05, reply_timeout=5.0):
+        width, height = size
+        self.size = size
+        self.frame_shape = (height, width, 3)
+        self.slot_count = slot_count
+        self.slot_timeout = slot_timeout
+        self.reply_timeout = reply_timeout
+        self._shm = shared_memory.SharedMemory(create=True, size=slot_count * height * width * 3)
+        self.frames = np.ndarray((slot_count,) + self.frame_shape, dtype=np.uint8, buffer=self._shm.buf)
+        self._cond = threading.Condition()
+        self._free = list(range(slot_count))
+        self._events = {}       # (kind, path) -> [Event, kết quả]
+        self.generation = 0
+        self._process = None
+        self._commands = None
+        self._replies = None
+        self._stopping = False
+        self._monitor = None
+
+        # Bộ đếm
+        self.restarts = 0
+        self.frames_sent = 0
+        self.slot_waits = 0
+        self.slot_timeouts = 0
+
+    def start(self):
+        self._spawn()
+        self._monitor = threading.Thread(target=self._monitor_loop, name="encoder-monitor", daemon=True)
+        self._monitor.start()
+
+    def _spawn(self):
+        self._commands = _CONTEXT.Queue()
+        self._replies = _CONTEXT.Queue()
+        self._process = _CONTEXT.Process(
+            target=_encoder_main, name="encoder",
+            args=(self._shm.name, self.slot_count, self.frame_shape, self._commands, self._replies),
+            daemon=True,
+        )
+        self._process.start()
+        print(f"[ENCODER] Tiến trình encoder pid={self._process.pid} (thế hệ {self.generation})")
+
+    def _monitor_loop(self):
+        """Nhận phản hồi từ tiến trình con và khởi động lại nếu nó chết."""
+        while not self._stopping:
+            try:
+                reply = self._replies.get(timeout=0.5)
+            except queue.Empty:
+                reply = None
+            except (EOFError, OSError):
+                reply = None
+            if reply is not None:
+                self._dispatch(reply)
+                continue
+            if self._process.is_alive() or self._stopping:
+                continue
+            # Tiến trình con đã chết: trả lại mọi slot, hủy các lệnh đang chờ, khởi động lại
+            print(f"[ENCODER] Tiến trình encoder thoát bất thường (mã {self._process.exitcode}), khởi động lại")
+            with self._cond:
+                self.generation += 1
+                self.restarts += 1
+                self._free = list(range(self.slot_count))
+                pending, self._events = self._events, {}
+                # Đổi queue trong lock: writer thế hệ mới không bao giờ gửi vào queue cũ
+                self._spawn()
+                self._cond.notify_all()
+            for event, _ in pending.values():
+                event.set()
+
+    def _dispatch(self, reply):
+        kind = reply[0]
+        if kind == "done":
+            with self._cond:
+                self._free.append(reply[1])
+                self._cond.notify_all()
+            return
+        key = (kind, reply[1])
+        with self._cond:
+            waiter = self._events.pop(key, None)
+        if waiter is not None:
+            waiter[1] = reply[2]
+            waiter[0].set()
+
+    def _request(self, kind, reply_kind, path, *args):
+        """Gửi lệnh và chờ phản hồi tương ứng. Trả về kết quả, None nếu quá hạn / tiến trình chết."""
+        waiter = [threading.Event(), None]
+        with self._cond:
+            self._events[(reply_kind, path)] = waiter
+            commands = self._commands
+        commands.put((kind, path) + args)
+        waiter[0].wait(self.reply_timeout)
+        return waiter[1]
+
+    def open(self, path, fourcc, fps):
+        """Mở file trong tiến trình encoder. Trả về thế hệ tiến trình nếu thành công, None nếu lỗi."""
+        generation = self.generation
+        return generation if self._request("open", "opened", path, fourcc, fps) else None
+
+    def write(self, path, frame, generation):
+        """Chép frame vào một slot trống và gửi chỉ số slot. False nếu bỏ frame hoặc tiến trình đã đổi."""
+        with self._cond:
+            if generation != self.generation:
+                return False
+            if not self._free:
+                self.slot_waits += 1
+                deadline = time.monotonic() + self.slot_timeout
+                while not self._free and generation == self.generation:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.slot_timeouts += 1
+                        return False
+                    self._cond.wait(remaining)
+                if generation != self.generation:
+                    return False
+            slot = self._free.pop()
+            commands = self._commands
+        np.copyto(self.frames[slot], frame)
+        commands.put(("frame", path, slot))
+        self.frames_sent += 1
+        return True
+
+    def close(self, path, generation):
+        """Đóng file và chờ tiến trình con release() xong. Trả về số frame đã ghi."""
+        if generation != self.generation:
+            return 0
+        return self._request("close", "closed", path) or 0
+
+    def stop(self, timeout=5.0):
+        self._stopping = True
+        if self._process is not None and self._process.is_alive():
+            self._commands.put(("stop",))
+            self._process.join(timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join(1.0)
+        if self._monitor is not None:
+            self._monitor.join(1.0)
+        del self.frames
+        self._shm.close()
+        self._shm.unlink()
+
+    def stats(self):
+        with self._cond:
+            free = len(self._free)
+        return {
+            "pid": self._process.pid if self._process is not None else None,
+            "alive": bool(self._process is not None and self._process.is_alive()),
+            "restarts": self.restarts,
+            "frames_sent": self.frames_sent,
+            "slots_free": free,
+            "slot_waits": self.slot_waits,
+            "slot_timeouts": self.slot_timeouts,
+        }
+
+
+class ProcessVideoWriter:
+    """Giao diện giống cv2.VideoWriter nhưng mã hóa trong EncoderProcess.
+
+    Dùng được ở mọi chỗ RecordingWorker/RecordingStorage đang dùng VideoWriter:
+    write() chép frame vào shared memory, release() chờ tiến trình con đóng file.
+    isOpened() trả về False khi tiến trình encoder đã được khởi động lại (file cũ có thể hỏng).
+    """
+
+    def __init__(self, encoder, path, fourcc, fps):
+        self.encoder = encoder
+        self.path = path
+        self.generation = encoder.open(path, fourcc, fps)
+        self.dropped = 0
+
+    def isOpened(self):
+        return self.generation is not None and self.generation == self.encoder.generation
+
+    def write(self, frame):
+        if not self.encoder.write(self.path, frame, self.generation):
+            self.dropped += 1
+
+    def release(self):
+        if self.generation is None:
+            return
+        generation, self.generation = self.generation, None
+        frames = self.encoder.close(self.path, generation)
+        if self.dropped:
+            print(f"[ENCODER] {os.path.basename(self.path)}: {frames} frame, bỏ {self.dropped} frame (hết slot)")
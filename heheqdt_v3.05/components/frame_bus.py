@@ -0,0 +1,173 @@
+import threading
+import time
+
+# Chính sách khi subscriber không theo kịp
+DROP_OLDEST = "drop_oldest"   # Bỏ frame cũ nhất, luôn giữ depth frame mới nhất
+BLOCK = "block"               # Publisher đợi (có timeout) cho tới khi subscriber đọc kịp
+
+
+class FramePacket:
+    """Một khung hình trên bus: frame gốc (numpy BGR) kèm số thứ tự và metadata."""
+    __slots__ = ("seq", "frame", "meta")
+
+    def __init__(self, seq, frame, meta):
+        self.seq = seq
+        self.frame = frame
+        self.meta = meta
+
+
+class FrameSubscription:
+    """Một consumer của FrameBus (hiển thị, ghi hình, chụp ảnh, phân tích...).
+
+    Mỗi subscriber có con trỏ đọc riêng trên ring chung của bus, nên việc publish
+    không phụ thuộc số subscriber. Khi bị bỏ lại quá depth frame, số frame bị
+    bỏ qua được cộng vào bộ đếm dropped của riêng subscriber đó.
+    """
+
+    def __init__(self, bus, name, policy, depth, cursor):
+        self.bus = bus
+        self.name = name
+        self.policy = policy
+        self.depth = depth
+        self.cursor = cursor      # seq của frame tiếp theo cần đọc
+        self.delivered = 0
+        self.dropped = 0
+        self.active = True
+
+    def get(self, timeout=None):
+        """Lấy frame tiếp theo. Trả về FramePacket hoặc None nếu hết timeout / đã hủy."""
+        return self.bus._read(self, timeout)
+
+    def pending(self):
+        """Số frame đang chờ đọc (đã giới hạn theo depth)."""
+        return min(self.bus.head - self.cursor, self.depth)
+
+    def close(self):
+        """Hủy đăng ký khỏi bus."""
+        self.bus.unsubscribe(self)
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "policy": self.policy,
+            "depth": self.depth,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "pending": self.pending() if self.active else 0,
+        }
+
+
+class FrameBus:
+    """Bus phân phối khung hình cho một camera.
+
+    - latest(): đọc frame mới nhất (slot latest-frame), không bao giờ chờ.
+    - subscribe(): tạo consumer với ring có giới hạn và chính sách drop_oldest / block.
+
+    Tất cả subscriber dùng chung một ring cố định kích thước `capacity`; mỗi
+    subscriber chỉ là một con trỏ đọc, nên publish() có chi phí O(1) bất kể số
+    subscriber. Frame không được copy: consumer phải coi frame là chỉ đọc.
+    """
+
+    def __init__(self, name="camera", capacity=8, block_timeout=0.05):
+        self.name = name
+        self.capacity = capacity
+        self.block_timeout = block_timeout  # Thời gian tối đa publisher chờ subscriber BLOCK
+        self._slots = [None] * capacity
+        self._cond = threading.Condition()
+        self.head = 0                 # seq của frame tiếp theo sẽ được publish
+        self._latest = None
+        self._subscribers = []
+        self._block_limit = None      # seq nhỏ nhất mà subscriber BLOCK còn chứa được
+        self.published = 0
+        self.block_waits = 0
+        self.block_timeouts = 0
+
+    def publish(self, frame, meta=None):
+        """Đưa frame lên bus. Trả về seq của frame."""
+        with self._cond:
+            # Chỉ chờ khi có subscriber BLOCK đang đầy; con số này do consumer cập nhật
+            if self._block_limit is not None and self.head >= self._block_limit:
+                self.block_waits += 1
+                deadline = time.monotonic() + self.block_timeout
+                while self._block_limit is not None and self.head >= self._block_limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        # Subscriber quá chậm: ghi đè, frame bị mất sẽ được tính khi nó đọc
+                        self.block_timeouts += 1
+                        break
+                    self._cond.wait(remaining)
+
+            packet = FramePacket(self.head, frame, meta)
+            self._slots[self.head % self.capacity] = packet
+            self._latest = packet
+            self.head += 1
+            self.published += 1
+            self._cond.notify_all()
+            return packet.seq
+
+    def latest(self):
+        """Frame mới nhất (FramePacket) hoặc None nếu chưa có frame nào."""
+        return self._latest
+
+    def subscribe(self, name, policy=DROP_OLDEST, depth=2):
+        """Đăng ký consumer mới, bắt đầu từ frame publish tiếp theo."""
+        if policy not in (DROP_OLDEST, BLOCK):
+            raise ValueError(f"Chính sách không hợp lệ: {policy}")
+        depth = max(1, min(int(depth), self.capacity))
+        with self._cond:
+            sub = FrameSubscription(self, name, policy, depth, self.head)
+            self._subscribers.append(sub)
+            self._update_block_limit()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._cond:
+            sub.active = False
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+            self._update_block_limit()
+            self._cond.notify_all()
+
+    def _read(self, sub, timeout):
+        with self._cond:
+            if timeout is None:
+                while sub.active and sub.cursor >= self.head:
+                    self._cond.wait()
+            else:
+                deadline = time.monotonic() + timeout
+                while sub.active and sub.cursor >= self.head:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
+            if not sub.active:
+                return None
+
+            lag = self.head - sub.cursor
+            if lag > sub.depth:
+                # Bị bỏ lại: nhảy tới depth frame mới nhất, đếm số frame mất
+                sub.dropped += lag - sub.depth
+                sub.cursor = self.head - sub.depth
+            packet = self._slots[sub.cursor % self.capacity]
+            sub.cursor += 1
+            sub.delivered += 1
+            if sub.policy == BLOCK:
+                self._update_block_limit()
+                self._cond.notify_all()
+            return packet
+
+    def _update_block_limit(self):
+        """Tính lại giới hạn publish do các subscriber BLOCK (gọi khi đang giữ lock)."""
+        limits = [s.cursor + s.depth for s in self._subscribers if s.policy == BLOCK]
+        self._block_limit = min(limits) if limits else None
+
+    def stats(self):
+        """Thống kê bus và từng subscriber."""
+        with self._cond:
+            return {
+                "name": self.name,
+                "published": self.published,
+                "block_waits": self.block_waits,
+                "block_timeouts": self.block_timeouts,
+                "subscribers": [s.stats() for s in self._subscribers],
+            }
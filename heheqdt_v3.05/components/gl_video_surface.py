@@ -0,0 +1,258 @@
+import ctypes
+import math
+import numpy as np
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QPainter, QPen, QColor, QFont
+from PyQt5.QtWidgets import QOpenGLWidget
+
+try:
+    from OpenGL import GL
+    GL_AVAILABLE = True
+except ImportError:
+    GL = None
+    GL_AVAILABLE = False
+
+# Quad đơn vị [0,1]²; vertex shader đặt nó vào hình chữ nhật giữ tỉ lệ (u_rect, tọa độ NDC)
+VIDEO_VS = """
+#version 120
+attribute vec2 a_pos;
+uniform vec4 u_rect;
+varying vec2 v_uv;
+void main() {
+    v_uv = vec2(a_pos.x, 1.0 - a_pos.y);
+    gl_Position = vec4(mix(u_rect.xy, u_rect.zw, a_pos), 0.0, 1.0);
+}
+"""
+
+# Frame được upload nguyên dạng BGR; đổi kênh màu ngay trong shader
+VIDEO_FS = """
+#version 120
+uniform sampler2D u_tex;
+varying vec2 v_uv;
+void main() {
+    gl_FragColor = vec4(texture2D(u_tex, v_uv).bgr, 1.0);
+}
+"""
+
+# Overlay vẽ theo tọa độ pixel của widget
+OVERLAY_VS = """
+#version 120
+attribute vec2 a_pos;
+uniform vec2 u_viewport;
+void main() {
+    gl_Position = vec4(a_pos.x / u_viewport.x * 2.0 - 1.0, 1.0 - a_pos.y / u_viewport.y * 2.0, 0.0, 1.0);
+}
+"""
+
+OVERLAY_FS = """
+#version 120
+uniform vec4 u_color;
+void main() {
+    gl_FragColor = u_color;
+}
+"""
+
+CIRCLE_SEGMENTS = 24
+_UNIT_CIRCLE = np.array(
+    [(0.0, 0.0)] + [(math.cos(2 * math.pi * i / CIRCLE_SEGMENTS), math.sin(2 * math.pi * i / CIRCLE_SEGMENTS))
+                    for i in range(CIRCLE_SEGMENTS + 1)],
+    dtype=np.float32,
+)
+
+
+def _compile_program(vs_src, fs_src):
+    program = GL.glCreateProgram()
+    for src, kind in ((vs_src, GL.GL_VERTEX_SHADER), (fs_src, GL.GL_FRAGMENT_SHADER)):
+        shader = GL.glCreateShader(kind)
+        GL.glShaderSource(shader, src)
+        GL.glCompileShader(shader)
+        if not GL.glGetShaderiv(shader, GL.GL_COMPILE_STATUS):
+            raise RuntimeError(GL.glGetShaderInfoLog(shader).decode(errors="replace"))
+        GL.glAttachShader(program, shader)
+        GL.glDeleteShader(shader)
+    GL.glBindAttribLocation(program, 0, "a_pos")
+    GL.glLinkProgram(program)
+    if not GL.glGetProgramiv(program, GL.GL_LINK_STATUS):
+        raise RuntimeError(GL.glGetProgramInfoLog(program).decode(errors="replace"))
+    return program
+
+
+class GLVideoSurface(QOpenGLWidget):
+    """Bề mặt hiển thị video bằng OpenGL cho VideoWidget.
+
+    - Frame numpy BGR được upload thành texture (qua 2 PBO luân phiên nếu có),
+      phóng to/thu nhỏ và đổi màu BGR→RGB trong shader.
+    - Dấu cộng và chấm REC vẽ bằng primitive GPU; chữ (thời gian REC, lỗi,
+      bảng độ trễ) vẽ bằng QPainter trên cùng context OpenGL.
+    Đọc trạng thái overlay (offset, cờ ghi hình...) trực tiếp từ VideoWidget cha.
+    Nếu khởi tạo OpenGL lỗi, phát init_failed để VideoWidget quay về vẽ raster.
+    """
+    init_failed = pyqtSignal(str)
+
+    def __init__(self, owner):
+        super().__init__(owner)
+        self.owner = owner
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.frame = None
+        self.meta = None
+        self._dirty = False
+        self._ready = False
+        self._tex_size = None
+        self._pbos = []
+        self._pbo_index = 0
+        self.uploads = 0
+
+    def set_frame(self, frame, meta=None):
+        """Nhận frame mới (numpy BGR) để upload ở lần vẽ tiếp theo."""
+        self.frame = frame
+        self.meta = meta
+        self._dirty = True
+        self.update()
+
+    def clear_frame(self):
+        self.frame = None
+        self.meta = None
+        self.update()
+
+    def initializeGL(self):
+        try:
+            self._video_prog = _compile_program(VIDEO_VS, VIDEO_FS)
+            self._overlay_prog = _compile_program(OVERLAY_VS, OVERLAY_FS)
+            self._u_rect = GL.glGetUniformLocation(self._video_prog, "u_rect")
+            self._u_tex = GL.glGetUniformLocation(self._video_prog, "u_tex")
+            self._u_viewport = GL.glGetUniformLocation(self._overlay_prog, "u_viewport")
+            self._u_color = GL.glGetUniformLocation(self._overlay_prog, "u_color")
+
+            quad = np.array([(0, 0), (1, 0), (0, 1), (1, 1)], dtype=np.float32)
+            self._quad_vbo = GL.glGenBuffers(1)
+            GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self._quad_vbo)
+            GL.glBufferData(GL.GL_ARRAY_BUFFER, quad.nbytes, quad, GL.GL_STATIC_DRAW)
+            self._overlay_vbo = GL.glGenBuffers(1)
+            GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+
+            self._texture = GL.glGenTextures(1)
+            GL.glBindTexture(GL.GL_TEXTURE_2D, self._texture)
+            GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_LINEAR)
+            GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR)
+            GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_S, GL.GL_CLAMP_TO_EDGE)
+            GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_T, GL.GL_CLAMP_TO_EDGE)
+            GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+
+            # PBO streaming: có từ OpenGL 2.1 hoặc qua extension
+            fmt = self.context().format()
+            if (fmt.majorVersion(), fmt.minorVersion()) >= (2, 1) or \
+                    self.context().hasExtension(b"GL_ARB_pixel_buffer_object"):
+                self._pbos = list(GL.glGenBuffers(2))
+            self._ready = True
+            print(f"[GL] Video surface OpenGL {fmt.majorVersion()}.{fmt.minorVersion()}, PBO={'có' if self._pbos else 'không'}")
+        except Exception as e:
+            print(f"[GL] Khởi tạo OpenGL lỗi, quay về raster: {e}")
+            self._ready = False
+            self.init_failed.emit(str(e))
+
+    def _upload(self, frame):
+        """Upload frame BGR vào texture (PBO orphaning để driver DMA không chặn)."""
+        h, w = frame.shape[:2]
+        frame = np.ascontiguousarray(frame)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, self._texture)
+        GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT, 1)
+        if self._tex_size != (w, h):
+            GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGB8, w, h, 0, GL.GL_RGB, GL.GL_UNSIGNED_BYTE, None)
+            self._tex_size = (w, h)
+        if self._pbos:
+            pbo = self._pbos[self._pbo_index]
+            self._pbo_index ^= 1
+            GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, pbo)
+            GL.glBufferData(GL.GL_PIXEL_UNPACK_BUFFER, frame.nbytes, None, GL.GL_STREAM_DRAW)
+            GL.glBufferSubData(GL.GL_PIXEL_UNPACK_BUFFER, 0, frame.nbytes, frame)
+            GL.glTexSubImage2D(GL.GL_TEXTURE_2D, 0, 0, 0, w, h, GL.GL_RGB, GL.GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+            GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, 0)
+        else:
+            GL.glTexSubImage2D(GL.GL_TEXTURE_2D, 0, 0, 0, w, h, GL.GL_RGB, GL.GL_UNSIGNED_BYTE, frame)
+        self.uploads += 1
+
+    def _video_rect(self, width, height):
+        """Hình chữ nhật giữ tỉ lệ (KeepAspectRatio) căn giữa widget, theo NDC."""
+        tex_w, tex_h = self._tex_size
+        scale = min(width / tex_w, height / tex_h)
+        sx = tex_w * scale / width
+        sy = tex_h * scale / height
+        return -sx, -sy, sx, sy
+
+    def _draw_overlay(self, vertices, mode, color):
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self._overlay_vbo)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL.GL_STREAM_DRAW)
+        GL.glVertexAttribPointer(0, 2, GL.GL_FLOAT, GL.GL_FALSE, 0, None)
+        GL.glUniform4f(self._u_color, *color)
+        GL.glDrawArrays(mode, 0, len(vertices))
+
+    def paintGL(self):
+        if not self._ready:
+            return
+        owner = self.owner
+        width, height = self.width(), self.height()
+        GL.glViewport(0, 0, int(width * self.devicePixelRatioF()), int(height * self.devicePixelRatioF()))
+        GL.glClearColor(0.0, 0.0, 0.0, 1.0)
+        GL.glClear(GL.GL_COLOR_BUFFER_BIT)
+        GL.glEnableVertexAttribArray(0)
+
+        error_message = owner.error_message_day if owner.day_mode else owner.error_message_night
+        if self.frame is not None and not error_message:
+            if self._dirty:
+                self._upload(self.frame)
+                self._dirty = False
+            GL.glUseProgram(self._video_prog)
+            GL.glActiveTexture(GL.GL_TEXTURE0)
+            GL.glBindTexture(GL.GL_TEXTURE_2D, self._texture)
+            GL.glUniform1i(self._u_tex, 0)
+            GL.glUniform4f(self._u_rect, *self._video_rect(width, height))
+            GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self._quad_vbo)
+            GL.glVertexAttribPointer(0, 2, GL.GL_FLOAT, GL.GL_FALSE, 0, None)
+            GL.glDrawArrays(GL.GL_TRIANGLE_STRIP, 0, 4)
+            GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+            owner._report_presented()
+
+        # ---- Overlay bằng primitive GPU ----
+        GL.glUseProgram(self._overlay_prog)
+        GL.glUniform2f(self._u_viewport, float(width), float(height))
+        GL.glEnable(GL.GL_BLEND)
+        GL.glBlendFunc(GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA)
+        cx = width // 2 + owner.current_offset_x
+        cy = height // 2 + owner.current_offset_y
+        half, thick = 15, 1.5
+        crosshair = np.array([
+            # Vạch ngang (2 tam giác)
+            (cx - half, cy - thick), (cx + half, cy - thick), (cx - half, cy + thick),
+            (cx + half, cy - thick), (cx + half, cy + thick), (cx - half, cy + thick),
+            # Vạch dọc
+            (cx - thick, cy - half), (cx + thick, cy - half), (cx - thick, cy + half),
+            (cx + thick, cy - half), (cx + thick, cy + half), (cx - thick, cy + half),
+        ], dtype=np.float32)
+        self._draw_overlay(crosshair, GL.GL_TRIANGLES, (1.0, 0.0, 0.0, 1.0))
+        if owner.recording_overlay and owner.recording_blink:
+            radius = 10
+            center = np.array((width - 165, 1 + radius), dtype=np.float32)
+            self._draw_overlay(_UNIT_CIRCLE * radius + center, GL.GL_TRIANGLE_FAN, (1.0, 0.0, 0.0, 200 / 255))
+
+        GL.glDisable(GL.GL_BLEND)
+        GL.glDisableVertexAttribArray(0)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+        GL.glUseProgram(0)
+
+        # ---- Chữ: QPainter trên paint engine OpenGL ----
+        txt = owner.recording_elapsed_text if owner.recording_overlay else ""
+        if error_message or txt or owner.debug_overlay:
+            painter = QPainter(self)
+            try:
+                if error_message:
+                    painter.setPen(QPen(Qt.red, 2))
+                    painter.setFont(QFont("Arial", 20))
+                    painter.drawText(self.rect(), Qt.AlignCenter, error_message)
+                if txt:
+                    painter.setPen(QPen(QColor(255, 255, 255), 1))
+                    painter.setFont(QFont("Arial", 16, QFont.Bold))
+                    painter.drawText(self.rect().adjusted(0, 0, -40, 0), Qt.AlignTop | Qt.AlignRight, txt)
+                if owner.debug_overlay:
+                    owner._draw_latency_overlay(painter)
+            finally:
+                painter.end()
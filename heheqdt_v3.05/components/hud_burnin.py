@@ -0,0 +1,197 @@
+import collections
+import threading
+import time
+import cv2
+import numpy as np
+from .latency_stats import LatencyHistogram
+
+# Các trường HUD có thể bật/tắt riêng trong config (hud_burnin.fields)
+HUD_FIELDS = ("crosshair", "angles", "distance", "rec_time")
+
+
+class Sprite:
+    """Bitmap overlay đã nhân sẵn alpha, blend vào frame BGR bằng phép tính số nguyên trên NumPy.
+
+    alpha được lưu ở thang 0..256 (uint16) để chia 256 bằng phép dịch bit:
+        out = (frame * (256 - alpha) + color * alpha) >> 8
+    `premult` (= color * alpha) và `inv` (= 256 - alpha) tính một lần khi tạo sprite.
+    """
+
+    def __init__(self, color, alpha):
+        alpha16 = (alpha.astype(np.uint16) * 256 + 127) // 255
+        alpha16 = alpha16[:, :, None]
+        self.height, self.width = alpha.shape
+        self.premult = color.astype(np.uint16) * alpha16
+        self.inv = np.broadcast_to(256 - alpha16, self.premult.shape).copy()
+        self._work = np.empty(self.premult.shape, dtype=np.uint16)
+
+    def blend(self, frame, x, y):
+        """Blend sprite vào frame tại góc trên trái (x, y); phần nằm ngoài frame bị cắt."""
+        fh, fw = frame.shape[:2]
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(fw, x + self.width), min(fh, y + self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        sx, sy = x0 - x, y0 - y
+        roi = frame[y0:y1, x0:x1]
+        work = self._work[sy:sy + y1 - y0, sx:sx + x1 - x0]
+        np.multiply(roi, self.inv[sy:sy + y1 - y0, sx:sx + x1 - x0], out=work)
+        work += self.premult[sy:sy + y1 - y0, sx:sx + x1 - x0]
+        work >>= 8
+        roi[...] = work
+
+
+class GlyphCache:
+    """Raster từng ký tự một lần bằng cv2.putText (mask chữ + mask viền), ghép chuỗi bằng slicing.
+
+    Chuỗi đã ghép thành Sprite được giữ trong LRU nhỏ: giá trị HUD đổi chậm hơn nhiều so
+    với tốc độ frame, nên phần lớn frame chỉ tốn phép blend.
+    """
+
+    FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+    def __init__(self, scale=0.8, thickness=2, color=(255, 255, 255), outline=(0, 0, 0), max_texts=64):
+        self.scale = scale
+        self.thickness = thickness
+        self.color = np.array(color, dtype=np.uint8)
+        self.outline = np.array(outline, dtype=np.uint8)
+        self.max_texts = max_texts
+        self.pad = thickness + 1
+        (_, text_h), baseline = cv2.getTextSize("0", self.FONT, scale, thickness)
+        self.height = text_h + baseline + 2 * self.pad
+        self._baseline = text_h + self.pad
+        self._glyphs = {}
+        self._texts = collections.OrderedDict()
+
+        # Bộ đếm
+        self.glyphs_rendered = 0
+        self.text_hits = 0
+        self.text_misses = 0
+
+    def _glyph(self, char):
+        """(mask chữ, mask viền) của một ký tự, raster lần đầu gặp."""
+        glyph = self._glyphs.get(char)
+        if glyph is None:
+            (width, _), _ = cv2.getTextSize(char, self.FONT, self.scale, self.thickness)
+            width += 2 * self.pad
+            text = np.zeros((self.height, width), dtype=np.uint8)
+            edge = np.zeros_like(text)
+            origin = (self.pad, self._baseline)
+            cv2.putText(edge, char, origin, self.FONT, self.scale, 255, self.thickness + 2, cv2.LINE_AA)
+            cv2.putText(text, char, origin, self.FONT, self.scale, 255, self.thickness, cv2.LINE_AA)
+            glyph = (text, edge)
+            self._glyphs[char] = glyph
+            self.glyphs_rendered += 1
+        return glyph
+
+    def text(self, value):
+        """Sprite của cả chuỗi (màu chữ trên viền tối để đọc được trên mọi nền)."""
+        sprite = self._texts.get(value)
+        if sprite is not None:
+            self._texts.move_to_end(value)
+            self.text_hits += 1
+            return sprite
+        self.text_misses += 1
+        glyphs = [self._glyph(char) for char in value]
+        # Ký tự liền kề chồng lên nhau phần đệm viền
+        width = sum(g[0].shape[1] - self.pad for g in glyphs) + self.pad
+        text = np.zeros((self.height, max(1, width)), dtype=np.uint8)
+        edge = np.zeros_like(text)
+        x = 0
+        for glyph_text, glyph_edge in glyphs:
+            w = glyph_text.shape[1]
+            np.maximum(text[:, x:x + w], glyph_text, out=text[:, x:x + w])
+            np.maximum(edge[:, x:x + w], glyph_edge, out=edge[:, x:x + w])
+            x += w - self.pad
+        weight = text[:, :, None].astype(np.uint16)
+        color = (self.color * weight + self.outline * (255 - weight)) // 255
+        sprite = Sprite(color.astype(np.uint8), np.maximum(text, edge))
+        self._texts[value] = sprite
+        if len(self._texts) > self.max_texts:
+            self._texts.popitem(last=False)
+        return sprite
+
+
+def crosshair_sprite(length=30, thickness=3, color=(0, 0, 255)):
+    """Dấu cộng giống dấu cộng trên VideoWidget (đỏ, dài `length`), vẽ sẵn một lần."""
+    size = length + thickness
+    alpha = np.zeros((size, size), dtype=np.uint8)
+    mid, half = size // 2, length // 2
+    cv2.line(alpha, (mid - half, mid), (mid + half, mid), 255, thickness)
+    cv2.line(alpha, (mid, mid - half), (mid, mid + half), 255, thickness)
+    colors = np.empty((size, size, 3), dtype=np.uint8)
+    colors[:] = color
+    return Sprite(colors, alpha)
+
+
+class HudRenderer:
+    """Vẽ HUD (dấu cộng, góc, khoảng cách, thời gian REC) lên frame trong worker ghi hình.
+
+    GUI thread gọi update() khi giá trị đổi (chỉ gán vào dict dưới lock); render() chạy
+    trên luồng ghi, chỉ blend các Sprite đã cache vào slot của ring. Thời gian REC tính
+    theo t_grab của frame nên khớp với video kể cả khi ring đang xả sau stop().
+    """
+
+    def __init__(self, size=(1280, 720), fields=HUD_FIELDS, scale=0.8, thickness=2, margin=12):
+        self.size = size
+        self.fields = set(fields) & set(HUD_FIELDS)
+        self.margin = margin
+        self.glyphs = GlyphCache(scale=scale, thickness=thickness)
+        self.crosshair = crosshair_sprite()
+        self._values = {"elevation": 0.0, "azimuth": 0.0, "distance": 0.0,
+                        "crosshair": (size[0] // 2, size[1] // 2)}
+        self._lock = threading.Lock()
+        self._t_start = None
+        self.cost = LatencyHistogram()
+
+    def update(self, **values):
+        """Cập nhật giá trị HUD (elevation, azimuth, distance, crosshair=(x, y) theo pixel frame)."""
+        with self._lock:
+            self._values.update(values)
+
+    def _lines(self, t):
+        with self._lock:
+            values = dict(self._values)
+        left, right = [], []
+        if "angles" in self.fields:
+            left.append(f"EL {values['elevation']:7.2f}")
+            left.append(f"AZ {values['azimuth']:7.2f}")
+        if "distance" in self.fields:
+            left.append(f"D {values['distance']:8.2f} m")
+        if "rec_time" in self.fields:
+            elapsed = int(t - self._t_start)
+            right.append(f"REC {elapsed // 60:02d}:{elapsed % 60:02d}")
+        return values, left, right
+
+    def render(self, frame, t=None):
+        """Blend HUD vào frame (sửa tại chỗ). t: timestamp capture monotonic của frame."""
+        t0 = time.monotonic()
+        t = t0 if t is None else t
+        if self._t_start is None:
+            self._t_start = t
+        values, left, right = self._lines(t)
+        if "crosshair" in self.fields:
+            cx, cy = values["crosshair"]
+            mid = self.crosshair.width // 2
+            self.crosshair.blend(frame, int(cx) - mid, int(cy) - mid)
+        y = self.margin
+        for line in left:
+            sprite = self.glyphs.text(line)
+            sprite.blend(frame, self.margin, y)
+            y += sprite.height
+        y = self.margin
+        for line in right:
+            sprite = self.glyphs.text(line)
+            sprite.blend(frame, frame.shape[1] - self.margin - sprite.width, y)
+            y += sprite.height
+        self.cost.add((time.monotonic() - t0) * 1000.0)
+
+    def stats(self):
+        """Chi phí burn-in mỗi frame (ms) và hiệu quả cache chữ."""
+        return {
+            "fields": sorted(self.fields),
+            "cost_ms": self.cost.snapshot(),
+            "glyphs": self.glyphs.glyphs_rendered,
+            "text_hits": self.glyphs.text_hits,
+            "text_misses": self.glyphs.text_misses,
+        }
@@ -0,0 +1,113 @@
+import bisect
+import math
+import threading
+import time
+
+
+class LatencyHistogram:
+    """Histogram độ trễ (ms) với bucket theo thang log, cho p50/p95/p99 không cần lưu mẫu.
+
+    Mỗi bucket rộng hơn bucket trước `growth` lần (mặc định 10%), nên sai số
+    phân vị luôn dưới ~5% và bộ nhớ cố định bất kể số mẫu.
+    """
+
+    def __init__(self, min_ms=0.05, max_ms=60000.0, growth=1.1):
+        count = int(math.ceil(math.log(max_ms / min_ms) / math.log(growth))) + 1
+        self.bounds = [min_ms * growth ** i for i in range(count)]
+        self.counts = [0] * (count + 1)   # Bucket cuối chứa giá trị > max_ms
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, value_ms):
+        idx = bisect.bisect_left(self.bounds, value_ms)
+        with self._lock:
+            self.counts[idx] += 1
+            self.total += 1
+            self.sum_ms += value_ms
+            if value_ms > self.max_ms:
+                self.max_ms = value_ms
+
+    def percentile(self, p):
+        """Giá trị phân vị p (0-100), nội suy tuyến tính trong bucket chứa nó."""
+        with self._lock:
+            if not self.total:
+                return 0.0
+            target = self.total * p / 100.0
+            seen = 0
+            for idx, n in enumerate(self.counts):
+                if n and seen + n >= target:
+                    if idx >= len(self.bounds):
+                        return self.max_ms
+                    lower = self.bounds[idx - 1] if idx else 0.0
+                    upper = self.bounds[idx]
+                    value = lower + (upper - lower) * (target - seen) / n
+                    return min(value, self.max_ms)
+                seen += n
+            return self.max_ms
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * len(self.counts)
+            self.total = 0
+            self.sum_ms = 0.0
+            self.max_ms = 0.0
+
+    def snapshot(self):
+        return {
+            "count": self.total,
+            "mean": round(self.sum_ms / self.total, 2) if self.total else 0.0,
+            "p50": round(self.percentile(50), 2),
+            "p95": round(self.percentile(95), 2),
+            "p99": round(self.percentile(99), 2),
+            "max": round(self.max_ms, 2),
+        }
+
+
+class LatencyTracker:
+    """Độ trễ theo từng chặng của một camera.
+
+    Frame được gắn timestamp monotonic ở mỗi chặng trong dict metadata
+    (t_grab → t_converted → t_emit → t_delivered → t_painted / t_recorded).
+    Các chặng mặc định:
+    - convert:  grab → QPixmap sẵn sàng (trong VideoThread)
+    - deliver:  emit signal → slot GUI nhận được (thời gian nằm trong hàng đợi sự kiện Qt)
+    - paint:    slot nhận → paintEvent vẽ xong
+    - glass:    grab → vẽ xong (glass-to-glass phía ứng dụng)
+    - record:   grab → recorder ghi xong frame
+    """
+    STAGES = {
+        "convert": ("t_grab", "t_converted"),
+        "deliver": ("t_emit", "t_delivered"),
+        "paint": ("t_delivered", "t_painted"),
+        "glass": ("t_grab", "t_painted"),
+        "record": ("t_grab", "t_recorded"),
+    }
+
+    def __init__(self, name="camera"):
+        self.name = name
+        self.histograms = {stage: LatencyHistogram() for stage in self.STAGES}
+
+    @staticmethod
+    def mark(meta, key):
+        """Gắn timestamp monotonic cho chặng `key` vào metadata của frame."""
+        if meta is not None:
+            meta[key] = time.monotonic()
+
+    def observe(self, meta, *stages):
+        """Ghi nhận các chặng đã đủ hai đầu timestamp."""
+        if not meta:
+            return
+        for stage in stages:
+            start, end = self.STAGES[stage]
+            if start in meta and end in meta:
+                self.histograms[stage].add((meta[end] - meta[start]) * 1000.0)
+
+    def reset(self):
+        for hist in self.histograms.values():
+            hist.reset()
+
+    def report(self):
+        """{stage: {count, mean, p50, p95, p99, max}} (ms)."""
+        return {stage: hist.snapshot() for stage, hist in self.histograms.items()}
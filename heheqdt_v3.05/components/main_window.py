@@ -1,13 +1,11 @@
 import datetime
-import json
 import time
 import os
-
-import cv2
+import threading
 
 from PyQt5.QtWidgets import QMainWindow, QMessageBox, QWidget, QPushButton, QVBoxLayout
 from PyQt5.QtGui import QIcon
-from PyQt5.QtCore import Qt, QTimer, QSize, QThread
+from PyQt5.QtCore import Qt, QTimer, QSize
 
 from .video_widget import VideoWidget
 from .elevation_scale import ElevationScale
@@ -16,57 +14,20 @@ from .testui import Ui_MainWindow
 from .sensor_reader import SensorReader
 from .reader_can import ReaderCAN
 from .data_sender import DataSender
-
-class RecordingWorker(QThread):
-    def __init__(self, path, fps=30.0, size=(1280, 720)):
-        super().__init__()
-        self.path = path
-        self.fps = fps
-        self.size = size
-        self.queue = []
-        self.running = True
-        self.writer = None
-
-    def run(self):
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        self.writer = cv2.VideoWriter(self.path, fourcc, self.fps, self.size)
-        if not self.writer.isOpened():
-            self.running = False
-            return
-        while self.running:
-            if self.queue:
-                frame = self.queue.pop(0)
-                try:
-                    frame = cv2.resize(frame, self.size)
-                    self.writer.write(frame)
-                except Exception as e:
-                    print(f"Lỗi ghi hình worker: {e}")
-            else:
-                self.msleep(5)
-        # Khi được yêu cầu dừng: giải phóng writer ngay trong thread worker
-        if self.writer:
-            try:
-                self.writer.release()
-            except Exception:
-                pass
-            self.writer = None
-
-    def enqueue(self, frame):
-        # Giới hạn queue để tránh dồn đống (drop frame cũ)
-        if len(self.queue) > 30:
-            self.queue.pop(0)
-        self.queue.append(frame)
-
-    def stop(self):
-        # Yêu cầu dừng không chặn GUI thread. Xóa queue để thoát vòng lặp nhanh.
-        self.running = False
-        try:
-            self.queue.clear()
-        except Exception:
-            pass
+from .frame_bus import DROP_OLDEST
+from .passthrough_recorder import PassthroughRecorder, ffmpeg_available, can_passthrough
+from .pre_record_buffer import write_pre_record
+from .recording_storage import RecordingStorage
+from .telemetry_track import TelemetryTrackWriter
+from .readout_widget import ReadoutWidget
+from .ui_scheduler import TelemetryState, UiUpdateScheduler
+from .startup_orchestrator import StartupOrchestrator, probe_tcp, wait_opened
+from .startup_profiler import profiler
 
 class MainWindow(QMainWindow):
     """Cửa sổ chính quản lý các thành phần giao diện, kế thừa từ QMainWindow."""
+    PRE_RECORD_TAIL_TIMEOUT = 15.0   # Giây tối đa chờ frame ghi đầu tiên để nối đoạn trước sự kiện
+
     def __init__(self, config):
         super().__init__()
         
@@ -74,8 +35,12 @@ class MainWindow(QMainWindow):
         self.camera_mode = "manual"
         
         self.config = config
-        self.uic = Ui_MainWindow()
-        self.uic.setupUi(self)
+        # Kết nối thiết bị song song sau khi cửa sổ đã hiện (xem _start_devices)
+        startup_config = self.config.get("startup", {})
+        self.startup = StartupOrchestrator(max_workers=startup_config.get("max_workers", 8), parent=self)
+        with profiler.span("setup_ui"):
+            self.uic = Ui_MainWindow()
+            self.uic.setupUi(self)
 
         self.day_mode = True
         self.camera_day_mode = True
@@ -85,35 +50,102 @@ class MainWindow(QMainWindow):
         self.current_elevation = self.config["initial_values"]["elevation_angle"]
         self.current_azimuth = self.config["initial_values"]["azimuth_angle"]
         
-        self._setup_widgets()
-        self._setup_video_player()
+        # Thời gian init từng phần được ghi vào startup profiler (khi bật)
+        with profiler.span("widgets"):
+            self._setup_widgets()
+        with profiler.span("video_player"):
+            self._setup_video_player()
+        with profiler.span("ui_scheduler"):
+            self._setup_ui_scheduler()
         
         # Thiết lập cụm nút bên phải sau khi video_widget đã sẵn sàng
-        self._setup_right_buttons()
+        with profiler.span("right_buttons"):
+            self._setup_right_buttons()
     
-        self._setup_sensor_reader()
-        self._setup_button_reader()
-        self._setup_data_sender()
+        with profiler.span("sensor_reader"):
+            self._setup_sensor_reader()
+        with profiler.span("button_reader"):
+            self._setup_button_reader()
+        with profiler.span("data_sender"):
+            self._setup_data_sender()
         self._initialize_values()
         self._update_colors()
 
         # Đảm bảo thư mục recordings tồn tại
         self.record_dir = os.path.join(os.getcwd(), "recordings")
         os.makedirs(self.record_dir, exist_ok=True)
+        # Đóng đoạn bất đồng bộ, index và quota đĩa cho thư mục recordings
+        record_config = self.config.get("recording", {})
+        self.record_storage = RecordingStorage(
+            self.record_dir,
+            max_gb=record_config.get("max_gb"),
+            min_free_mb=record_config.get("min_free_mb", 512),
+        )
+        self._storage_timer = QTimer(self)
+        self._storage_timer.timeout.connect(self.record_storage.enforce)
+        self._storage_timer.start(30000)
+        self.record_storage.enforce()
+
+        # Trạng thái ghi hình
+        self._is_recording = False
+        self._record_worker = None
+        self._finishing_workers = []   # Worker đã stop() nhưng còn đang ghi nốt ring
+        self._pre_record_writers = []  # Thread ghi đoạn trước sự kiện
+        self._pre_record_pending = None  # (bộ đệm, chunk trước lúc bấm, file) chờ frame ghi đầu tiên
+        self._telemetry_track = None   # File telemetry .tlm đi kèm bản ghi đang ghi
+        self._encoder_process = None   # Tiến trình mã hóa riêng (recording.encoder: process)
+        self._closing_tracks = []
+        self._record_start_time = None
+        self._record_blink = False
+        self._record_timer = QTimer(self)
+        self._record_timer.timeout.connect(self._on_record_timer)
         
         # Xử lý lỗi
         self.error_flags = {}
         self.error_timers = {}
         
-        # Offset
-        self.offset_file = "offset.json"
-        self.offset_data = {"day": {}, "night": {}}
+        # Offset: dùng chung CalibrationStore của video_widget (offset.json cũ đã được gộp vào crosshair.json)
+        self.calibration = self.video_widget.calibration
         self.offset_step = 0.05  # Bước zoom
         self.offset_x = 0
         self.offset_y = 0
         self.mode = "day"  # hoặc lấy từ giao diện (day/night)
 
-        self.load_offset_data()
+        self.startup.mark("window_built")
+        QTimer.singleShot(0, self._start_devices)
+
+    def _start_devices(self):
+        """Chạy ở vòng sự kiện đầu tiên (cửa sổ đã hiện): kết nối/kiểm tra mọi thiết bị song song."""
+        self.startup.mark("ui_shown")
+        timeouts = self.config.get("startup", {}).get("timeouts", {})
+        onvif_timeout = timeouts.get("onvif", 8.0)
+        rtsp_timeout = timeouts.get("rtsp", 3.0)
+        for name in ("day", "night"):
+            self.startup.add(f"onvif_{name}", lambda n=name: self.video_widget.connect_onvif(n), onvif_timeout)
+        for name, source in (("day", self.video_widget.day_source), ("night", self.video_widget.night_source)):
+            if isinstance(source, str) and source.startswith("rtsp://"):
+                self.startup.add(f"rtsp_{name}", lambda s=source: probe_tcp(s, timeout=rtsp_timeout), rtsp_timeout)
+        # CAN, serial, TCP được mở trong run() của thread riêng; ở đây chỉ chờ kết quả để báo cáo
+        for name, device in (("can", self.button_reader), ("serial", self.sensor_reader), ("tcp", self.data_sender)):
+            timeout = timeouts.get(name, 3.0)
+            self.startup.add(name, lambda d=device, t=timeout: wait_opened(d, t), timeout)
+        self.startup.device_ready.connect(self._on_device_ready)
+        self.startup.device_failed.connect(self._on_device_failed)
+        self.startup.all_done.connect(lambda report: profiler.done("devices", report))
+        self.startup.start()
+
+    def _on_device_ready(self, name, result):
+        if name.startswith("onvif_"):
+            self.video_widget.on_onvif_connected(name[len("onvif_"):], result)
+
+    def _on_device_failed(self, name, message):
+        # Lỗi RTSP/CAN/serial/TCP đã được chính các thread đó báo; chỉ ONVIF cần hiện lên video
+        if name.startswith("onvif_"):
+            self.video_widget.on_onvif_failed(name[len("onvif_"):], message)
+
+    def startup_report(self):
+        """Thời gian kết nối từng thiết bị và các mốc khởi động (ms tính từ lúc tạo cửa sổ)."""
+        return self.startup.report()
 
     def _on_zoom_in_pressed(self):
         """Zoom in - chỉ 1 lần khi nhận signal từ CAN."""
@@ -125,7 +157,7 @@ class MainWindow(QMainWindow):
 
     def _on_save_offset(self):
         """Lưu offset hiện tại."""
-        self.video_widget.update_current_zoom()  # Cập nhật zoom trước
+        # Zoom đã được PtzWorker đồng bộ với camera, không đọc lại trên GUI thread
         self.video_widget.save_offset()
         QMessageBox.information(self, "Thành công", 
             f"Đã lưu offset cho zoom {self.video_widget.current_zoom:.2f}")
@@ -141,38 +173,22 @@ class MainWindow(QMainWindow):
         btn.setFlat(True)
         return btn
 
-    def load_offset_data(self):
-        """Đọc file offset.json nếu tồn tại"""
-        if os.path.exists(self.offset_file):
-            with open(self.offset_file, "r") as f:
-                self.offset_data = json.load(f)
-        else:
-            self.offset_data = {"day": {}, "night": {}}
-
-    def save_offset_data(self):
-        """Lưu lại file offset.json"""
-        with open(self.offset_file, "w") as f:
-            json.dump(self.offset_data, f, indent=4)
-
     def get_current_zoom_level(self):
         """Lấy mức zoom hiện tại, làm tròn theo bước 0.05"""
-        zoom = self.camera.get_ptz()["zoom"]
+        state = self.video_widget.ptz_state()   # Từ PtzStateCache, không gọi ONVIF
+        zoom = state["zoom"] if state is not None else self.video_widget.current_zoom
         rounded = round(zoom / self.offset_step) * self.offset_step
         return float(f"{rounded:.2f}")  # tránh lỗi float dài
 
     def load_offset_for_zoom(self):
-        """Tải offset tương ứng với zoom"""
-        zoom_level = str(self.get_current_zoom_level())
-        offsets = self.offset_data.get(self.mode, {}).get(zoom_level, [0, 0])
-        self.offset_x, self.offset_y = offsets
+        """Tải offset tương ứng với zoom (từ bộ nhớ, không đọc file)"""
+        self.offset_x, self.offset_y = self.video_widget.get_offset(self.get_current_zoom_level(),
+                                                                    self.mode == "day")
 
     def save_current_offset(self):
-        """Lưu offset hiện tại cho zoom hiện tại"""
-        zoom_level = str(self.get_current_zoom_level())
-        if self.mode not in self.offset_data:
-            self.offset_data[self.mode] = {}
-        self.offset_data[self.mode][zoom_level] = [self.offset_x, self.offset_y]
-        self.save_offset_data()
+        """Lưu offset hiện tại cho zoom hiện tại (file được ghi ở nền)"""
+        zoom_level = f"{self.get_current_zoom_level():.2f}"
+        self.video_widget.set_calibration(self.mode, zoom_level, [self.offset_x, self.offset_y])
 
     def _setup_right_buttons(self):
         """Tạo 7 nút theo thứ tự dọc bên phải giao diện, cách đều nhau.
@@ -224,6 +240,7 @@ class MainWindow(QMainWindow):
         self.btn_zoom_in = None
         self.btn_zoom_out = None
         self.btn_laser = None
+        self.btn_record = None
         
         # Trạng thái lựa chọn hiện tại: 'trai' | 'phai' | None
         self._selected_gian = None
@@ -304,20 +321,11 @@ class MainWindow(QMainWindow):
         self.video_widget.switch_camera(self.camera_day_mode)
         self._update_colors()
         
-        # Nếu đang ghi hình, cần chuyển sang nhận raw_frame từ thread tương ứng
-        if getattr(self, '_is_recording', False):
-            try:
-                self.video_widget.day_thread.raw_frame.disconnect(self._on_raw_frame)
-            except Exception:
-                pass
-            try:
-                self.video_widget.night_thread.raw_frame.disconnect(self._on_raw_frame)
-            except Exception:
-                pass
-            if self.camera_day_mode:
-                self.video_widget.day_thread.raw_frame.connect(self._on_raw_frame)
-            else:
-                self.video_widget.night_thread.raw_frame.connect(self._on_raw_frame)
+        # Nếu đang ghi hình, chuyển subscription sang bus của camera tương ứng
+        if getattr(self, '_is_recording', False) and self._record_worker is not None:
+            # Đoạn trước sự kiện thuộc camera cũ: ghi ngay tới thời điểm chuyển
+            self._finish_pre_record()
+            self._attach_recorder()
 
     def _on_mock_kinh_vach(self):
         """Mock button trên GUI - giống chức năng CAN."""
@@ -451,9 +459,10 @@ class MainWindow(QMainWindow):
             text_edits["azimuth_angle"]["height"],
         )
 
-        self.uic.textEditDis.setReadOnly(True)
-        self.uic.textEditEA.setReadOnly(True)
-        self.uic.textEditAA.setReadOnly(True)
+        # Ô số tự vẽ thay cho QTextEdit, đặt đúng vị trí text_edits trong config
+        self.readout_distance = self._make_readout(self.uic.textEditDis)
+        self.readout_elevation = self._make_readout(self.uic.textEditEA)
+        self.readout_azimuth = self._make_readout(self.uic.textEditAA)
 
         self.uic.label_distance.setVisible(True)
         self.uic.label_EA.setVisible(True)
@@ -463,14 +472,31 @@ class MainWindow(QMainWindow):
         """Thiết lập widget phát video."""
         video_widget_config = self.config["video_widget"]
         camera_config = self.config["camera"]
+        day_camera = camera_config["day"]
+        night_camera = camera_config["night"]
+        # Backend capture; pipeline GStreamer mặc định scale thẳng về kích thước video_widget
+        capture_options = dict(self.config.get("capture", {}))
+        capture_options.setdefault("width", video_widget_config["width"])
+        capture_options.setdefault("height", video_widget_config["height"])
         self.video_widget = VideoWidget(
             parent=self.uic.frame_video,
-            day_source=camera_config["day"]["rtsp"],
-            night_source=camera_config["night"]["rtsp"],
+            # Sub-stream độ phân giải thấp để hiển thị, main stream chỉ mở khi ghi hình
+            day_source=day_camera.get("display_rtsp", day_camera["rtsp"]),
+            night_source=night_camera.get("display_rtsp", night_camera["rtsp"]),
+            day_record_source=day_camera.get("record_rtsp", day_camera["rtsp"]),
+            night_record_source=night_camera.get("record_rtsp", night_camera["rtsp"]),
             local_source=camera_config["local"],
             day_mode=self.camera_day_mode,
             day_onvif=camera_config["day"]["onvif"],
-            night_onvif=camera_config["night"]["onvif"]
+            night_onvif=camera_config["night"]["onvif"],
+            display_fps=self.config.get("display_fps", 30.0),
+            debug_overlay=self.config.get("debug_overlay", False),
+            stream_options=self.config.get("stream_supervisor"),
+            capture_options=capture_options,
+            video_surface=self.config.get("video_surface", "raster"),
+            pre_record=self.config.get("pre_record"),
+            ptz_options=self.config.get("ptz"),
+            crosshair_options=self.config.get("crosshair")
         )
         self.video_widget.setGeometry(
             video_widget_config["x"],
@@ -492,7 +518,7 @@ class MainWindow(QMainWindow):
         self.button_reader.zoom_out_pressed.connect(self._on_zoom_out_pressed)      # Zoom out
         self.button_reader.kinh_vach_pressed.connect(self._on_kinh_vach_pressed)    # Chuyển đổi chế độ ngày/đêm
         self.button_reader.laser_pressed.connect(self._on_laser_clicked)            # Đo khoảng cách bằng laser
-        self.can_reader.angles_updated.connect(self._update_angles)                 # Cập nhật góc tầm góc hướng
+        self.button_reader.angles_updated.connect(self._update_angles)                 # Cập nhật góc tầm góc hướng
         
         self.button_reader.start()
 
@@ -502,7 +528,8 @@ class MainWindow(QMainWindow):
             can_interface=self.config.get("can_interface", "can0"),
             can_bitrate=self.config.get("can_bitrate", 500000),
             tcp_address=self.config.get("tcp_address", "192.168.100.20"),
-            tcp_port=self.config.get("tcp_port", 12345)
+            tcp_port=self.config.get("tcp_port", 12345),
+            connect_timeout=self.config.get("startup", {}).get("timeouts", {}).get("tcp", 3.0)
         )
         self.sensor_reader.data_updated.connect(self.data_sender.send_data)
         self.data_sender.error_occurred.connect(self._handle_data_sender_error)
@@ -527,12 +554,9 @@ class MainWindow(QMainWindow):
             f"QFrame#frame_video {{ border: {border_thickness}px solid {frame_border_color}; background-color: {colors['background']}; }}"
         )
 
-        for text_edit in [self.uic.textEditDis, self.uic.textEditEA, self.uic.textEditAA]:
-            text_edit.setStyleSheet(
-                f"background-color: {colors['background']}; color: {colors['text']}; "
-                f"font-size: {font_size}px; font-weight: bold; border: {border_thickness-1}px solid {colors['border']};"
-            )
-            text_edit.setAlignment(Qt.AlignCenter)
+        for readout in [self.readout_distance, self.readout_elevation, self.readout_azimuth]:
+            readout.set_colors(colors['background'], colors['text'], colors['border'],
+                               font_size, border_thickness - 1)
 
         for label in [self.uic.label_distance, self.uic.label_EA, self.uic.label_AA]:
             label.setStyleSheet(
@@ -553,12 +577,8 @@ class MainWindow(QMainWindow):
 
     def _initialize_values(self):
         """Khởi tạo giá trị mặc định cho các ô nhập liệu và thước đo."""
-        initial = self.config["initial_values"]
-        self.uic.textEditDis.setPlainText(str(initial["distance"]))
-        self.uic.textEditEA.setPlainText(str(initial["elevation_angle"]))
-        self.uic.textEditAA.setPlainText(str(initial["azimuth_angle"]))
-        self.elevation_scale.set_angle(initial["elevation_angle"])
-        self.azimuth_scale.set_angle(initial["azimuth_angle"])
+        # Giá trị ban đầu đã nằm trong TelemetryState: áp dụng ngay một lần
+        self.ui_scheduler.flush()
 
     def _handle_sensor_error(self, error_message, error_type="Cảm Biến"):
         # """Xử lý lỗi từ sensor reader."""
@@ -609,23 +629,58 @@ class MainWindow(QMainWindow):
     #     })
     
     def _update_distance(self, data):
+        # Chỉ ghi giá trị mới nhất; giao diện cập nhật ở nhịp tiếp theo của ui_scheduler
         self.current_distance = round(data.get("distance", 0.0), 2)  # Lấy từ sensor
-        self.uic.textEditDis.setPlainText(str(self.current_distance))
-        print(f"[UI] Updated distance: {self.current_distance:.2f}")
-        self._send_full_data()  # Đẩy data đầy đủ vào sender
-        
+        self.telemetry.update(distance=self.current_distance)
+        self._record_telemetry()
+
     def _update_angles(self, angles_dict):
         if "elevation" in angles_dict:
             self.current_elevation = angles_dict["elevation"]
-            self.uic.textEditEA.setPlainText(str(self.current_elevation))
-            self.elevation_scale.set_angle(self.current_elevation)
-            self.video_widget.set_elevation_angle(self.current_elevation)
+            self.telemetry.update(elevation_angle=self.current_elevation)
         if "azimuth" in angles_dict:
             self.current_azimuth = angles_dict["azimuth"]
-            self.uic.textEditAA.setPlainText(str(self.current_azimuth))
-            self.azimuth_scale.set_angle(self.current_azimuth)
-        print(f"[UI] Updated angles: elevation={self.current_elevation:.2f}, azimuth={self.current_azimuth:.2f}")
-        self._send_full_data()  # Đẩy data đầy đủ vào sender (nếu muốn gửi realtime, hoặc chỉ khi thay đổi)
+            self.telemetry.update(azimuth_angle=self.current_azimuth)
+        self._record_telemetry()
+
+    def _record_telemetry(self):
+        """Ghi trạng thái đầy đủ (góc, khoảng cách, zoom, camera) vào file .tlm và HUD burn-in khi đang ghi hình."""
+        track = self._telemetry_track
+        if track is not None:
+            track.append(self.current_elevation, self.current_azimuth, self.current_distance,
+                         zoom=self.video_widget.current_zoom, camera_day=self.camera_day_mode)
+        hud = getattr(self._record_worker, "hud", None)
+        if hud is not None:
+            hud.update(elevation=self.current_elevation, azimuth=self.current_azimuth,
+                       distance=self.current_distance,
+                       crosshair=self.video_widget.crosshair_in_frame(hud.size))
+
+    def _setup_ui_scheduler(self):
+        """Gom cập nhật telemetry lên giao diện theo nhịp màn hình thay vì theo từng gói CAN/serial."""
+        initial = self.config["initial_values"]
+        self.telemetry = TelemetryState(
+            distance=initial["distance"],
+            elevation_angle=initial["elevation_angle"],
+            azimuth_angle=initial["azimuth_angle"],
+        )
+        self.ui_scheduler = UiUpdateScheduler(self.telemetry, self.config.get("ui_refresh_hz", 0), self)
+        self.ui_scheduler.bind("distance", self.readout_distance.set_value)
+        self.ui_scheduler.bind("elevation_angle", self.readout_elevation.set_value)
+        self.ui_scheduler.bind("elevation_angle", self.elevation_scale.set_angle)
+        self.ui_scheduler.bind("elevation_angle", self.video_widget.set_elevation_angle)
+        self.ui_scheduler.bind("azimuth_angle", self.readout_azimuth.set_value)
+        self.ui_scheduler.bind("azimuth_angle", self.azimuth_scale.set_angle)
+        # Gửi dữ liệu đầy đủ tối đa một lần mỗi nhịp, chỉ khi có thay đổi
+        self.ui_scheduler.on_flush(lambda changed: self._send_full_data())
+        self.ui_scheduler.start()
+
+    def _make_readout(self, text_edit):
+        """Tạo ReadoutWidget chiếm chỗ của một QTextEdit trong file .ui và ẩn QTextEdit đó."""
+        readout = ReadoutWidget(text_edit.parentWidget())
+        readout.setGeometry(text_edit.geometry())
+        text_edit.hide()
+        readout.show()
+        return readout
 
     # Thêm hàm đẩy data đầy đủ
     def _send_full_data(self):
@@ -638,11 +693,28 @@ class MainWindow(QMainWindow):
 
     def closeEvent(self, event):
         """Xử lý sự kiện đóng cửa sổ."""
+        if hasattr(self, "ui_scheduler"):
+            self.ui_scheduler.stop()
         if getattr(self, '_is_recording', False):
             try:
                 self._stop_recording()
             except Exception:
                 pass
+        # Chờ các worker ghi nốt frame trong ring trước khi thoát, tránh file mp4 hỏng
+        for worker in list(getattr(self, '_finishing_workers', [])):
+            worker.wait(5000)
+        for writer in getattr(self, '_pre_record_writers', []):
+            writer.join(5.0)
+        for track in getattr(self, '_closing_tracks', []):
+            track.join(5.0)
+        # Chờ các đoạn cuối được đóng + fsync + ghi index
+        if hasattr(self, "record_storage"):
+            self.record_storage.flush(10.0)
+        if getattr(self, "_encoder_process", None) is not None:
+            self._encoder_process.stop()
+        # Ghi nốt hiệu chỉnh dấu cộng chưa lưu (write-behind)
+        if hasattr(self, "calibration"):
+            self.calibration.close()
         
         # Kiểm tra tồn tại method trước khi gọi
         if hasattr(self, "sensor_reader") and self.sensor_reader:
@@ -667,18 +739,18 @@ class MainWindow(QMainWindow):
             self._stop_recording()
 
     def _start_recording(self):
-        # Khởi tạo VideoWriter 1280x720 @30fps
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
         ts = time.strftime('%Y%m%d_%H%M%S')
-        self._record_path = f"{self.record_dir}/record_{ts}.mp4"
-        # Khởi tạo worker ghi hình chạy nền
-        self._record_worker = RecordingWorker(self._record_path, fps=30.0, size=(1280, 720))
+        self._record_worker = self._create_recorder(ts)
+        # N giây trước khi bấm record ghi ra file riêng. Recorder chỉ có frame sau khi mở xong
+        # main stream / chờ keyframe (có thể vài giây), nên bộ đệm tiếp tục giữ frame tới frame
+        # ghi đầu tiên và đoạn trước sự kiện phủ luôn khoảng đó
+        self._begin_pre_record(ts)
+        self._attach_recorder()
+        # Telemetry đi kèm: record_<ts>.tlm, timestamp monotonic cùng gốc với frame
+        self._telemetry_track = TelemetryTrackWriter(f"{self.record_dir}/record_{ts}.tlm")
+        self._telemetry_track.start()
+        self._record_telemetry()
         self._record_worker.start()
-        # Nhận frame raw từ thread camera hiện tại (đang hiển thị)
-        if self.video_widget.day_mode:
-            self.video_widget.day_thread.raw_frame.connect(self._on_raw_frame)
-        else:
-            self.video_widget.night_thread.raw_frame.connect(self._on_raw_frame)
         self._is_recording = True
         self._record_start_time = time.time()
         self._record_blink = False
@@ -692,22 +764,26 @@ class MainWindow(QMainWindow):
         self.video_widget.update()
 
     def _stop_recording(self):
-        # Ngắt kết nối raw frame
-        try:
-            self.video_widget.day_thread.raw_frame.disconnect(self._on_raw_frame)
-        except Exception:
-            pass
-        try:
-            self.video_widget.night_thread.raw_frame.disconnect(self._on_raw_frame)
-        except Exception:
-            pass
-        # Dừng worker
-        if self._record_worker is not None:
+        # Recorder chưa có frame nào: đoạn trước sự kiện lấy tới lúc dừng
+        self._finish_pre_record()
+        # Dừng worker (đồng thời hủy subscription trên frame bus); worker ghi nốt ring rồi tự đóng file
+        worker = self._record_worker
+        if worker is not None:
             try:
-                self._record_worker.stop()
+                worker.stop()
             except Exception:
                 pass
+            if worker.isRunning():
+                self._finishing_workers.append(worker)
+                worker.finished.connect(lambda w=worker: self._finishing_workers.remove(w)
+                                        if w in self._finishing_workers else None)
             self._record_worker = None
+        if self._telemetry_track is not None:
+            self._telemetry_track.close()
+            self._closing_tracks = [t for t in self._closing_tracks if t.is_alive()] + [self._telemetry_track]
+            self._telemetry_track = None
+        # Đóng main stream, chỉ giữ sub-stream hiển thị
+        self.video_widget.stop_record_stream()
         self._is_recording = False
         self._record_timer.stop()
         self._record_start_time = None
@@ -721,15 +797,142 @@ class MainWindow(QMainWindow):
         self.video_widget.recording_blink = False
         self.video_widget.update()
 
-    def _on_raw_frame(self, frame_bgr):
-        # Ghi frame sau khi resize về 1280x720
-        if self._record_worker is None:
+    def _create_recorder(self, ts):
+        """Chọn cách ghi: passthrough (ffmpeg remux, không giải mã) nếu được, nếu không thì mã hóa lại."""
+        record_config = self.config.get("recording", {})
+        mode = record_config.get("mode", "reencode")
+        ffmpeg = record_config.get("ffmpeg", "ffmpeg")
+        source = self.video_widget.active_record_source()
+        hud_config = self.config.get("hud_burnin", {})
+        if mode == "passthrough" and hud_config.get("enabled", False):
+            # Burn-in HUD cần giải mã + mã hóa lại, không remux được
+            print("[REC] Bật hud_burnin: ghi bằng mã hóa lại thay vì passthrough")
+            mode = "reencode"
+        if mode == "passthrough":
+            if ffmpeg_available(ffmpeg) and can_passthrough(source):
+                self._record_path = self.record_dir
+                return PassthroughRecorder(
+                    self.record_dir, prefix=f"record_{ts}",
+                    container=record_config.get("container", "mp4"),
+                    segment_seconds=record_config.get("segment_seconds", 60),
+                    ffmpeg=ffmpeg,
+                    storage=self.record_storage,
+                )
+            print(f"[REC] Không ghi passthrough được (ffmpeg={ffmpeg_available(ffmpeg)}, nguồn={source}), "
+                  f"chuyển sang mã hóa lại")
+        # Mã hóa lại 1280x720 @30fps mp4v, nhận frame từ record stream của camera đang hiển thị
+        # Chia đoạn record_<ts>_000.mp4, _001... ; đoạn cũ được đóng trên thread của record_storage
+        # (recording_worker kéo theo cv2: chỉ nạp ở lần ghi đầu tiên)
+        from .recording_worker import RecordingWorker
+        self._record_path = f"{self.record_dir}/record_{ts}.mp4"
+        worker = RecordingWorker(
+            self._record_path, fps=30.0, size=(1280, 720),
+            ring_size=record_config.get("ring_size", 16),
+            drop_policy=record_config.get("drop_policy", DROP_OLDEST),
+            segment_seconds=record_config.get("segment_seconds", 60),
+            storage=self.record_storage,
+            source=str(source),
+            encoder=self._get_encoder_process(record_config),
+            max_gap=record_config.get("max_gap", 2.0),
+            hud=self._create_hud(hud_config, (1280, 720)),
+        )
+        worker.error_occurred.connect(self._on_record_error)
+        return worker
+
+    def _create_hud(self, hud_config, size):
+        """HudRenderer cho bản ghi mã hóa lại (None nếu tắt hud_burnin)."""
+        if not hud_config.get("enabled", False):
+            return None
+        from .hud_burnin import HudRenderer, HUD_FIELDS
+        return HudRenderer(size, fields=hud_config.get("fields", HUD_FIELDS),
+                           scale=hud_config.get("scale", 0.8))
+
+    def _get_encoder_process(self, record_config):
+        """Tiến trình encoder dùng chung cho mọi bản ghi, khởi động ở lần ghi đầu tiên."""
+        if record_config.get("encoder", "thread") != "process":
+            return None
+        if self._encoder_process is None:
+            try:
+                from .encoder_process import EncoderProcess
+                self._encoder_process = EncoderProcess(size=(1280, 720),
+                                                       slot_count=record_config.get("encoder_slots", 8))
+                self._encoder_process.start()
+            except Exception as e:
+                print(f"[ENCODER] Không khởi động được tiến trình encoder, mã hóa trong thread: {e}")
+                self._encoder_process = None
+        return self._encoder_process
+
+    def _on_record_error(self, message):
+        """Worker ghi hình tự dừng vì lỗi (hết dung lượng...): đồng bộ lại giao diện và báo lỗi."""
+        if self._is_recording and self.sender() is self._record_worker:
+            self._stop_recording()
+        self._handle_sensor_error(message, "Ghi Hình")
+
+    def recording_report(self):
+        """Dung lượng trống/đã dùng, số đoạn bị xóa, tốc độ ghi và thống kê worker đang ghi."""
+        report = {"storage": self.record_storage.stats()}
+        if self._encoder_process is not None:
+            report["encoder"] = self._encoder_process.stats()
+        if self._record_worker is not None:
+            report["worker"] = self._record_worker.stats()
+        return report
+
+    def _begin_pre_record(self, ts):
+        """Chụp bộ đệm trước sự kiện của camera đang hiển thị và tiếp tục giữ frame tới khi
+        recorder ghi frame đầu tiên (hoặc quá PRE_RECORD_TAIL_TIMEOUT giây)."""
+        buffer = self.video_widget.active_pre_record()
+        if buffer is None:
+            return
+        chunks = buffer.begin_tail()
+        pending = (buffer, chunks, f"{self.record_dir}/record_{ts}_pre.mp4")
+        self._pre_record_pending = pending
+        self._record_worker.first_frame.connect(self._on_first_recorded_frame)
+        QTimer.singleShot(int(self.PRE_RECORD_TAIL_TIMEOUT * 1000),
+                          lambda p=pending: self._finish_pre_record(pending=p))
+
+    def _on_first_recorded_frame(self, t_grab):
+        # Bỏ qua worker cũ còn đang ghi nốt ring sau khi đã dừng
+        if self.sender() is self._record_worker:
+            self._finish_pre_record(t_grab)
+
+    def _finish_pre_record(self, until=None, pending=None):
+        """Ghép chunk trước lúc bấm với chunk giữ thêm tới `until` (t_grab frame ghi đầu tiên,
+        None = tới hiện tại) rồi ghi ra record_<ts>_pre.mp4 trên thread nền."""
+        if self._pre_record_pending is None or (pending is not None and pending is not self._pre_record_pending):
+            return
+        buffer, chunks, path = self._pre_record_pending
+        self._pre_record_pending = None
+        tail = buffer.end_tail(until)
+        chunks = chunks + tail
+        print(f"[PRE_REC] Flush {len(chunks)} frame trước sự kiện ({len(tail)} frame sau lúc bấm): "
+              f"{buffer.stats()}")
+        if not chunks:
+            return
+        writer = threading.Thread(target=self._write_pre_record, args=(chunks, path, buffer.fps),
+                                  name="pre-record-writer", daemon=True)
+        writer.start()
+        self._pre_record_writers = [t for t in self._pre_record_writers if t.is_alive()] + [writer]
+
+    def _write_pre_record(self, chunks, path, fps):
+        """Chạy trên thread nền: ghi đoạn trước sự kiện rồi đưa vào index/quota."""
+        start = time.time() - (time.monotonic() - chunks[0][0])
+        if write_pre_record(chunks, path, fps):
+            self.record_storage.add_segment(path, {
+                "start": start, "end": start + chunks[-1][0] - chunks[0][0], "frames": len(chunks),
+                "fps": fps, "pre_event": True,
+            })
+
+    def _attach_recorder(self):
+        """Mở record stream (main stream) của camera đang hiển thị và nối vào worker ghi hình."""
+        if isinstance(self._record_worker, PassthroughRecorder):
+            # ffmpeg tự đọc main stream: không cần mở/giải mã record stream trong ứng dụng
+            self._record_worker.set_source(self.video_widget.active_record_source())
             return
-        try:
-            # Đẩy frame sang worker để resize + ghi hình ở background
-            self._record_worker.enqueue(frame_bgr)
-        except Exception as e:
-            print(f"Lỗi ghi hình: {e}")
+        thread = self.video_widget.start_record_stream()
+        # Recorder không được làm chậm luồng camera: drop_oldest với ring sâu nhất có thể
+        bus = thread.frame_bus
+        subscription = bus.subscribe("recorder", policy=DROP_OLDEST, depth=bus.capacity)
+        self._record_worker.set_subscription(subscription, thread.latency)
 
     def _on_record_timer(self):
         # Toggle blink và cập nhật thời gian hiển thị (và nháy nút Record)
@@ -742,6 +945,8 @@ class MainWindow(QMainWindow):
             self.video_widget.recording_blink = self._record_blink
             self.video_widget.recording_overlay = True
             self.video_widget.update()
+            # Bản ghi định kỳ 2Hz để zoom/camera (không có signal riêng) luôn có trong file .tlm
+            self._record_telemetry()
             
     def _reset_error_flag(self, error_type):
         """Reset flag cho phép hiển thị lỗi tiếp theo của loại lỗi này."""
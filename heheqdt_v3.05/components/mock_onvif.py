@@ -0,0 +1,248 @@
+import threading
+import time
+import urllib.request
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Giả lập dịch vụ PTZ ONVIF (SOAP 1.2 qua HTTP) cho phần ứng dụng dùng tới:
+# GetProfiles, GetStatus, RelativeMove, AbsoluteMove. Không cần camera thật để thử zoom,
+# offset dấu cộng hay đo độ trễ PTZ trên máy bàn.
+SOAP_NS = "http://www.w3.org/2003/05/soap-envelope"
+PTZ_NS = "http://www.onvif.org/ver20/ptz/wsdl"
+MEDIA_NS = "http://www.onvif.org/ver10/media/wsdl"
+SCHEMA_NS = "http://www.onvif.org/ver10/schema"
+PTZ_PATH = "/onvif/ptz_service"
+
+ENVELOPE = ('<?xml version="1.0" encoding="UTF-8"?>'
+            f'<s:Envelope xmlns:s="{SOAP_NS}" xmlns:tptz="{PTZ_NS}" xmlns:trt="{MEDIA_NS}" xmlns:tt="{SCHEMA_NS}">'
+            '<s:Body>{body}</s:Body></s:Envelope>')
+
+
+class MotorAxis:
+    """Một trục PTZ có giới hạn tốc độ: chạy đều về đích với `speed` đơn vị/giây, kẹp trong [low, high]."""
+
+    def __init__(self, position=0.0, speed=0.5, low=-1.0, high=1.0):
+        self.speed = speed
+        self.low = low
+        self.high = high
+        self._start = position
+        self._target = position
+        self._t_start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def position(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return self._position(now)
+
+    def _position(self, now):
+        distance = self._target - self._start
+        travelled = self.speed * (now - self._t_start) if self.speed > 0 else abs(distance)
+        if travelled >= abs(distance):
+            return self._target
+        return self._start + (travelled if distance > 0 else -travelled)
+
+    def move_to(self, target):
+        now = time.monotonic()
+        with self._lock:
+            self._start = self._position(now)
+            self._target = max(self.low, min(self.high, target))
+            self._t_start = now
+
+    def move_by(self, delta):
+        with self._lock:
+            # Lệnh tương đối tính từ đích đang chạy tới, như camera thật xếp chồng lệnh
+            target = self._target + delta
+        self.move_to(target)
+
+    @property
+    def target(self):
+        with self._lock:
+            return self._target
+
+    def moving(self, now=None):
+        return self.position(now) != self.target
+
+
+class MockPtzCamera:
+    """Trạng thái một camera giả: pan/tilt/zoom có động học motor đơn giản."""
+
+    def __init__(self, zoom=0.0, zoom_speed=0.5, pan_speed=1.0):
+        self.pan = MotorAxis(0.0, pan_speed)
+        self.tilt = MotorAxis(0.0, pan_speed)
+        self.zoom = MotorAxis(zoom, zoom_speed, low=0.0, high=1.0)
+
+    def status(self):
+        now = time.monotonic()
+        return (self.pan.position(now), self.tilt.position(now), self.zoom.position(now),
+                self.pan.moving(now) or self.tilt.moving(now), self.zoom.moving(now))
+
+    def settled(self):
+        return not any(axis.moving() for axis in (self.pan, self.tilt, self.zoom))
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _vector(element, name):
+    """Đọc thuộc tính x/y của phần tử con `name` (PanTilt/Zoom) trong Translation/Position."""
+    for child in element.iter():
+        if _local(child.tag) == name:
+            return float(child.get("x", 0.0)), float(child.get("y", 0.0))
+    return 0.0, 0.0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "MockONVIF/1.0"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if server.latency:
+            time.sleep(server.latency)
+        try:
+            request = ET.fromstring(body)
+            soap_body = next(el for el in request.iter() if _local(el.tag) == "Body")
+            operation = next(iter(soap_body))
+            response = server.handle(_local(operation.tag), operation)
+            status = 200
+        except Exception as e:
+            response = (f'<s:Fault><s:Code><s:Value>s:Sender</s:Value></s:Code>'
+                        f'<s:Reason><s:Text xml:lang="en">{e}</s:Text></s:Reason></s:Fault>')
+            status = 400
+        data = ENVELOPE.format(body=response).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/soap+xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MockOnvifServer(ThreadingHTTPServer):
+    """Máy chủ SOAP giả lập PTZ của một camera, chạy trên thread nền.
+
+    latency: độ trễ mỗi phản hồi (giây), mô phỏng vòng SOAP của camera thật.
+    zoom_speed / pan_speed: tốc độ motor (đơn vị ONVIF chuẩn hóa mỗi giây).
+    """
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.05, zoom=0.0, zoom_speed=0.5, pan_speed=1.0):
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.camera = MockPtzCamera(zoom=zoom, zoom_speed=zoom_speed, pan_speed=pan_speed)
+        self.requests = {}
+        self._requests_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-onvif", daemon=True)
+        self._thread.start()
+        print(f"[MOCK_ONVIF] http://{self.server_address[0]}:{self.port}{PTZ_PATH} (trễ {self.latency * 1000:.0f} ms)")
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def handle(self, operation, element):
+        with self._requests_lock:
+            self.requests[operation] = self.requests.get(operation, 0) + 1
+        camera = self.camera
+        if operation == "GetProfiles":
+            return ('<trt:GetProfilesResponse><trt:Profiles token="profile_0" fixed="true">'
+                    '<tt:Name>mock</tt:Name></trt:Profiles></trt:GetProfilesResponse>')
+        if operation == "GetStatus":
+            pan, tilt, zoom, pt_moving, zoom_moving = camera.status()
+            return ('<tptz:GetStatusResponse><tptz:PTZStatus><tt:Position>'
+                    f'<tt:PanTilt x="{pan:.6f}" y="{tilt:.6f}"/><tt:Zoom x="{zoom:.6f}"/></tt:Position>'
+                    f'<tt:MoveStatus><tt:PanTilt>{"MOVING" if pt_moving else "IDLE"}</tt:PanTilt>'
+                    f'<tt:Zoom>{"MOVING" if zoom_moving else "IDLE"}</tt:Zoom></tt:MoveStatus>'
+                    f'<tt:UtcTime>{time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}</tt:UtcTime>'
+                    '</tptz:PTZStatus></tptz:GetStatusResponse>')
+        if operation == "RelativeMove":
+            pan, tilt = _vector(element, "PanTilt")
+            zoom, _ = _vector(element, "Zoom")
+            camera.pan.move_by(pan)
+            camera.tilt.move_by(tilt)
+            camera.zoom.move_by(zoom)
+            return "<tptz:RelativeMoveResponse/>"
+        if operation == "AbsoluteMove":
+            pan, tilt = _vector(element, "PanTilt")
+            zoom, _ = _vector(element, "Zoom")
+            camera.pan.move_to(pan)
+            camera.tilt.move_to(tilt)
+            camera.zoom.move_to(zoom)
+            return "<tptz:AbsoluteMoveResponse/>"
+        raise ValueError(f"Không hỗ trợ {operation}")
+
+
+class MockOnvifClient:
+    """Client SOAP tối giản có cùng giao diện với sensecam_control.onvif_control.CameraControl
+    (camera_start, get_ptz, relative_move, absolute_move), nói chuyện với MockOnvifServer.
+
+    Dùng làm CameraControl.client_factory để chạy đúng đường code của VideoWidget/PtzWorker.
+    """
+
+    def __init__(self, ip, username, password, port=80, timeout=5.0):
+        self.url = f"http://{ip}:{port}{PTZ_PATH}"
+        self.timeout = timeout
+        self.profile = None
+
+    def _call(self, body):
+        data = ENVELOPE.format(body=body).encode("utf-8")
+        request = urllib.request.Request(self.url, data=data,
+                                         headers={"Content-Type": "application/soap+xml; charset=utf-8"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return ET.fromstring(response.read())
+
+    def camera_start(self):
+        root = self._call("<trt:GetProfiles/>")
+        profile = next(el for el in root.iter() if _local(el.tag) == "Profiles")
+        self.profile = profile.get("token")
+
+    def get_ptz(self):
+        root = self._call(f"<tptz:GetStatus><tptz:ProfileToken>{self.profile}</tptz:ProfileToken></tptz:GetStatus>")
+        position = next(el for el in root.iter() if _local(el.tag) == "Position")
+        pan, tilt = _vector(position, "PanTilt")
+        zoom, _ = _vector(position, "Zoom")
+        return [pan, tilt, zoom]
+
+    def _move(self, operation, field, pan, tilt, zoom):
+        self._call(f"<tptz:{operation}><tptz:ProfileToken>{self.profile}</tptz:ProfileToken>"
+                   f'<tptz:{field}><tt:PanTilt x="{pan}" y="{tilt}"/><tt:Zoom x="{zoom}"/></tptz:{field}>'
+                   f"</tptz:{operation}>")
+
+    def relative_move(self, pan, tilt, zoom):
+        self._move("RelativeMove", "Translation", pan, tilt, zoom)
+
+    def absolute_move(self, pan, tilt, zoom):
+        self._move("AbsoluteMove", "Position", pan, tilt, zoom)
+
+
+if __name__ == "__main__":
+    # Chạy máy chủ giả lập riêng (vd. cho config trỏ onvif ip/port về đây):
+    #   python -m components.mock_onvif 8081 0.08
+    import sys
+    server = MockOnvifServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8081,
+                             latency=float(sys.argv[2]) if len(sys.argv) > 2 else 0.05).start()
+    client = MockOnvifClient("127.0.0.1", "admin", "admin", server.port)
+    client.camera_start()
+    client.relative_move(0, 0, 0.25)
+    t0 = time.monotonic()
+    while not server.camera.settled():
+        time.sleep(0.05)
+    print(f"[MOCK_ONVIF] Tự kiểm tra: zoom={client.get_ptz()[2]:.3f} sau {time.monotonic() - t0:.2f}s, "
+          f"yêu cầu: {server.requests}")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        server.stop()
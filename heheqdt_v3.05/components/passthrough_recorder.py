@@ -0,0 +1,313 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+from .video_thread import LIVE_PREFIXES
+
+
+def ffmpeg_available(ffmpeg="ffmpeg"):
+    """True nếu tìm thấy ffmpeg trong PATH (hoặc đường dẫn tuyệt đối tồn tại)."""
+    return shutil.which(ffmpeg) is not None
+
+
+def can_passthrough(source):
+    """Chỉ nguồn đã nén (RTSP/file/URL) mới remux được; webcam (int) phải giải mã + mã hóa lại."""
+    return isinstance(source, str) and bool(source)
+
+
+class PassthroughRecorder(QThread):
+    """Ghi hình không giải mã: ffmpeg remux gói H.264/H.265 của camera thẳng ra file.
+
+    - `-c copy`: giữ nguyên gói nén và timestamp gốc của camera, gần như không tốn CPU.
+    - Ghi thành các đoạn segment_seconds giây (MP4 phân mảnh hoặc MKV) <prefix>_000, _001...
+      như RecordingWorker, nên file vẫn đọc được nếu ứng dụng bị tắt đột ngột. Số thứ tự đoạn
+      được nối tiếp qua các lần chạy lại ffmpeg, nên đổi nguồn không ghi đè đoạn đã có.
+    - ffmpeg thoát bất thường (mất mạng...) thì được chạy lại với backoff.
+    - Danh sách đoạn ffmpeg ghi (csv) được đọc nối tiếp trong lúc ghi: mỗi đoạn vừa đóng được
+      đưa ngay vào index/quota của RecordingStorage, không đợi tới khi ffmpeg thoát.
+    - set_source() khi đang ghi (đổi camera) sẽ đóng đoạn hiện tại và mở đoạn mới từ nguồn mới.
+
+    Cùng giao diện với RecordingWorker (start/stop/stats/recording_finished) để MainWindow
+    dùng chung; RecordingWorker (giải mã + mp4v) vẫn là đường dự phòng.
+    """
+    recording_finished = pyqtSignal(str, dict)   # (thư mục ghi, thống kê)
+    first_frame = pyqtSignal(float)              # Lúc (monotonic) đoạn đầu tiên được ffmpeg tạo
+
+    INDEX_INTERVAL = 0.5   # Chu kỳ (giây) đọc danh sách đoạn đã đóng trong lúc ffmpeg chạy
+
+    def __init__(self, output_dir, prefix="record", container="mp4", segment_seconds=60,
+                 ffmpeg="ffmpeg", rtsp_transport="tcp", stop_timeout=5.0, backoff_max=10.0, storage=None):
+        super().__init__()
+        self.storage = storage   # RecordingStorage: ghi index + dọn quota khi đoạn đóng
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.container = container if container in ("mp4", "mkv") else "mp4"
+        self.segment_seconds = segment_seconds
+        self.ffmpeg = ffmpeg
+        self.rtsp_transport = rtsp_transport
+        self.stop_timeout = stop_timeout
+        self.backoff_max = backoff_max
+        self.source = None
+        self.running = True
+        self._process = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._started_at = None
+        self._first_frame_sent = False
+
+        # Bộ đếm
+        self.launches = 0
+        self.restarts = 0
+        self.source_switches = 0
+        self.segments_indexed = 0
+        self.last_error = ""
+
+    @property
+    def path(self):
+        return os.path.join(self.output_dir, f"{self.prefix}_%03d.{self.container}")
+
+    @property
+    def segment_list(self):
+        # Danh sách đoạn đã đóng do ffmpeg ghi (csv: file,start,end); không bắt đầu bằng "record_"
+        # để không bị tính vào quota
+        return os.path.join(self.output_dir, f"segments_{self.prefix}.csv")
+
+    def build_command(self, source, start_number=0):
+        """Dòng lệnh ffmpeg remux một nguồn thành các đoạn file, đánh số từ `start_number`."""
+        cmd = [self.ffmpeg, "-hide_banner", "-loglevel", "warning"]
+        if source.startswith("rtsp://"):
+            cmd += ["-rtsp_transport", self.rtsp_transport]
+        elif not source.startswith(LIVE_PREFIXES):
+            # File làm nguồn giả lập camera: đọc theo tốc độ thực
+            cmd += ["-re"]
+        cmd += [
+            "-i", source,
+            "-map", "0:v:0", "-c", "copy",
+            "-f", "segment",
+            "-segment_time", str(self.segment_seconds),
+            "-segment_format", self.container,
+            "-reset_timestamps", "1",
+            "-segment_start_number", str(start_number),
+            "-segment_list", self.segment_list,
+            "-segment_list_type", "csv",
+        ]
+        if self.container == "mp4":
+            # MP4 phân mảnh: file vẫn hợp lệ dù ffmpeg bị dừng đột ngột
+            cmd += ["-segment_format_options", "movflags=+frag_keyframe+empty_moov+default_base_moof"]
+        cmd.append(self.path)
+        return cmd
+
+    def set_source(self, source):
+        """Đặt/đổi nguồn ghi. Nếu ffmpeg đang chạy với nguồn khác thì đóng nó để mở lại với nguồn mới."""
+        with self._lock:
+            if source == self.source:
+                return
+            switching = self.source is not None
+            self.source = source
+            process = self._process
+        if switching:
+            self.source_switches += 1
+            print(f"[REC] Đổi nguồn ghi passthrough: {source}")
+            self._quit_process(process)
+        self._wake.set()
+
+    def _quit_process(self, process):
+        """Yêu cầu ffmpeg dừng êm ('q' qua stdin) để đóng đoạn đang ghi."""
+        if process is None or process.poll() is not None:
+            return
+        try:
+            process.stdin.write(b"q")
+            process.stdin.flush()
+        except Exception:
+            pass
+
+    def _finish_process(self, process):
+        """Chờ ffmpeg thoát sau khi đã gửi 'q'; quá hạn thì terminate/kill."""
+        try:
+            process.wait(timeout=self.stop_timeout)
+        except subprocess.TimeoutExpired:
+            process.terminate()
+            try:
+                process.wait(timeout=2.0)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+    def run(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._started_at = time.monotonic()
+        failures = 0
+        while self.running:
+            with self._lock:
+                source = self.source
+            if not source:
+                self._wake.wait(0.1)
+                self._wake.clear()
+                continue
+
+            first_number = self._next_segment_number()
+            cmd = self.build_command(source, first_number)
+            # ffmpeg ghi lại danh sách từ đầu mỗi lần chạy: xóa bản cũ (đã index hết) trước khi chạy
+            try:
+                os.remove(self.segment_list)
+            except OSError:
+                pass
+            try:
+                process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                           stderr=subprocess.PIPE)
+            except OSError as e:
+                self.last_error = str(e)
+                print(f"[REC] Không chạy được ffmpeg: {e}")
+                break
+            with self._lock:
+                self._process = process
+            self.launches += 1
+            launched_at = time.monotonic()
+            launch_wall = time.time()
+            print(f"[REC] Passthrough {source} → {self.output_dir}")
+
+            # Log ffmpeg đọc trên thread phụ (để pipe không bị đầy); ở đây index từng đoạn vừa đóng
+            log_reader = threading.Thread(target=self._read_log, args=(process,), name="rec-ffmpeg-log",
+                                          daemon=True)
+            log_reader.start()
+            indexed = 0
+            while True:
+                try:
+                    process.wait(timeout=self.INDEX_INTERVAL)
+                    break
+                except subprocess.TimeoutExpired:
+                    pass
+                if not self._first_frame_sent and os.path.exists(self.path % first_number):
+                    # ffmpeg chỉ tạo đoạn đầu khi đã có gói đầu tiên (gồm cả gói dùng để dò luồng)
+                    self._first_frame_sent = True
+                    self.first_frame.emit(time.monotonic())
+                indexed = self._index_segments(source, launch_wall, indexed)
+                with self._lock:
+                    if not self.running or self.source != source:
+                        break   # Đã gửi 'q': chờ ffmpeg đóng đoạn (quá hạn thì kill) bên dưới
+            self._finish_process(process)
+            log_reader.join(timeout=1.0)
+            with self._lock:
+                self._process = None
+            # Đoạn cuối được ffmpeg ghi vào danh sách lúc thoát
+            self._index_segments(source, launch_wall, indexed)
+
+            with self._lock:
+                switched = self.source != source
+            if not self.running or switched:
+                failures = 0
+                continue
+            # ffmpeg tự thoát khi chưa được yêu cầu: mất nguồn → chạy lại với backoff
+            self.restarts += 1
+            failures = failures + 1 if time.monotonic() - launched_at < 10.0 else 1
+            delay = min(self.backoff_max, 0.5 * (2 ** (failures - 1)))
+            print(f"[REC] ffmpeg thoát (mã {process.returncode}), chạy lại sau {delay:.1f}s")
+            self._wake.wait(delay)
+            self._wake.clear()
+
+        stats = self.stats()
+        print(f"[REC] Đã dừng passthrough: {stats}")
+        self.recording_finished.emit(self.output_dir, stats)
+
+    def _read_log(self, process):
+        for line in process.stderr:
+            text = line.decode(errors="replace").strip()
+            if text:
+                self.last_error = text
+                print(f"[REC][ffmpeg] {text}")
+
+    def _index_segments(self, source, launch_wall, indexed):
+        """Đưa các đoạn mới đóng (từ dòng thứ `indexed` của danh sách) vào index chung
+        (RecordingStorage) và yêu cầu dọn quota. Trả về số dòng đã xử lý."""
+        try:
+            with open(self.segment_list, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            return indexed
+        # ffmpeg thêm một dòng mỗi khi đóng một đoạn; dòng chưa có xuống dòng là đang ghi dở
+        complete = [line for line in lines if line.endswith("\n")]
+        for line in complete[indexed:]:
+            row = line.strip().split(",")
+            if len(row) < 3:
+                continue
+            try:
+                start, end = float(row[1]), float(row[2])
+            except ValueError:
+                continue
+            self.segments_indexed += 1
+            if self.storage is None:
+                continue
+            self.storage.add_segment(os.path.join(self.output_dir, row[0]), {
+                "start": launch_wall + start, "end": launch_wall + end, "source": source,
+            })
+        return len(complete)
+
+    def _next_segment_number(self):
+        """Số thứ tự sau đoạn lớn nhất đã có trên đĩa (kể cả đoạn dở của lần chạy bị kill)."""
+        numbers = []
+        for path in self.segments():
+            suffix = os.path.splitext(os.path.basename(path))[0][len(self.prefix) + 1:]
+            if suffix.isdigit():
+                numbers.append(int(suffix))
+        return max(numbers) + 1 if numbers else 0
+
+    def stop(self):
+        # Không chặn GUI: gửi 'q' cho ffmpeg, luồng tự chờ ffmpeg đóng file rồi kết thúc
+        self.running = False
+        with self._lock:
+            process = self._process
+        self._quit_process(process)
+        self._wake.set()
+
+    def segments(self):
+        """Danh sách file đoạn đã ghi (theo tên, tức theo thứ tự ghi)."""
+        try:
+            names = sorted(name for name in os.listdir(self.output_dir)
+                           if name.startswith(self.prefix + "_") and name.endswith("." + self.container))
+        except OSError:
+            return []
+        return [os.path.join(self.output_dir, name) for name in names]
+
+    def stats(self):
+        segments = self.segments()
+        total_bytes = 0
+        for path in segments:
+            try:
+                total_bytes += os.path.getsize(path)
+            except OSError:
+                pass
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "mode": "passthrough",
+            "source": self.source,
+            "launches": self.launches,
+            "restarts": self.restarts,
+            "source_switches": self.source_switches,
+            "segments": len(segments),
+            "segments_indexed": self.segments_indexed,
+            "bytes": total_bytes,
+            "mbps": round(total_bytes * 8 / elapsed / 1e6, 2) if elapsed > 0 else 0.0,
+            "last_error": self.last_error,
+        }
+
+
+if __name__ == "__main__":
+    # Thử với file hoặc RTSP giả lập, không cần camera thật:
+    #   python -m components.passthrough_recorder test.mp4 /tmp/rec 20
+    #   (RTSP giả lập: mediamtx + ffmpeg -re -stream_loop -1 -i test.mp4 -c copy -f rtsp rtsp://127.0.0.1:8554/cam)
+    import sys
+    from PyQt5.QtCore import QCoreApplication, QTimer
+    if len(sys.argv) < 3:
+        print("Cách dùng: python -m components.passthrough_recorder <nguồn> <thư mục> [số giây]")
+        sys.exit(1)
+    app = QCoreApplication(sys.argv)
+    recorder = PassthroughRecorder(sys.argv[2], segment_seconds=10)
+    recorder.set_source(sys.argv[1])
+    recorder.finished.connect(app.quit)
+    recorder.start()
+    QTimer.singleShot(int(float(sys.argv[3]) * 1000) if len(sys.argv) > 3 else 20000, recorder.stop)
+    app.exec_()
+    for segment in recorder.segments():
+        print(f"[REC] {segment} ({os.path.getsize(segment)} byte)")
@@ -0,0 +1,172 @@
+import collections
+import threading
+import time
+import numpy as np
+from PyQt5.QtCore import QThread
+from .frame_bus import DROP_OLDEST
+
+
+class PreRecordBuffer(QThread):
+    """Bộ đệm trước sự kiện: luôn giữ N giây gần nhất của một camera trong RAM.
+
+    Lấy mẫu frame từ FrameBus ở `fps` thấp, thu nhỏ về `size` rồi nén JPEG, giữ trong
+    deque giới hạn theo cả thời gian (`seconds`) lẫn bộ nhớ (`max_bytes`). Khi bắt đầu
+    ghi, begin_tail() lấy các chunk này để ghi thành đoạn video trước sự kiện và giữ thêm
+    mọi chunk mới cho tới khi recorder có frame đầu tiên (end_tail), để đoạn trước sự kiện
+    phủ cả thời gian mở main stream / chờ keyframe, không hở với bản ghi.
+    Subscription là drop_oldest depth 1: bộ đệm không bao giờ làm chậm luồng camera.
+    """
+
+    def __init__(self, frame_bus, name="camera", seconds=10.0, fps=10.0, size=(640, 360),
+                 quality=80, max_bytes=48 * 1024 * 1024):
+        super().__init__()
+        self.frame_bus = frame_bus
+        self.name = name
+        self.seconds = seconds
+        self.fps = fps
+        self.size = size
+        self.quality = quality
+        self.max_bytes = max_bytes
+        self.running = True
+        self._chunks = collections.deque()   # (t_grab, pts_ms, jpeg bytes)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._tail = None   # Chunk giữ từ begin_tail() tới end_tail(), không bị loại
+        self._resized = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        self._subscription = None
+
+        # Bộ đếm
+        self.encoded = 0
+        self.evicted_age = 0
+        self.evicted_budget = 0
+        self.encode_errors = 0
+        self._encode_ms_total = 0.0
+
+    def run(self):
+        self._subscription = self.frame_bus.subscribe(f"pre-record-{self.name}", policy=DROP_OLDEST, depth=1)
+        interval = 1.0 / self.fps if self.fps else 0.0
+        last_sample = 0.0
+        import cv2   # Nạp trên thread nén, không phải lúc khởi động giao diện
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(self.quality)]
+        while self.running:
+            packet = self._subscription.get(timeout=0.2)
+            if packet is None:
+                continue
+            meta = packet.meta or {}
+            t_grab = meta.get("t_grab", time.monotonic())
+            if t_grab - last_sample < interval:
+                continue
+            last_sample = t_grab
+            t0 = time.monotonic()
+            try:
+                cv2.resize(packet.frame, self.size, dst=self._resized, interpolation=cv2.INTER_AREA)
+                ok, jpeg = cv2.imencode(".jpg", self._resized, params)
+            except Exception as e:
+                ok = False
+                print(f"[PRE_REC:{self.name}] Lỗi nén frame: {e}")
+            if not ok:
+                self.encode_errors += 1
+                continue
+            self._encode_ms_total += (time.monotonic() - t0) * 1000.0
+            self.encoded += 1
+            self._append(t_grab, meta.get("pts_ms", 0.0), jpeg.tobytes())
+
+    def _append(self, t_grab, pts_ms, data):
+        with self._lock:
+            self._chunks.append((t_grab, pts_ms, data))
+            self._bytes += len(data)
+            if self._tail is not None:
+                self._tail.append((t_grab, pts_ms, data))
+            # Bỏ chunk quá cũ, rồi bỏ tiếp nếu vượt ngân sách bộ nhớ
+            while self._chunks and t_grab - self._chunks[0][0] > self.seconds:
+                self._bytes -= len(self._chunks.popleft()[2])
+                self.evicted_age += 1
+            while self._chunks and self._bytes > self.max_bytes:
+                self._bytes -= len(self._chunks.popleft()[2])
+                self.evicted_budget += 1
+
+    def snapshot(self, until=None):
+        """Bản sao các chunk hiện có (cũ → mới), chỉ lấy chunk có t_grab <= until nếu truyền vào."""
+        with self._lock:
+            if until is None:
+                return list(self._chunks)
+            return [chunk for chunk in self._chunks if chunk[0] <= until]
+
+    def begin_tail(self):
+        """Trả về bản sao các chunk hiện có như snapshot() và bắt đầu giữ mọi chunk mới
+        (kể cả chunk sau này bị loại khỏi deque) cho tới end_tail(), không sót chunk nào ở giữa."""
+        with self._lock:
+            self._tail = []
+            return list(self._chunks)
+
+    def end_tail(self, until=None):
+        """Ngừng giữ và trả về các chunk đã giữ từ begin_tail(), chỉ lấy chunk có t_grab <= until nếu truyền vào."""
+        with self._lock:
+            tail, self._tail = self._tail or [], None
+        if until is None:
+            return tail
+        return [chunk for chunk in tail if chunk[0] <= until]
+
+    def clear(self):
+        with self._lock:
+            self._chunks.clear()
+            self._bytes = 0
+
+    def stop(self):
+        self.running = False
+        if self._subscription is not None:
+            self._subscription.close()
+        self.wait()
+
+    def stats(self):
+        with self._lock:
+            span = self._chunks[-1][0] - self._chunks[0][0] if len(self._chunks) > 1 else 0.0
+            return {
+                "name": self.name,
+                "frames": len(self._chunks),
+                "span_s": round(span, 1),
+                "memory_kb": self._bytes // 1024,
+                "budget_kb": self.max_bytes // 1024,
+                "encoded": self.encoded,
+                "evicted_age": self.evicted_age,
+                "evicted_budget": self.evicted_budget,
+                "encode_errors": self.encode_errors,
+                "encode_ms_mean": round(self._encode_ms_total / self.encoded, 2) if self.encoded else 0.0,
+            }
+
+
+def write_pre_record(chunks, path, fps=10.0):
+    """Giải nén các chunk JPEG và ghi thành file mp4 (chạy trên thread nền).
+
+    Chunk được lấy mẫu theo thời gian capture nên có thể không đều; mỗi chunk được lặp
+    lại theo khoảng thời gian thực tới chunk kế tiếp để thời lượng file đúng thời gian thực.
+    Trả về số frame đã ghi.
+    """
+    if not chunks:
+        return 0
+    import cv2
+    first = cv2.imdecode(np.frombuffer(chunks[0][2], dtype=np.uint8), cv2.IMREAD_COLOR)
+    if first is None:
+        return 0
+    height, width = first.shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    if not writer.isOpened():
+        print(f"[PRE_REC] Không mở được file: {path}")
+        return 0
+    written = 0
+    start = chunks[0][0]
+    try:
+        for i, (t_grab, _pts, data) in enumerate(chunks):
+            frame = first if i == 0 else cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                continue
+            # Ghi tới mốc thời gian của chunk kế tiếp (chunk cuối: một khoảng 1/fps)
+            t_next = chunks[i + 1][0] if i + 1 < len(chunks) else t_grab + 1.0 / fps
+            target = int(round((t_next - start) * fps))
+            while written < target:
+                writer.write(frame)
+                written += 1
+    finally:
+        writer.release()
+    print(f"[PRE_REC] Đã ghi {written} frame trước sự kiện: {path}")
+    return written
@@ -0,0 +1,108 @@
+import threading
+import time
+from .latency_stats import LatencyHistogram
+
+
+class PtzStateCache:
+    """Trạng thái PTZ (pan/tilt/zoom) gần nhất của một camera, đọc từ bộ nhớ.
+
+    - get() không bao giờ gọi camera: trả về giá trị đã lưu kèm tuổi (age); giá trị
+      còn trong `ttl` giây được tính là hit, quá hạn là stale.
+    - PtzWorker ghi vào qua update() mỗi lần đọc được trạng thái, và báo mark_commanded()
+      khi vừa gửi lệnh di chuyển.
+    - refresh_interval(): đang di chuyển (vừa có lệnh, hoặc vị trí vừa đổi trong
+      `settle` giây) thì làm mới nhanh, đứng yên thì làm mới thưa.
+    """
+
+    def __init__(self, name="camera", ttl=1.0, fast_interval=0.25, slow_interval=5.0,
+                 settle=1.5, epsilon=1e-3):
+        self.name = name
+        self.ttl = ttl
+        self.fast_interval = fast_interval
+        self.slow_interval = slow_interval
+        self.settle = settle
+        self.epsilon = epsilon
+        self._lock = threading.Lock()
+        self.pan = None
+        self.tilt = None
+        self.zoom = None
+        self.updated_at = None    # monotonic, lần đọc trạng thái gần nhất
+        self.changed_at = None    # monotonic, lần vị trí thay đổi gần nhất
+        self.commanded_at = None  # monotonic, lần gửi lệnh di chuyển gần nhất
+
+        # Bộ đếm
+        self.hits = 0
+        self.stale = 0
+        self.refreshes = 0
+        self.changes = 0
+        self.refresh_ms = LatencyHistogram()
+
+    def update(self, pan, tilt, zoom, refresh_ms=None, t=None):
+        """Lưu trạng thái vừa đọc từ camera. Trả về True nếu vị trí thay đổi."""
+        t = time.monotonic() if t is None else t
+        with self._lock:
+            changed = self.zoom is None or any(
+                abs(new - old) > self.epsilon
+                for new, old in ((pan, self.pan), (tilt, self.tilt), (zoom, self.zoom)))
+            self.pan, self.tilt, self.zoom = pan, tilt, zoom
+            self.updated_at = t
+            self.refreshes += 1
+            if changed:
+                self.changed_at = t
+                self.changes += 1
+        if refresh_ms is not None:
+            self.refresh_ms.add(refresh_ms)
+        return changed
+
+    def mark_commanded(self, t=None):
+        with self._lock:
+            self.commanded_at = time.monotonic() if t is None else t
+
+    def moving(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            last = max(self.changed_at or 0.0, self.commanded_at or 0.0)
+        return last > 0.0 and now - last < self.settle
+
+    def refresh_interval(self, now=None):
+        """Khoảng thời gian tới lần đọc trạng thái kế tiếp."""
+        return self.fast_interval if self.moving(now) else self.slow_interval
+
+    def fresh(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return self.updated_at is not None and now - self.updated_at <= self.ttl
+
+    def get(self):
+        """Trạng thái đã lưu: {"pan", "tilt", "zoom", "age", "fresh"}; None nếu chưa đọc được lần nào."""
+        now = time.monotonic()
+        with self._lock:
+            if self.updated_at is None:
+                self.stale += 1
+                return None
+            age = now - self.updated_at
+            fresh = age <= self.ttl
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale += 1
+            return {"pan": self.pan, "tilt": self.tilt, "zoom": self.zoom,
+                    "age": age, "fresh": fresh}
+
+    def stats(self):
+        with self._lock:
+            reads = self.hits + self.stale
+            age = time.monotonic() - self.updated_at if self.updated_at is not None else None
+            result = {
+                "name": self.name,
+                "hits": self.hits,
+                "stale": self.stale,
+                "hit_rate": round(self.hits / reads, 3) if reads else 0.0,
+                "refreshes": self.refreshes,
+                "changes": self.changes,
+                "age_s": round(age, 2) if age is not None else None,
+            }
+        result["moving"] = self.moving()
+        result["interval_s"] = self.refresh_interval()
+        result["refresh_ms"] = self.refresh_ms.snapshot()
+        return result
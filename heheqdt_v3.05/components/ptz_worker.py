@@ -0,0 +1,176 @@
+import collections
+import threading
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+from .latency_stats import LatencyHistogram
+from .ptz_state_cache import PtzStateCache
+
+
+class PtzWorker(QThread):
+    """Luồng điều khiển PTZ của một camera: mọi lệnh ONVIF (SOAP) chạy ngoài GUI thread.
+
+    - zoom()/move()/home() chỉ đưa lệnh vào hàng đợi rồi trả về ngay.
+    - Lệnh zoom (và move) liên tiếp còn nằm trong hàng đợi được gộp thành một relative_move:
+      bấm zoom 5 lần trong lúc lệnh trước đang chạy chỉ tốn thêm một vòng SOAP.
+    - Sau khi hàng đợi rỗng mới đọc lại trạng thái (get_ptz) một lần; khi rảnh, nhịp đọc
+      do PtzStateCache quyết định (nhanh khi camera đang di chuyển, thưa khi đứng yên).
+    - Trạng thái đọc được lưu trong `cache` (đọc từ bộ nhớ ở mọi thread) và chỉ được đẩy
+      qua signal status_updated khi vị trí thay đổi hoặc có yêu cầu đọc lại.
+    """
+    status_updated = pyqtSignal(str, dict)   # (tên camera, {"pan", "tilt", "zoom", "t"})
+    error_occurred = pyqtSignal(str, str)    # (tên camera, thông báo lỗi)
+
+    def __init__(self, camera_control, name="camera", max_step=1.0, cache_options=None):
+        super().__init__()
+        self.camera_control = camera_control
+        self.name = name
+        self.max_step = max_step
+        self.cache = PtzStateCache(name=name, **(cache_options or {}))
+        self.running = True
+        self._queue = collections.deque()   # [kind, pan, tilt, zoom]
+        self._cond = threading.Condition()
+        self._busy = False
+        self._status_due = True             # Đọc trạng thái ngay khi bắt đầu
+        self._status_requested = False      # Có bên gọi request_status() đang chờ kết quả
+        self._last_poll = 0.0
+
+        # Bộ đếm
+        self.commands = 0
+        self.coalesced = 0
+        self.moves = 0
+        self.polls = 0
+        self.errors = 0
+        self.move_ms = LatencyHistogram()
+
+    # ----- Gọi từ GUI thread -----
+    def zoom(self, delta):
+        """Zoom tương đối (dương = gần, âm = xa)."""
+        self._enqueue("relative", 0.0, 0.0, delta)
+
+    def move(self, pan, tilt):
+        """Quay tương đối pan/tilt."""
+        self._enqueue("relative", pan, tilt, 0.0)
+
+    def home(self):
+        self._enqueue("home", 0.0, 0.0, 0.0)
+
+    def request_status(self):
+        """Yêu cầu đọc lại trạng thái PTZ (kết quả về qua status_updated)."""
+        with self._cond:
+            self._status_due = True
+            self._status_requested = True
+            self._cond.notify_all()
+
+    def pending(self):
+        """Số lệnh chưa chạy xong (kể cả lệnh đang chạy)."""
+        with self._cond:
+            return len(self._queue) + (1 if self._busy else 0)
+
+    def _enqueue(self, kind, pan, tilt, zoom):
+        with self._cond:
+            self.commands += 1
+            tail = self._queue[-1] if self._queue else None
+            if kind == "relative" and tail is not None and tail[0] == "relative":
+                # Gộp với lệnh tương đối còn đang chờ
+                tail[1] += pan
+                tail[2] += tilt
+                tail[3] += zoom
+                self.coalesced += 1
+            else:
+                self._queue.append([kind, pan, tilt, zoom])
+            self._cond.notify_all()
+
+    def stop(self):
+        self.running = False
+        with self._cond:
+            self._cond.notify_all()
+        self.wait(3000)
+
+    # ----- Luồng PTZ -----
+    def run(self):
+        while self.running:
+            with self._cond:
+                if not self._queue and not self._status_due:
+                    remaining = self.cache.refresh_interval() - (time.monotonic() - self._last_poll)
+                    if remaining > 0:
+                        self._cond.wait(remaining)
+                if not self.running:
+                    break
+                command = self._queue.popleft() if self._queue else None
+                self._busy = command is not None
+            if command is not None:
+                self._execute(command)
+                with self._cond:
+                    self._busy = False
+                    self._status_due = True
+                continue
+            # Hàng đợi rỗng: đọc trạng thái nếu vừa có lệnh, được yêu cầu hoặc tới kỳ
+            if self._status_due or time.monotonic() - self._last_poll >= self.cache.refresh_interval():
+                with self._cond:
+                    self._status_due = False
+                    requested, self._status_requested = self._status_requested, False
+                self._poll(requested)
+
+    def _clamp(self, value):
+        return max(-self.max_step, min(self.max_step, value))
+
+    def _execute(self, command):
+        kind, pan, tilt, zoom = command
+        camera = self.camera_control.camera
+        if camera is None:
+            self._error("Camera chưa kết nối ONVIF")
+            return
+        t0 = time.monotonic()
+        try:
+            if kind == "home":
+                camera.absolute_move(-0.375, 0.983389, 0)
+            elif pan or tilt or zoom:
+                camera.relative_move(self._clamp(pan), self._clamp(tilt), self._clamp(zoom))
+            else:
+                return   # Các lệnh gộp lại triệt tiêu nhau
+        except Exception as e:
+            self._error(f"Lỗi điều khiển PTZ: {e}")
+            return
+        self.cache.mark_commanded()
+        self.moves += 1
+        self.move_ms.add((time.monotonic() - t0) * 1000.0)
+
+    def _poll(self, requested=False):
+        self._last_poll = time.monotonic()
+        camera = self.camera_control.camera
+        if camera is None:
+            return
+        t0 = time.monotonic()
+        try:
+            ptz = camera.get_ptz()
+        except Exception as e:
+            self._error(f"Lỗi đọc trạng thái PTZ: {e}")
+            return
+        self.polls += 1
+        if not ptz or len(ptz) < 3:
+            return
+        changed = self.cache.update(ptz[0], ptz[1], ptz[-1], refresh_ms=(time.monotonic() - t0) * 1000.0)
+        self.camera_control.current_zoom = ptz[-1]
+        if changed or requested:
+            self.status_updated.emit(self.name, {"pan": ptz[0], "tilt": ptz[1], "zoom": ptz[-1],
+                                                 "t": self.cache.updated_at})
+
+    def _error(self, message):
+        self.errors += 1
+        print(f"[PTZ:{self.name}] {message}")
+        self.error_occurred.emit(self.name, message)
+
+    def stats(self):
+        with self._cond:
+            pending = len(self._queue)
+        return {
+            "name": self.name,
+            "commands": self.commands,
+            "coalesced": self.coalesced,
+            "moves": self.moves,
+            "polls": self.polls,
+            "errors": self.errors,
+            "pending": pending,
+            "move_ms": self.move_ms.snapshot(),
+            "cache": self.cache.stats(),
+        }
@@ -1,4 +1,4 @@
-import can
+import threading
 import time
 import struct
 from PyQt5.QtCore import QThread, pyqtSignal
@@ -12,7 +12,7 @@ class ReaderCAN(QThread):
     zoom_out_pressed = pyqtSignal()
     kinh_vach_pressed = pyqtSignal()
     laser_pressed = pyqtSignal()
-    angles_updated = pyqtSignal(dict)       # {"elevation_angle": float, "azimuth_angle": float}
+    angles_updated = pyqtSignal(dict)       # {"elevation": float, "azimuth": float}
     
     def __init__(self, can_interface="can0", bitrate=500000):
         super().__init__()
@@ -20,6 +20,9 @@ class ReaderCAN(QThread):
         self.bitrate = bitrate
         self.running = True
         self.bus = None
+        # Báo cho StartupOrchestrator khi đã mở xong (hoặc lỗi) CAN bus
+        self.opened = threading.Event()
+        self.open_error = None
         
         # Mapping 2 byte cuối của data
         self.COMMAND_MAP = {
@@ -36,19 +39,20 @@ class ReaderCAN(QThread):
         # Debounce: lưu timestamp lần nhận cuối cho mỗi command
         self.last_command_time = {}
         self.DEBOUNCE_MS = 100  # 100ms debounce
-        
-        self.last_angles_time = 0
-        self.ANGLES_DEBOUNCE_MS = 100  # Update angles chỉ nếu thay đổi hoặc sau 100ms
+        # Góc không debounce ở đây: giao diện chỉ lấy giá trị mới nhất mỗi nhịp màn hình (UiUpdateScheduler)
     
     def run(self):
         """Kết nối và đọc dữ liệu CAN."""
         try:
+            # python-can chỉ được nạp khi thread CAN bắt đầu chạy (không làm chậm lúc mở cửa sổ)
+            import can
             self.bus = can.interface.Bus(
                 channel=self.can_interface,
                 bustype='socketcan',
                 bitrate=self.bitrate
             )
             print(f"[CAN] Đang đọc từ {self.can_interface} @ {self.bitrate}bps")
+            self.opened.set()
             
             while self.running:
                 try:
@@ -70,15 +74,14 @@ class ReaderCAN(QThread):
                     
         except Exception as e:
             print(f"[CAN] Không thể mở {self.can_interface}: {e}")
+            if not self.opened.is_set():
+                self.open_error = f"Không thể mở {self.can_interface}: {e}"
+                self.opened.set()
         finally:
             self.cleanup()
             
     def _handle_angle_message(self, msg):
         """Xử lý gói tin góc tầm & hướng - ID 0x2B"""
-        current_time = time.time()
-        if (current_time - self.last_angle_time) < (self.ANGLE_DEBOUNCE_MS / 1000.0):
-            return  # debounce
-
         data_hex = msg.data.hex().upper()
         if len(data_hex) < 4:
             return
@@ -104,14 +107,11 @@ class ReaderCAN(QThread):
             azimuth_deg = azimuth * rate_deg
             print(f"[CAN] Góc nhận được (0x2B): Tầm={elevation_deg:.2f}°, Hướng={azimuth_deg:.2f}°")
 
-            self.last_angle_time = current_time
             angles = {
                 "elevation": round(elevation_deg, 2),
                 "azimuth": round(azimuth_deg, 2)
             }
             self.angles_updated.emit(angles)  # Emit dict copy để an toàn
-            
-            print(f"[CAN] Angles updated: elevation={self.last_angles['elevation']:.2f}, azimuth={self.last_angles['azimuth']:.2f}")
 
         except ValueError:
             print(f"[CAN] Lỗi parse. Raw data = {data_hex}")
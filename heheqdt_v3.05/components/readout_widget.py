@@ -0,0 +1,57 @@
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QPainter, QPen, QColor, QFont
+from PyQt5.QtWidgets import QWidget
+
+
+class ReadoutWidget(QWidget):
+    """Ô hiển thị số tự vẽ, thay cho QTextEdit chỉ đọc.
+
+    QTextEdit là một tài liệu rich-text đầy đủ, bị layout lại mỗi lần setPlainText.
+    Widget này chỉ giữ một chuỗi, vẽ bằng QPainter và bỏ qua update() khi chuỗi không đổi.
+    """
+
+    def __init__(self, parent=None, text="", decimals=2):
+        super().__init__(parent)
+        self.decimals = decimals
+        self._text = str(text)
+        self._background = QColor("black")
+        self._text_pen = QPen(QColor("white"))
+        self._border_pen = QPen(QColor("gray"), 2)
+        self._font = QFont("Arial", 14, QFont.Bold)
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+
+    def text(self):
+        return self._text
+
+    def set_value(self, value):
+        """Đặt giá trị số (làm tròn theo decimals) hoặc chuỗi; chỉ vẽ lại khi chuỗi đổi."""
+        if isinstance(value, (int, float)):
+            text = str(round(value, self.decimals))
+        else:
+            text = str(value)
+        if text == self._text:
+            return
+        self._text = text
+        self.update()
+
+    def set_colors(self, background, text, border, font_size=14, border_thickness=2):
+        """Cập nhật màu theo chế độ ngày/đêm (tương đương stylesheet của QTextEdit cũ)."""
+        self._background = QColor(background)
+        self._text_pen = QPen(QColor(text))
+        self._border_pen = QPen(QColor(border), max(1, border_thickness))
+        self._font = QFont("Arial")
+        self._font.setPixelSize(font_size)
+        self._font.setBold(True)
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        rect = self.rect()
+        painter.fillRect(rect, self._background)
+        width = self._border_pen.width()
+        painter.setPen(self._border_pen)
+        painter.drawRect(rect.adjusted(width // 2, width // 2, -((width + 1) // 2), -((width + 1) // 2)))
+        painter.setPen(self._text_pen)
+        painter.setFont(self._font)
+        painter.drawText(rect, Qt.AlignCenter, self._text)
+        painter.end()
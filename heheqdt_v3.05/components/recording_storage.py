@@ -0,0 +1,238 @@
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+
+class SegmentIndex:
+    """File index dạng JSON lines (append-only) của các đoạn ghi trong thư mục recordings.
+
+    Mỗi dòng: {"file", "start", "end", "frames", "bytes", "source"} cho đoạn đã đóng,
+    hoặc {"file", "evicted": true, "time"} khi đoạn bị xóa do hết quota.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def load(self):
+        """Các đoạn còn trên đĩa, theo thứ tự ghi."""
+        entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue   # Dòng cuối dở dang khi mất điện
+                    if entry.get("evicted"):
+                        entries.pop(entry["file"], None)
+                    else:
+                        entries[entry["file"]] = entry
+        except FileNotFoundError:
+            pass
+        return list(entries.values())
+
+
+class DiskQuotaManager:
+    """Giữ thư mục ghi hình trong giới hạn: xóa đoạn cũ nhất trước.
+
+    Vượt max_bytes (tổng dung lượng file ghi) hoặc dung lượng trống của phân vùng
+    dưới min_free_bytes thì xóa dần file record_* cũ nhất. File đang ghi (trong
+    `protected` hoặc vừa sửa trong `busy_seconds` giây) không bao giờ bị xóa.
+    """
+
+    def __init__(self, directory, max_bytes=None, min_free_bytes=0, prefix="record_", busy_seconds=10.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.min_free_bytes = min_free_bytes
+        self.prefix = prefix
+        self.busy_seconds = busy_seconds
+        self.protected = set()
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+        self.used_bytes = 0
+
+    def free_bytes(self):
+        try:
+            return shutil.disk_usage(self.directory).free
+        except OSError:
+            return 0
+
+    def _files(self):
+        files = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.startswith(self.prefix):
+                        stat = entry.stat()
+                        files.append((stat.st_mtime, entry.path, stat.st_size))
+        except OSError:
+            pass
+        files.sort()
+        return files
+
+    def enforce(self, on_evict=None):
+        """Xóa đoạn cũ nhất cho tới khi đủ điều kiện quota. Trả về danh sách file đã xóa."""
+        files = self._files()
+        self.used_bytes = sum(size for _, _, size in files)
+        free = self.free_bytes()
+        now = time.time()
+        evicted = []
+        for mtime, path, size in files:
+            over_quota = self.max_bytes is not None and self.used_bytes > self.max_bytes
+            low_space = free < self.min_free_bytes
+            if not over_quota and not low_space:
+                break
+            if path in self.protected or now - mtime < self.busy_seconds:
+                continue
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"[STORAGE] Không xóa được {path}: {e}")
+                continue
+            self.used_bytes -= size
+            free += size
+            self.evicted_files += 1
+            self.evicted_bytes += size
+            evicted.append(path)
+            print(f"[STORAGE] Xóa đoạn cũ {os.path.basename(path)} ({size // 1024} KB) do hết quota")
+            if on_evict:
+                on_evict(path)
+        return evicted
+
+    def has_space(self):
+        """Còn đủ chỗ trống để mở đoạn mới sau khi đã dọn."""
+        return self.free_bytes() >= self.min_free_bytes
+
+
+class RecordingStorage:
+    """Lưu trữ ghi hình: đóng đoạn bất đồng bộ, index, quota đĩa và thống kê ghi.
+
+    Một thread nền nhận job: release() VideoWriter (ghi moov atom), fsync file, ghi
+    index rồi dọn quota. Luồng ghi chỉ đưa writer cũ vào hàng đợi và mở đoạn mới,
+    nên ranh giới đoạn không làm khựng việc ghi.
+    """
+
+    def __init__(self, directory, max_gb=None, min_free_mb=512, index_name="index.jsonl"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.index = SegmentIndex(os.path.join(directory, index_name))
+        self.quota = DiskQuotaManager(
+            directory,
+            max_bytes=int(max_gb * 1024 ** 3) if max_gb else None,
+            min_free_bytes=int(min_free_mb * 1024 ** 2),
+        )
+        self._jobs = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="recording-storage", daemon=True)
+        self._lock = threading.Lock()
+
+        # Thống kê
+        self.segments_finalized = 0
+        self.bytes_finalized = 0
+        self.seconds_finalized = 0.0
+        self.finalize_ms_max = 0.0
+        self.finalize_errors = 0
+        self._thread.start()
+
+    def protect(self, path):
+        """Đánh dấu file đang ghi (không được xóa khi dọn quota)."""
+        with self._lock:
+            self.quota.protected.add(path)
+
+    def finalize(self, writer, path, info):
+        """Đưa một đoạn đã ghi xong vào hàng đợi đóng file (không chặn luồng gọi)."""
+        self._jobs.put(("finalize", writer, path, dict(info)))
+
+    def add_segment(self, path, info):
+        """Ghi index cho đoạn do tiến trình khác (ffmpeg) tạo và đã đóng."""
+        self._jobs.put(("index", None, path, dict(info)))
+
+    def enforce(self):
+        """Yêu cầu dọn quota trên thread nền."""
+        self._jobs.put(("enforce", None, None, None))
+
+    def flush(self, timeout=None):
+        """Chờ tới khi mọi job đang chờ đã xong (dùng khi thoát ứng dụng)."""
+        done = threading.Event()
+        self._jobs.put(("barrier", done, None, None))
+        return done.wait(timeout)
+
+    def _run(self):
+        while True:
+            kind, writer, path, info = self._jobs.get()
+            if kind == "barrier":
+                writer.set()
+                continue
+            try:
+                if kind == "finalize":
+                    self._finalize(writer, path, info)
+                elif kind == "index":
+                    self._index(path, info)
+                self.quota.enforce(on_evict=self._on_evict)
+            except Exception as e:
+                self.finalize_errors += 1
+                print(f"[STORAGE] Lỗi xử lý {kind} {path}: {e}")
+
+    def _finalize(self, writer, path, info):
+        t0 = time.monotonic()
+        try:
+            writer.release()
+        except Exception as e:
+            self.finalize_errors += 1
+            print(f"[STORAGE] Lỗi đóng {path}: {e}")
+        # fsync để đoạn đã đóng không mất khi mất điện đột ngột
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            print(f"[STORAGE] Không fsync được {path}: {e}")
+        with self._lock:
+            self.quota.protected.discard(path)
+        self.finalize_ms_max = max(self.finalize_ms_max, (time.monotonic() - t0) * 1000.0)
+        self._index(path, info)
+
+    def _index(self, path, info):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        info["file"] = os.path.basename(path)
+        info["bytes"] = size
+        self.index.append(info)
+        self.segments_finalized += 1
+        self.bytes_finalized += size
+        if info.get("end") and info.get("start"):
+            self.seconds_finalized += max(0.0, info["end"] - info["start"])
+
+    def _on_evict(self, path):
+        self.index.append({"file": os.path.basename(path), "evicted": True, "time": time.time()})
+
+    def has_space(self):
+        return self.quota.has_space()
+
+    def stats(self):
+        return {
+            "free_mb": self.quota.free_bytes() // (1024 ** 2),
+            "used_mb": self.quota.used_bytes // (1024 ** 2),
+            "quota_mb": self.quota.max_bytes // (1024 ** 2) if self.quota.max_bytes else None,
+            "segments": self.segments_finalized,
+            "evicted_files": self.quota.evicted_files,
+            "evicted_mb": round(self.quota.evicted_bytes / 1024 ** 2, 1),
+            "write_mbps": round(self.bytes_finalized * 8 / self.seconds_finalized / 1e6, 2)
+            if self.seconds_finalized else 0.0,
+            "finalize_ms_max": round(self.finalize_ms_max, 1),
+            "pending_jobs": self._jobs.qsize(),
+            "errors": self.finalize_errors,
+        }
@@ -0,0 +1,464 @@
+import collections
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+from .frame_bus import DROP_OLDEST, BLOCK
+from .latency_stats import LatencyTracker
+from .encoder_process import ProcessVideoWriter
+
+# Chính sách khi ring ghi hình đầy (thêm DROP_NEWEST so với FrameBus)
+DROP_NEWEST = "drop_newest"   # Bỏ frame vừa tới, giữ nguyên các frame đang chờ ghi
+RING_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+class FrameRing:
+    """Ring cố định các slot frame cấp phát sẵn, một producer - một consumer.
+
+    put() resize/chép frame thẳng vào một slot trống (không cấp phát mới, và không
+    giữ tham chiếu tới buffer của capture vốn sẽ bị dùng lại). get() trả về chỉ số
+    slot; consumer gọi release() sau khi ghi xong thì slot mới được dùng lại.
+    Khi ring đầy, `policy` quyết định: drop_oldest / drop_newest / block (có timeout).
+    """
+
+    def __init__(self, capacity, size, policy=DROP_OLDEST, block_timeout=0.05):
+        if policy not in RING_POLICIES:
+            raise ValueError(f"Chính sách không hợp lệ: {policy}")
+        width, height = size
+        self.capacity = capacity
+        self.size = size
+        self.policy = policy
+        self.block_timeout = block_timeout
+        # capacity slot cho hàng đợi + 2 slot phía consumer: frame đang giữ chờ CfrPacer
+        # (_held) và frame vừa get() để biết frame đang giữ cần ghi mấy lần
+        slot_count = capacity + 2
+        self.slots = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(slot_count)]
+        self.metas = [None] * slot_count
+        self._free = collections.deque(range(slot_count))
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self.closed = False
+
+        # Bộ đếm
+        self.accepted = 0
+        self.dropped_oldest = 0
+        self.dropped_newest = 0
+        self.block_waits = 0
+        self.high_water = 0
+
+    def put(self, frame, meta=None):
+        """Chép frame vào ring. Trả về False nếu frame bị bỏ hoặc ring đã đóng."""
+        with self._cond:
+            if self.closed:
+                return False
+            if self._full():
+                if self.policy == DROP_NEWEST:
+                    self.dropped_newest += 1
+                    return False
+                if self.policy == BLOCK:
+                    self.block_waits += 1
+                    deadline = time.monotonic() + self.block_timeout
+                    while self._full() and not self.closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    if self.closed:
+                        return False
+                if self._full():
+                    if not self._queue:
+                        # Mọi slot đều đang ở phía consumer: không có frame cũ để bỏ, bỏ frame mới
+                        self.dropped_newest += 1
+                        return False
+                    # drop_oldest (hoặc block quá hạn): lấy lại slot của frame cũ nhất chưa ghi
+                    index = self._queue.popleft()
+                    self.metas[index] = None
+                    self._free.append(index)
+                    self.dropped_oldest += 1
+            index = self._free.popleft()
+
+        # Resize/chép ngoài lock: slot này chỉ producer đang giữ
+        slot = self.slots[index]
+        if frame.shape[1::-1] == self.size:
+            np.copyto(slot, frame)
+        else:
+            cv2.resize(frame, self.size, dst=slot)
+
+        with self._cond:
+            self.metas[index] = meta
+            self._queue.append(index)
+            self.accepted += 1
+            self.high_water = max(self.high_water, len(self._queue))
+            self._cond.notify_all()
+        return True
+
+    def _full(self):
+        return not self._free or len(self._queue) >= self.capacity
+
+    def get(self, timeout=None):
+        """Lấy chỉ số slot tiếp theo cần ghi, None nếu hết timeout hoặc ring đã đóng và rỗng."""
+        with self._cond:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self._queue:
+                if self.closed:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return self._queue.popleft()
+
+    def release(self, index):
+        """Trả slot đã ghi xong về danh sách trống."""
+        with self._cond:
+            self.metas[index] = None
+            self._free.append(index)
+            self._cond.notify_all()
+
+    def close(self):
+        """Không nhận frame mới nữa; consumer vẫn lấy hết các frame đang chờ."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def pending(self):
+        with self._cond:
+            return len(self._queue)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "capacity": self.capacity,
+                "policy": self.policy,
+                "accepted": self.accepted,
+                "dropped_oldest": self.dropped_oldest,
+                "dropped_newest": self.dropped_newest,
+                "block_waits": self.block_waits,
+                "high_water": self.high_water,
+                "pending": len(self._queue),
+            }
+
+
+class CfrPacer:
+    """Đưa luồng frame có tốc độ thay đổi về đúng `fps` cố định theo timestamp capture.
+
+    Frame được "giữ" cho tới khi frame kế tiếp tới: frame giữ được ghi đúng số ô thời
+    gian nó chiếm (lặp lại nếu camera chậm / mất frame, bỏ qua nếu frame tới dày hơn fps).
+    Cùng dãy timestamp luôn cho cùng kết quả, và thời lượng file khớp thời gian thực.
+    Khoảng trống dài hơn max_gap giây (mất stream) không được lấp mà được dời gốc thời gian.
+    """
+
+    def __init__(self, fps, max_gap=2.0):
+        self.fps = fps
+        self.max_gap_frames = max(1, int(round(max_gap * fps)))
+        self.t0 = None
+        self.t_first = None
+        self.t_last = None
+        self.emitted = 0
+        self.frames_in = 0
+        self.duplicated = 0
+        self.dropped = 0
+        self.gaps = 0
+        self.gap_seconds = 0.0
+
+    def advance(self, t):
+        """Frame mới tới lúc t (giây, monotonic). Trả về số lần ghi frame đang giữ trước khi thay nó."""
+        self.frames_in += 1
+        if self.t0 is None:
+            self.t0 = self.t_first = self.t_last = t
+            return 0
+        self.t_last = t
+        start = int(round((t - self.t0) * self.fps))   # Ô thời gian bắt đầu của frame mới
+        gap = start - self.emitted
+        if gap > self.max_gap_frames:
+            # Mất stream lâu: frame giữ chỉ chiếm một ô, frame mới nối tiếp ngay sau
+            self.gaps += 1
+            self.gap_seconds += (gap - 1) / self.fps
+            self.t0 += (gap - 1) / self.fps
+            gap = 1
+        count = max(0, gap)
+        if count == 0:
+            self.dropped += 1
+        else:
+            self.duplicated += count - 1
+        self.emitted += count
+        return count
+
+    def finish(self):
+        """Frame giữ cuối cùng được ghi một lần."""
+        if self.t0 is None:
+            return 0
+        self.emitted += 1
+        return 1
+
+    def report(self):
+        """Số frame kỳ vọng theo thời gian thực so với số frame đã ghi."""
+        span = (self.t_last - self.t_first) if self.t_first is not None else 0.0
+        expected = int(round((span - self.gap_seconds) * self.fps)) + (1 if self.t_first is not None else 0)
+        return {
+            "fps": self.fps,
+            "frames_in": self.frames_in,
+            "frames_out": self.emitted,
+            "expected": expected,
+            "duplicated": self.duplicated,
+            "dropped": self.dropped,
+            "gaps": self.gaps,
+            "gap_seconds": round(self.gap_seconds, 2),
+            "drift_ms": round((self.emitted - expected) * 1000.0 / self.fps, 1) if self.fps else 0.0,
+            "input_fps": round((self.frames_in - 1) / (span - self.gap_seconds), 2)
+            if span - self.gap_seconds > 0 else 0.0,
+        }
+
+
+class RecordingWorker(QThread):
+    """Worker ghi hình: đọc frame từ subscription trên FrameBus của camera đang hiển thị.
+
+    Hai chặng:
+    - intake (thread phụ): lấy frame từ subscription, resize vào FrameRing cấp phát sẵn.
+    - writer (QThread này): lấy slot từ ring, ghi bằng cv2.VideoWriter.
+    stop() không chặn GUI: intake dừng nhận frame, writer ghi nốt các frame đã nằm
+    trong ring rồi mới release() file, nên đuôi video không bị cắt.
+
+    Với `encoder` (EncoderProcess), việc mã hóa chạy ở tiến trình riêng: writer chỉ chép
+    frame vào shared memory, không tranh GIL với GUI/VideoThread/CAN.
+
+    VideoWriter chỉ ghi được tốc độ cố định, nên CfrPacer quyết định (theo t_grab của
+    từng frame) mỗi frame được ghi mấy lần: file luôn phát đúng tốc độ, thời lượng khớp
+    thời gian thực dù camera chạy nhanh/chậm hơn `fps` hay bị mất frame.
+
+    Với segment_seconds > 0, file được chia thành các đoạn <path>_000.mp4, _001...
+    theo số frame (fps * segment_seconds). Writer của đoạn cũ được giao cho
+    RecordingStorage đóng + fsync + ghi index trên thread nền, luồng ghi chỉ mở đoạn mới.
+
+    Với `hud` (HudRenderer), HUD được blend thẳng vào slot của ring trước khi ghi,
+    chỉ với frame thực sự được ghi (frame bị CfrPacer bỏ không tốn chi phí vẽ).
+    """
+    recording_finished = pyqtSignal(str, dict)   # (đường dẫn file, thống kê)
+    error_occurred = pyqtSignal(str)             # Lỗi ghi (hết chỗ trống, không mở được file)
+    first_frame = pyqtSignal(float)              # t_grab (monotonic) của frame đầu tiên được ghi
+
+    LOW_SPACE_CHECKS = 3   # Số lần kiểm tra liên tiếp (mỗi giây) vẫn thiếu chỗ thì dừng ghi
+
+    def __init__(self, path, fps=30.0, size=(1280, 720), ring_size=16, drop_policy=DROP_OLDEST,
+                 segment_seconds=0, storage=None, source=None, encoder=None, max_gap=2.0, hud=None):
+        super().__init__()
+        self.path = path
+        self.fps = fps
+        self.size = size
+        self.ring = FrameRing(ring_size, size, policy=drop_policy)
+        self.subscription = None
+        self.latency = None
+        self.running = True
+        self.writer = None
+        self._sub_lock = threading.Lock()
+        self._intake = None
+        # Chia đoạn
+        self.segment_frames = int(round(fps * segment_seconds)) if segment_seconds else 0
+        self.storage = storage
+        self.source = source
+        self.encoder = encoder
+        self.pacer = CfrPacer(fps, max_gap=max_gap)
+        self.hud = hud
+        self._held = None   # Slot frame đang giữ chờ biết thời lượng
+        self.segment_path = None
+        self._segment_index = 0
+        self._segment_start = None
+        self._segment_written = 0
+        self._low_space = 0
+        self._failed = False
+
+        # Bộ đếm
+        self.frames_written = 0
+        self.write_errors = 0
+        self.segments = 0
+        self.flushed_on_stop = 0   # Số frame còn trong ring lúc stop() và vẫn được ghi
+        self.flush_seconds = 0.0
+
+    def set_subscription(self, subscription, latency=None):
+        """Đổi nguồn frame (khi chuyển camera trong lúc ghi)."""
+        with self._sub_lock:
+            old = self.subscription
+            self.subscription = subscription
+            self.latency = latency
+        if old is not None:
+            old.close()
+
+    def _intake_loop(self):
+        """Chặng nhận: subscription → ring (chạy trên thread phụ)."""
+        while self.running:
+            subscription = self.subscription
+            if subscription is None:
+                time.sleep(0.005)
+                continue
+            # Chờ frame có timeout để còn kiểm tra cờ running
+            packet = subscription.get(timeout=0.1)
+            if packet is None:
+                continue
+            try:
+                self.ring.put(packet.frame, packet.meta)
+            except Exception as e:
+                print(f"[REC] Lỗi nhận frame: {e}")
+
+    def _next_segment_path(self):
+        if not self.segment_frames:
+            return self.path
+        root, ext = os.path.splitext(self.path)
+        return f"{root}_{self._segment_index:03d}{ext}"
+
+    def _open_segment(self):
+        """Mở đoạn mới. Trả về False nếu không mở được (hết chỗ trống / lỗi file)."""
+        if self.storage is not None and not self.storage.has_space():
+            self._fail("Không đủ dung lượng trống để ghi hình")
+            return False
+        path = self._next_segment_path()
+        if self.encoder is not None:
+            writer = ProcessVideoWriter(self.encoder, path, "mp4v", self.fps)
+        else:
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), self.fps, self.size)
+        if not writer.isOpened():
+            self._fail(f"Không mở được file ghi: {path}")
+            return False
+        if self.storage is not None:
+            self.storage.protect(path)
+        self.writer = writer
+        self.segment_path = path
+        self._segment_index += 1
+        self._segment_start = time.time()
+        self._segment_written = 0
+        self.segments += 1
+        return True
+
+    def _close_segment(self):
+        """Giao đoạn hiện tại cho RecordingStorage đóng bất đồng bộ (không có storage thì đóng ngay)."""
+        writer, path = self.writer, self.segment_path
+        self.writer = None
+        if writer is None:
+            return
+        info = {"start": self._segment_start, "end": time.time(), "frames": self._segment_written,
+                "fps": self.fps, "source": self.source}
+        if self.storage is not None:
+            self.storage.finalize(writer, path, info)
+        else:
+            try:
+                writer.release()
+            except Exception:
+                pass
+
+    def _check_space(self):
+        """Mỗi giây kiểm tra dung lượng trống; thiếu thì yêu cầu dọn quota, thiếu mãi thì dừng ghi."""
+        if self.storage is None or self.storage.has_space():
+            self._low_space = 0
+            return True
+        self._low_space += 1
+        self.storage.enforce()
+        if self._low_space >= self.LOW_SPACE_CHECKS:
+            self._fail("Hết dung lượng lưu trữ, đã dừng ghi hình")
+            return False
+        return True
+
+    def _fail(self, message):
+        self._failed = True
+        print(f"[REC] {message}")
+        self.error_occurred.emit(message)
+        self.stop()
+
+    def run(self):
+        if not self._open_segment():
+            return
+        self._intake = threading.Thread(target=self._intake_loop, name="rec-intake", daemon=True)
+        self._intake.start()
+
+        check_every = max(1, int(round(self.fps)))
+        flush_start = None
+        while True:
+            index = self.ring.get(timeout=0.1)
+            if index is None:
+                if self.ring.closed:
+                    break   # Đã dừng và ring rỗng
+                continue
+            if self.ring.closed:
+                if flush_start is None:
+                    flush_start = time.monotonic()
+                self.flushed_on_stop += 1
+            if self._failed:
+                # Đã lỗi (hết chỗ / không mở được file): chỉ xả ring, không ghi nữa
+                self.ring.release(index)
+                continue
+            meta = self.ring.metas[index] or {}
+            t_grab = meta.get("t_grab", time.monotonic())
+            if self.pacer.t_first is None:
+                self.first_frame.emit(t_grab)
+            # Frame đang giữ được ghi đúng số ô thời gian tới lúc frame mới được capture
+            count = self.pacer.advance(t_grab)
+            self._write_held(count, check_every)
+            self._held = index
+
+        self._write_held(self.pacer.finish() if self._held is not None else 0, check_every)
+        if flush_start is not None:
+            self.flush_seconds = time.monotonic() - flush_start
+        self._intake.join(timeout=1.0)
+        # Chỉ đóng đoạn cuối sau khi đã ghi hết các frame trong ring
+        self._close_segment()
+        stats = self.stats()
+        print(f"[REC] Đã dừng ghi {self.path}: {stats}")
+        self.recording_finished.emit(self.path, stats)
+
+    def _write_held(self, count, check_every):
+        """Ghi frame đang giữ `count` lần (0 = bỏ) rồi trả slot về ring."""
+        index = self._held
+        if index is None:
+            return
+        self._held = None
+        try:
+            if count and self.hud is not None:
+                meta = self.ring.metas[index] or {}
+                self.hud.render(self.ring.slots[index], meta.get("t_grab"))
+            for _ in range(count):
+                if self._failed:
+                    break
+                if self.writer is None or not self.writer.isOpened() or \
+                        (self.segment_frames and self._segment_written >= self.segment_frames):
+                    # Ranh giới đoạn (hoặc tiến trình encoder vừa khởi động lại):
+                    # đóng đoạn cũ trên thread nền, mở đoạn mới ngay
+                    self._close_segment()
+                    if not self._open_segment():
+                        break
+                self.writer.write(self.ring.slots[index])
+                self.frames_written += 1
+                self._segment_written += 1
+                if self.frames_written % check_every == 0:
+                    self._check_space()
+            latency = self.latency
+            meta = self.ring.metas[index]
+            if count and latency is not None:
+                LatencyTracker.mark(meta, "t_recorded")
+                latency.observe(meta, "record")
+        except Exception as e:
+            self.write_errors += 1
+            print(f"[REC] Lỗi ghi frame: {e}")
+        finally:
+            self.ring.release(index)
+
+    def stop(self):
+        # Yêu cầu dừng không chặn GUI thread: ngừng nhận frame, writer tự ghi nốt ring rồi đóng file
+        self.running = False
+        with self._sub_lock:
+            subscription = self.subscription
+            self.subscription = None
+        if subscription is not None:
+            subscription.close()
+        self.ring.close()
+
+    def stats(self):
+        return {
+            "frames_written": self.frames_written,
+            "write_errors": self.write_errors,
+            "segments": self.segments,
+            "flushed_on_stop": self.flushed_on_stop,
+            "flush_seconds": round(self.flush_seconds, 3),
+            "timing": self.pacer.report(),
+            "ring": self.ring.stats(),
+            "hud": self.hud.stats() if self.hud is not None else None,
+        }
@@ -1,4 +1,4 @@
-import serial
+import threading
 import time
 from PyQt5.QtCore import QThread, pyqtSignal
 
@@ -14,6 +14,9 @@ class SensorReader(QThread):
         self.timeout = timeout
         self.running = True
         self.serial = None
+        # Báo cho StartupOrchestrator khi đã mở xong (hoặc lỗi) cổng serial
+        self.opened = threading.Event()
+        self.open_error = None
         self.frame = bytes([0x55, 0x02, 0x02, 0x03, 0xE8, 0xBE])
 
          # frame_single: single-shot (CMD=0x01, LEN=0x02, DATAH=0x00, DATAL=0x00, CHK=0x56)
@@ -139,6 +142,7 @@ class SensorReader(QThread):
     def run(self):
         # mở cổng
         try:
+            import serial   # pyserial chỉ nạp khi thread đọc cảm biến bắt đầu chạy
             self.serial = serial.Serial(
                 port=self.port,
                 baudrate=self.baudrate,
@@ -157,8 +161,11 @@ class SensorReader(QThread):
             # time.sleep(0.1) 
             
         except Exception as e:
-            self.error_occurred.emit(f"Cannot open serial {self.port}: {e}")
+            self.open_error = f"Cannot open serial {self.port}: {e}"
+            self.opened.set()
+            self.error_occurred.emit(self.open_error)
             return
+        self.opened.set()
 
         while self.running:
             try:
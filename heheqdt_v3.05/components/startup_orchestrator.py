@@ -0,0 +1,151 @@
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from PyQt5.QtCore import QObject, pyqtSignal
+from .startup_profiler import profiler
+
+# Trạng thái của từng thiết bị trong báo cáo khởi động
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+TIMEOUT = "timeout"
+
+
+def probe_tcp(url, default_port=554, timeout=3.0):
+    """Thử mở kết nối TCP tới host:port của một URL (rtsp://...). Trả về thời gian kết nối (ms)."""
+    parsed = urlparse(url)
+    if not parsed.hostname:
+        raise ValueError(f"Không có host trong nguồn: {url}")
+    t0 = time.monotonic()
+    with socket.create_connection((parsed.hostname, parsed.port or default_port), timeout=timeout):
+        pass
+    return round((time.monotonic() - t0) * 1000.0, 1)
+
+
+def wait_opened(device, timeout):
+    """Chờ một QThread thiết bị (có `opened` Event và `open_error`) mở xong cổng của nó."""
+    if not device.opened.wait(timeout):
+        raise TimeoutError("chưa mở xong")
+    if device.open_error:
+        raise RuntimeError(device.open_error)
+    return True
+
+
+class StartupOrchestrator(QObject):
+    """Kết nối song song mọi thiết bị lúc khởi động, không chặn GUI thread.
+
+    Mỗi thiết bị là một hàm chặn (kết nối ONVIF, probe RTSP, chờ CAN/serial/TCP mở)
+    chạy trong ThreadPoolExecutor với timeout riêng. Kết quả về GUI qua signal
+    (queued connection) để từng phần giao diện được bật ngay khi thiết bị của nó sẵn sàng.
+    Thiết bị quá hạn được báo timeout nhưng vẫn chạy tiếp; nếu sau đó kết nối được
+    thì device_ready vẫn được phát (ghi "late" trong báo cáo).
+    """
+    device_ready = pyqtSignal(str, object)   # (tên thiết bị, kết quả)
+    device_failed = pyqtSignal(str, str)     # (tên thiết bị, lỗi)
+    all_done = pyqtSignal(dict)              # Báo cáo thời gian khởi động
+
+    def __init__(self, max_workers=8, parent=None):
+        super().__init__(parent)
+        self.max_workers = max_workers
+        self.t0 = time.monotonic()
+        self._tasks = []
+        self._devices = {}
+        self._milestones = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._remaining = 0
+
+    def add(self, name, fn, timeout=5.0):
+        """Đăng ký một thiết bị: fn() chạy trên thread pool, trả về kết quả hoặc raise khi lỗi."""
+        self._tasks.append((name, fn, timeout))
+        self._devices[name] = {"status": PENDING, "timeout_s": timeout}
+
+    def mark(self, name):
+        """Ghi một mốc thời gian (vd. "ui_shown") vào báo cáo (và vào startup profiler nếu bật)."""
+        self._milestones[name] = round((time.monotonic() - self.t0) * 1000.0, 1)
+        profiler.mark(name)
+
+    def start(self):
+        self._remaining = len(self._tasks)
+        if not self._tasks:
+            # Không có thiết bị nào cần mở: báo xong ngay để bên chờ all_done không bị treo
+            self._emit_report()
+            return
+        self._executor = ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(self._tasks))),
+                                            thread_name_prefix="startup")
+        for name, fn, timeout in self._tasks:
+            with self._lock:
+                self._devices[name]["start_ms"] = round((time.monotonic() - self.t0) * 1000.0, 1)
+            future = self._executor.submit(fn)
+            timer = threading.Timer(timeout, self._on_timeout, args=(name,))
+            timer.daemon = True
+            timer.start()
+            future.add_done_callback(lambda f, n=name, t=timer: self._on_done(n, f, t))
+        # Không chờ: các task chưa xong vẫn chạy, pool tự giải phóng khi xong hết
+        self._executor.shutdown(wait=False)
+
+    def _elapsed_ms(self):
+        return round((time.monotonic() - self.t0) * 1000.0, 1)
+
+    def _on_timeout(self, name):
+        with self._lock:
+            device = self._devices[name]
+            if device["status"] != PENDING:
+                return
+            device["status"] = TIMEOUT
+            device["ms"] = self._elapsed_ms() - device["start_ms"]
+        print(f"[STARTUP] {name}: quá hạn {device['timeout_s']}s, tiếp tục chờ ở nền")
+        self.device_failed.emit(name, f"Quá hạn {device['timeout_s']}s")
+        self._finish_one()
+
+    def _on_done(self, name, future, timer):
+        timer.cancel()
+        error = future.exception()
+        with self._lock:
+            device = self._devices[name]
+            late = device["status"] == TIMEOUT
+            device["ms"] = self._elapsed_ms() - device["start_ms"]
+            if error is None:
+                device["status"] = READY
+            elif not late:
+                device["status"] = FAILED
+            if late:
+                device["late"] = True
+            if error is not None:
+                device["error"] = str(error)
+        if error is None:
+            print(f"[STARTUP] {name}: sẵn sàng sau {device['ms']:.0f} ms" + (" (muộn)" if late else ""))
+            self.device_ready.emit(name, future.result())
+        elif not late:
+            print(f"[STARTUP] {name}: lỗi sau {device['ms']:.0f} ms: {error}")
+            self.device_failed.emit(name, str(error))
+        if not late:
+            self._finish_one()
+
+    def _finish_one(self):
+        with self._lock:
+            self._remaining -= 1
+            done = self._remaining == 0
+        if done:
+            self._emit_report()
+
+    def _emit_report(self):
+        report = self.report()
+        print(f"[STARTUP] Hoàn tất sau {report['total_ms']:.0f} ms: "
+              + ", ".join(f"{name}={d['status']}({d.get('ms', 0):.0f}ms)"
+                          for name, d in report["devices"].items()))
+        self.all_done.emit(report)
+
+    def report(self):
+        """Thời gian từng thiết bị, các mốc và tổng thời gian tới khi mọi thiết bị có kết quả."""
+        with self._lock:
+            devices = {name: dict(d) for name, d in self._devices.items()}
+        finished = [d["start_ms"] + d["ms"] for d in devices.values() if "ms" in d]
+        return {
+            "devices": devices,
+            "milestones": dict(self._milestones),
+            "total_ms": round(max(finished), 1) if finished else 0.0,
+            "sequential_ms": round(sum(d.get("ms", 0.0) for d in devices.values()), 1),
+        }
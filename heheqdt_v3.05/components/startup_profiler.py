@@ -0,0 +1,258 @@
+import contextlib
+import os
+import sys
+import sysconfig
+import threading
+import time
+
+# Bật bằng biến môi trường hoặc cờ dòng lệnh: HEHEQDT_STARTUP_PROFILE=1 python main.py
+#                                            python main.py --profile-startup
+ENV_VAR = "HEHEQDT_STARTUP_PROFILE"
+FLAG = "--profile-startup"
+
+_STDLIB = getattr(sys, "stdlib_module_names", None)
+_STDLIB_PATH = sysconfig.get_paths()["stdlib"]
+
+
+def _is_stdlib(name, spec):
+    root = name.partition(".")[0]
+    if root in sys.builtin_module_names:
+        return True
+    if _STDLIB is not None:
+        return root in _STDLIB
+    origin = getattr(spec, "origin", None) or ""
+    return origin.startswith(_STDLIB_PATH) and "-packages" not in origin
+
+
+class _TimedLoader:
+    """Bọc loader thật của một module để đo thời gian create_module + exec_module."""
+
+    def __init__(self, loader, finder):
+        self.loader = loader
+        self.finder = finder
+
+    def create_module(self, spec):
+        with self.finder.timing(spec.name):
+            return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        # Trả lại loader thật cho module (importlib.resources, pkgutil... dùng __loader__)
+        module.__loader__ = self.loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self.loader
+        with self.finder.timing(module.__name__):
+            self.loader.exec_module(module)
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+
+class _ImportTimer:
+    """Meta path finder chỉ để đo: tìm spec qua các finder còn lại rồi bọc loader.
+
+    Đo module ngoài thư viện chuẩn, sâu tối đa 2 cấp (cv2, PyQt5.QtWidgets, components.video_widget).
+    Thời gian là cộng dồn (gồm module con), kèm thời gian riêng (self) như `python -X importtime`.
+    """
+
+    def __init__(self, profiler, max_depth=2):
+        self.profiler = profiler
+        self.max_depth = max_depth
+        self._local = threading.local()
+
+    def find_spec(self, name, path=None, target=None):
+        if name.count(".") >= self.max_depth or getattr(self._local, "searching", False):
+            return None
+        self._local.searching = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self:
+                    continue
+                if not hasattr(finder, "find_spec"):
+                    return None   # Finder kiểu cũ: để hệ thống import tự xử lý như bình thường
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.searching = False
+        loader = spec.loader
+        if loader is not None and hasattr(loader, "exec_module") and not _is_stdlib(name, spec):
+            spec.loader = _TimedLoader(loader, self)
+        return spec
+
+    @contextlib.contextmanager
+    def timing(self, name):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)   # Tổng thời gian của các module con đo được bên trong
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = (time.monotonic() - t0) * 1000.0
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.profiler._record_import(name, elapsed, elapsed - children, nested=bool(stack))
+
+
+class StartupProfiler:
+    """Đo thời gian khởi động: import từng module/hệ con, init từng phần, các mốc
+    (cửa sổ hiện, frame video đầu tiên) và kết quả StartupOrchestrator.
+
+    Tắt mặc định; khi tắt mọi hàm trả về ngay, không cài hook import.
+    Báo cáo được in một lần khi mọi phần đang chờ (wait_for) đã xong, hoặc sau `timeout` giây.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.t0 = time.monotonic()
+        self._lock = threading.Lock()
+        self._hook = None
+        self._imports = {}
+        self._spans = []
+        self._milestones = {}
+        self._sections = {}
+        self._waiting = set()
+        self._done = set()
+        self._reported = False
+
+    def configure(self, argv=None, t0=None):
+        """Bật profiler nếu có cờ --profile-startup (được gỡ khỏi argv) hoặc biến môi trường."""
+        requested = os.environ.get(ENV_VAR) == "1"
+        if argv is not None and FLAG in argv:
+            argv.remove(FLAG)
+            requested = True
+        if requested:
+            self.enable(t0)
+        return self.enabled
+
+    def enable(self, t0=None):
+        if self.enabled:
+            return
+        self.enabled = True
+        if t0 is not None:
+            self.t0 = t0
+        self._hook = _ImportTimer(self)
+        sys.meta_path.insert(0, self._hook)
+        print(f"[PROFILE] Bật startup profiler ({ENV_VAR}=1 hoặc {FLAG})")
+
+    def _now_ms(self):
+        return round((time.monotonic() - self.t0) * 1000.0, 1)
+
+    def _record_import(self, name, ms, self_ms, nested):
+        with self._lock:
+            entry = self._imports.get(name)
+            if entry is None:
+                entry = self._imports[name] = {"ms": 0.0, "self_ms": 0.0, "at_ms": self._now_ms() - ms,
+                                               "thread": threading.current_thread().name, "nested": nested}
+            entry["ms"] += ms
+            entry["self_ms"] += self_ms
+
+    def span(self, name, kind="init"):
+        """Đo một đoạn khởi tạo: `with profiler.span("video_player"): ...`."""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._span(name, kind)
+
+    @contextlib.contextmanager
+    def _span(self, name, kind):
+        start = self._now_ms()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._spans.append({"name": name, "kind": kind, "start_ms": start,
+                                    "ms": round(self._now_ms() - start, 1),
+                                    "thread": threading.current_thread().name})
+
+    def mark(self, name):
+        """Ghi một mốc (chỉ lần đầu), ms tính từ lúc tiến trình bắt đầu chạy main.py."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._milestones.setdefault(name, self._now_ms())
+
+    def wait_for(self, *keys, timeout=30.0):
+        """Chỉ in báo cáo khi các phần `keys` đã done(), hoặc sau `timeout` giây."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._waiting.update(set(keys) - self._done)
+            ready = not self._waiting
+        if ready:
+            self.finish()
+            return
+        timer = threading.Timer(timeout, self.finish)
+        timer.daemon = True
+        timer.start()
+
+    def done(self, key, data=None):
+        if not self.enabled:
+            return
+        with self._lock:
+            if data is not None:
+                self._sections[key] = data
+            self._done.add(key)
+            if key not in self._waiting:
+                return
+            self._waiting.discard(key)
+            ready = not self._waiting
+        if ready:
+            self.finish()
+
+    def finish(self):
+        """In báo cáo (một lần)."""
+        with self._lock:
+            if not self.enabled or self._reported:
+                return
+            self._reported = True
+            missing = sorted(self._waiting)
+        # Import sau thời điểm này không còn thuộc khởi động: gỡ hook đo
+        if self._hook in sys.meta_path:
+            sys.meta_path.remove(self._hook)
+        report = self.report()
+        if missing:
+            print(f"[PROFILE] Hết thời gian chờ, chưa có: {', '.join(missing)}")
+        self.print_report(report)
+
+    def report(self, min_ms=5.0, limit=25):
+        with self._lock:
+            imports = {name: dict(entry) for name, entry in self._imports.items()}
+            spans = list(self._spans)
+            milestones = dict(self._milestones)
+            sections = dict(self._sections)
+        top_level = [e for e in imports.values() if not e["nested"]]
+        slowest = sorted(((name, e) for name, e in imports.items() if e["ms"] >= min_ms),
+                         key=lambda item: item[1]["ms"], reverse=True)[:limit]
+        return {
+            "milestones": milestones,
+            "import_total_ms": round(sum(e["ms"] for e in top_level), 1),
+            "imports": [dict(module=name, ms=round(e["ms"], 1), self_ms=round(e["self_ms"], 1),
+                             at_ms=round(e["at_ms"], 1), thread=e["thread"]) for name, e in slowest],
+            "init": spans,
+            "sections": sections,
+        }
+
+    def print_report(self, report=None):
+        report = report or self.report()
+        print("[PROFILE] ===== Khởi động =====")
+        for name, ms in sorted(report["milestones"].items(), key=lambda item: item[1]):
+            print(f"[PROFILE] mốc {name:<22} {ms:>9.1f} ms")
+        print(f"[PROFILE] import (tổng các import cấp ngoài): {report['import_total_ms']:.1f} ms")
+        for entry in report["imports"]:
+            print(f"[PROFILE]   import {entry['module']:<32} {entry['ms']:>8.1f} ms "
+                  f"(riêng {entry['self_ms']:.1f}, lúc {entry['at_ms']:.0f} ms, {entry['thread']})")
+        for span in report["init"]:
+            print(f"[PROFILE]   {span['kind']} {span['name']:<26} {span['ms']:>8.1f} ms "
+                  f"(lúc {span['start_ms']:.0f} ms, {span['thread']})")
+        devices = report["sections"].get("devices")
+        if devices:
+            for name, device in devices.get("devices", {}).items():
+                print(f"[PROFILE]   thiết bị {name:<24} {device.get('ms', 0):>8.1f} ms ({device['status']})")
+
+
+# Dùng chung cho cả tiến trình
+profiler = StartupProfiler()
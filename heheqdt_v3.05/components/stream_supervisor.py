@@ -0,0 +1,172 @@
+import random
+import threading
+import time
+from .capture_backend import make_opener
+
+# Trạng thái của stream
+CONNECTING = "connecting"
+STREAMING = "streaming"
+STALLED = "stalled"
+RECONNECTING = "reconnecting"
+STOPPED = "stopped"
+
+
+class StreamSupervisor:
+    """Giám sát một nguồn video: mở lại với backoff, phát hiện stall, giới hạn tần suất báo lỗi.
+
+    Chu trình trạng thái:
+        connecting → streaming → stalled → reconnecting → streaming ...
+    - Mở lại capture (cv2.VideoCapture hoặc pipeline GStreamer) với backoff lũy thừa
+      (base * 2^n, tối đa backoff_max) có jitter.
+    - Stall: không có frame trong stall_timeout giây hoặc quá max_read_failures lần đọc lỗi liên tiếp.
+    - Lỗi chỉ được báo tối đa một lần mỗi error_interval giây (kèm số lỗi đã gộp).
+    - Đếm số lần reconnect và tổng thời gian mất hình.
+    """
+
+    def __init__(self, source, name="camera", open_capture=None, capture_options=None,
+                 stall_timeout=3.0, open_timeout=5.0,
+                 max_read_failures=25, backoff_base=0.5, backoff_max=30.0, jitter=0.2,
+                 error_interval=5.0, on_state=None, on_error=None):
+        self.source = source
+        self.name = name
+        self.stall_timeout = stall_timeout
+        self.open_timeout = open_timeout
+        # Backend capture (opencv / gstreamer) theo config, có thể truyền thẳng hàm mở
+        self.open_capture = open_capture or make_opener(capture_options, open_timeout, stall_timeout)
+        self.max_read_failures = max_read_failures
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.error_interval = error_interval
+        self.on_state = on_state    # callback(state)
+        self.on_error = on_error    # callback(message), đã được giới hạn tần suất
+
+        self.state = CONNECTING
+        self._stop_event = threading.Event()
+        self._attempt = 0
+        self._read_failures = 0
+        self._last_frame_time = None
+        self._outage_start = None
+        self._last_error_time = 0.0
+        self._suppressed_errors = 0
+
+        # Bộ đếm
+        self.connects = 0
+        self.reconnects = 0
+        self.open_failures = 0
+        self.stalls = 0
+        self.outage_total = 0.0
+        self.longest_outage = 0.0
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        self.state = state
+        print(f"[STREAM:{self.name}] → {state}")
+        if self.on_state:
+            self.on_state(state)
+
+    def _report_error(self, message):
+        """Báo lỗi có giới hạn tần suất, tránh dồn signal lên GUI."""
+        now = time.monotonic()
+        if now - self._last_error_time < self.error_interval:
+            self._suppressed_errors += 1
+            return
+        if self._suppressed_errors:
+            message = f"{message} (+{self._suppressed_errors} lỗi tương tự)"
+        self._last_error_time = now
+        self._suppressed_errors = 0
+        print(f"[STREAM:{self.name}] {message}")
+        if self.on_error:
+            self.on_error(message)
+
+    def _backoff_delay(self):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** self._attempt))
+        return delay * random.uniform(1.0 - self.jitter, 1.0 + self.jitter)
+
+    def connect(self):
+        """Mở nguồn video, thử lại với backoff cho tới khi thành công hoặc bị stop().
+
+        Trả về đối tượng capture đã mở, hoặc None nếu supervisor đã dừng.
+        """
+        while not self._stop_event.is_set():
+            cap = None
+            try:
+                cap = self.open_capture(self.source)
+                opened = cap is not None and cap.isOpened()
+            except Exception as e:
+                opened = False
+                self._report_error(f"Lỗi mở nguồn video {self.source}: {e}")
+            if opened:
+                self.connects += 1
+                self._attempt = 0
+                self._read_failures = 0
+                self._last_frame_time = time.monotonic()
+                return cap
+            if cap is not None:
+                cap.release()
+            self.open_failures += 1
+            self._report_error(f"Không thể mở nguồn video: {self.source}")
+            self._set_state(RECONNECTING if self.connects else CONNECTING)
+            delay = self._backoff_delay()
+            self._attempt += 1
+            self._stop_event.wait(delay)
+        self._set_state(STOPPED)
+        return None
+
+    def frame_ok(self):
+        """Gọi sau mỗi frame đọc thành công."""
+        self._last_frame_time = time.monotonic()
+        self._read_failures = 0
+        if self.state != STREAMING:
+            if self._outage_start is not None:
+                outage = self._last_frame_time - self._outage_start
+                self.outage_total += outage
+                self.longest_outage = max(self.longest_outage, outage)
+                self._outage_start = None
+            self._set_state(STREAMING)
+
+    def read_failed(self, reason):
+        """Gọi khi đọc frame lỗi. Trả về True nếu cần đóng và mở lại stream."""
+        self._read_failures += 1
+        self._report_error(reason)
+        stalled = (self._read_failures >= self.max_read_failures or
+                   time.monotonic() - self._last_frame_time >= self.stall_timeout)
+        if not stalled:
+            # Lỗi lẻ tẻ: nghỉ ngắn thay vì vòng lặp đọc lỗi liên tục
+            self._stop_event.wait(0.02)
+            return False
+        if self.state == STREAMING:
+            self.stalls += 1
+            self._outage_start = self._last_frame_time
+        self._set_state(STALLED)
+        return True
+
+    def reconnecting(self):
+        """Đánh dấu bắt đầu mở lại stream (sau khi đã release capture cũ)."""
+        self.reconnects += 1
+        self._set_state(RECONNECTING)
+        delay = self._backoff_delay()
+        self._attempt += 1
+        self._stop_event.wait(delay)
+
+    def stop(self):
+        self._stop_event.set()
+
+    @property
+    def stopped(self):
+        return self._stop_event.is_set()
+
+    def stats(self):
+        outage_now = time.monotonic() - self._outage_start if self._outage_start is not None else 0.0
+        return {
+            "name": self.name,
+            "state": self.state,
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "open_failures": self.open_failures,
+            "stalls": self.stalls,
+            "outage_total_s": round(self.outage_total + outage_now, 1),
+            "longest_outage_s": round(max(self.longest_outage, outage_now), 1),
+            "current_outage_s": round(outage_now, 1),
+        }
@@ -0,0 +1,210 @@
+import bisect
+import queue
+import struct
+import threading
+import time
+from array import array
+
+# Bố cục file .tlm (little-endian):
+#   header  : "HTLM" | version u16 | block_records u16 | wall0 f64 | mono0 f64
+#   block*  : "TBLK" | count u32 | t_first f64 | t_last f64 | các cột (mỗi cột `count` phần tử):
+#             t f64, elevation f32, azimuth f32, distance f32, zoom f32, camera u8, flags u8
+#   footer  : index (t_first f64, t_last f64, offset u64) * n | "TIDX" | n u32 | index_offset u64
+# Mỗi bản ghi cố định 26 byte; lưu theo cột trong từng block để quét một trường cho nhanh.
+# File thiếu footer (mất điện) vẫn đọc được: reader dựng lại index bằng cách quét header block.
+MAGIC = b"HTLM"
+VERSION = 1
+HEADER = struct.Struct("<4sHHdd")
+BLOCK_HEADER = struct.Struct("<4sIdd")
+INDEX_ENTRY = struct.Struct("<ddQ")
+TRAILER = struct.Struct("<4sIQ")
+COLUMNS = (("t", "d"), ("elevation", "f"), ("azimuth", "f"), ("distance", "f"),
+           ("zoom", "f"), ("camera", "B"), ("flags", "B"))
+RECORD_SIZE = sum(array(code).itemsize for _, code in COLUMNS)
+
+CAMERA_NIGHT = 0
+CAMERA_DAY = 1
+
+
+class TelemetryTrackWriter(threading.Thread):
+    """Ghi telemetry (góc, khoảng cách, zoom, camera) song song với video, append-only.
+
+    append() chỉ đưa bản ghi vào queue (gọi được từ GUI thread, O(1)); thread này gom
+    thành block theo cột và ghi ra đĩa khi đủ block_records bản ghi hoặc sau
+    flush_interval giây. close() ghi nốt block dở và index thưa ở cuối file.
+    """
+
+    def __init__(self, path, block_records=256, flush_interval=1.0):
+        super().__init__(name="telemetry-track", daemon=True)
+        self.path = path
+        self.block_records = block_records
+        self.flush_interval = flush_interval
+        self.wall0 = time.time()
+        self.mono0 = time.monotonic()
+        self._queue = queue.Queue()
+        self._columns = {name: array(code) for name, code in COLUMNS}
+        self._index = []
+        self._file = None
+
+        # Thống kê
+        self.records = 0
+        self.blocks = 0
+        self.bytes_written = 0
+
+    def append(self, elevation, azimuth, distance, zoom=0.0, camera_day=True, flags=0, t=None):
+        """Thêm một bản ghi với timestamp monotonic (mặc định: bây giờ)."""
+        self._queue.put((time.monotonic() if t is None else t, float(elevation), float(azimuth),
+                         float(distance), float(zoom), CAMERA_DAY if camera_day else CAMERA_NIGHT, int(flags)))
+
+    def close(self):
+        """Yêu cầu đóng file (không chặn); dùng join() nếu cần chờ."""
+        self._queue.put(None)
+
+    def run(self):
+        try:
+            self._file = open(self.path, "wb")
+        except OSError as e:
+            print(f"[TLM] Không mở được {self.path}: {e}")
+            return
+        self._write(HEADER.pack(MAGIC, VERSION, self.block_records, self.wall0, self.mono0))
+        last_flush = time.monotonic()
+        try:
+            while True:
+                timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = ()
+                if item is None:
+                    break
+                if item:
+                    for (name, _), value in zip(COLUMNS, item):
+                        self._columns[name].append(value)
+                    self.records += 1
+                if len(self._columns["t"]) >= self.block_records or \
+                        time.monotonic() - last_flush >= self.flush_interval:
+                    self._flush_block()
+                    last_flush = time.monotonic()
+            self._flush_block()
+            self._write_footer()
+        finally:
+            self._file.close()
+            print(f"[TLM] Đã đóng {self.path}: {self.stats()}")
+
+    def _write(self, data):
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def _flush_block(self):
+        t = self._columns["t"]
+        count = len(t)
+        if not count:
+            return
+        offset = self._file.tell()
+        self._write(BLOCK_HEADER.pack(b"TBLK", count, t[0], t[-1]))
+        for name, _ in COLUMNS:
+            self._write(self._columns[name].tobytes())
+        self._file.flush()
+        self._index.append((t[0], t[-1], offset))
+        self._columns = {name: array(code) for name, code in COLUMNS}
+        self.blocks += 1
+
+    def _write_footer(self):
+        index_offset = self._file.tell()
+        for entry in self._index:
+            self._write(INDEX_ENTRY.pack(*entry))
+        self._write(TRAILER.pack(b"TIDX", len(self._index), index_offset))
+
+    def stats(self):
+        return {
+            "records": self.records,
+            "blocks": self.blocks,
+            "bytes": self.bytes_written,
+            "pending": self._queue.qsize(),
+        }
+
+
+class TelemetryTrackReader:
+    """Đọc file .tlm: tra telemetry tại một thời điểm bằng tìm kiếm nhị phân.
+
+    Index thưa (t_first của từng block) cho biết block cần đọc, rồi bisect trong cột t
+    của block đó. Block vừa đọc được giữ lại nên tra liên tiếp (phát video) rất rẻ.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._data = f.read()
+        magic, version, self.block_records, self.wall0, self.mono0 = HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Không phải file telemetry: {path}")
+        self.version = version
+        self.index = self._read_footer() or self._scan_blocks()
+        self._starts = [entry[0] for entry in self.index]
+        self._cache = (None, None)
+
+    def _read_footer(self):
+        if len(self._data) < HEADER.size + TRAILER.size:
+            return None
+        magic, count, index_offset = TRAILER.unpack_from(self._data, len(self._data) - TRAILER.size)
+        if magic != b"TIDX":
+            return None
+        return [INDEX_ENTRY.unpack_from(self._data, index_offset + i * INDEX_ENTRY.size) for i in range(count)]
+
+    def _scan_blocks(self):
+        """Dựng lại index khi file không có footer (ghi bị ngắt giữa chừng)."""
+        index = []
+        offset = HEADER.size
+        while offset + BLOCK_HEADER.size <= len(self._data):
+            magic, count, t_first, t_last = BLOCK_HEADER.unpack_from(self._data, offset)
+            end = offset + BLOCK_HEADER.size + count * RECORD_SIZE
+            if magic != b"TBLK" or end > len(self._data):
+                break
+            index.append((t_first, t_last, offset))
+            offset = end
+        return index
+
+    def _block(self, i):
+        if self._cache[0] == i:
+            return self._cache[1]
+        offset = self.index[i][2]
+        _, count, _, _ = BLOCK_HEADER.unpack_from(self._data, offset)
+        pos = offset + BLOCK_HEADER.size
+        columns = {}
+        for name, code in COLUMNS:
+            column = array(code)
+            size = count * column.itemsize
+            column.frombytes(self._data[pos:pos + size])
+            columns[name] = column
+            pos += size
+        self._cache = (i, columns)
+        return columns
+
+    def __len__(self):
+        return len(self.index)
+
+    def at(self, t):
+        """Bản ghi gần nhất có timestamp <= t (monotonic). None nếu t trước bản ghi đầu."""
+        i = bisect.bisect_right(self._starts, t) - 1
+        if i < 0:
+            return None
+        columns = self._block(i)
+        j = bisect.bisect_right(columns["t"], t) - 1
+        return {name: columns[name][j] for name, _ in COLUMNS}
+
+    def at_wall(self, wall_time):
+        """Tra theo giờ hệ thống (vd. start của đoạn video trong index.jsonl + vị trí phát)."""
+        return self.at(self.mono0 + (wall_time - self.wall0))
+
+    def column(self, name, t0=None, t1=None):
+        """Quét một trường trong khoảng [t0, t1]: trả về (list t, list giá trị)."""
+        ts, values = [], []
+        for i, (t_first, t_last, _) in enumerate(self.index):
+            if (t0 is not None and t_last < t0) or (t1 is not None and t_first > t1):
+                continue
+            columns = self._block(i)
+            lo = bisect.bisect_left(columns["t"], t0) if t0 is not None else 0
+            hi = bisect.bisect_right(columns["t"], t1) if t1 is not None else len(columns["t"])
+            ts.extend(columns["t"][lo:hi])
+            values.extend(columns[name][lo:hi])
+        return ts, values
@@ -0,0 +1,134 @@
+import threading
+import time
+from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtGui import QGuiApplication
+
+
+class TelemetryState:
+    """Giá trị mới nhất của các trường telemetry (khoảng cách, góc tầm, góc hướng...).
+
+    Producer (slot CAN/cảm biến, hoặc thread bất kỳ) chỉ ghi đè giá trị mới nhất
+    và đánh dấu trường đã đổi; giá trị trung gian giữa hai lần vẽ bị gộp lại.
+    """
+
+    def __init__(self, **initial):
+        self._lock = threading.Lock()
+        self._values = dict(initial)
+        self._changed = set(initial)
+        self.writes = 0       # Số lần producer ghi
+        self.coalesced = 0    # Số lần ghi đè lên giá trị chưa kịp áp dụng
+
+    def update(self, **fields):
+        """Ghi giá trị mới; chỉ trường có giá trị khác mới bị đánh dấu thay đổi."""
+        with self._lock:
+            for key, value in fields.items():
+                self.writes += 1
+                if key in self._values and self._values[key] == value:
+                    continue
+                if key in self._changed:
+                    self.coalesced += 1
+                self._values[key] = value
+                self._changed.add(key)
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._values.get(key, default)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def take_changed(self):
+        """Lấy các trường đã đổi kể từ lần gọi trước: {key: value}."""
+        with self._lock:
+            if not self._changed:
+                return {}
+            changed = {key: self._values[key] for key in self._changed}
+            self._changed.clear()
+            return changed
+
+
+class UiUpdateScheduler(QObject):
+    """Áp dụng thay đổi của TelemetryState lên giao diện theo nhịp làm tươi màn hình.
+
+    Một QTimer duy nhất chạy ở tần số refresh_hz (0 = lấy theo màn hình chính);
+    mỗi nhịp chỉ gọi callback của các trường đã đổi, rồi gọi các callback
+    `on_flush` một lần với toàn bộ trường đã đổi. Chi phí trên GUI thread vì vậy
+    bị chặn bởi tần số màn hình chứ không phụ thuộc lưu lượng CAN.
+    """
+
+    def __init__(self, state, refresh_hz=0, parent=None):
+        super().__init__(parent)
+        self.state = state
+        self.refresh_hz = refresh_hz or self._screen_refresh_hz()
+        self._bindings = {}     # key -> [callback(value)]
+        self._flush_callbacks = []
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._tick)
+
+        # Thống kê
+        self.ticks = 0
+        self.applied = 0
+        self.busy_ticks = 0
+        self.apply_ms_max = 0.0
+        self._apply_ms_total = 0.0
+
+    @staticmethod
+    def _screen_refresh_hz():
+        screen = QGuiApplication.primaryScreen()
+        hz = screen.refreshRate() if screen is not None else 0
+        return hz if hz and hz > 1 else 60.0
+
+    def bind(self, key, callback):
+        """Đăng ký callback(value) chạy trên GUI thread khi trường `key` đổi."""
+        self._bindings.setdefault(key, []).append(callback)
+
+    def on_flush(self, callback):
+        """Đăng ký callback(changed_dict) chạy một lần mỗi nhịp có thay đổi."""
+        self._flush_callbacks.append(callback)
+
+    def start(self):
+        self._timer.start(max(1, int(round(1000.0 / self.refresh_hz))))
+        print(f"[UI] Scheduler cập nhật giao diện @ {self.refresh_hz:.0f}Hz")
+
+    def stop(self):
+        self._timer.stop()
+
+    def flush(self):
+        """Áp dụng ngay các thay đổi đang chờ (vd. khi khởi tạo giao diện)."""
+        self._tick()
+
+    def _tick(self):
+        self.ticks += 1
+        changed = self.state.take_changed()
+        if not changed:
+            return
+        t0 = time.monotonic()
+        for key, value in changed.items():
+            for callback in self._bindings.get(key, ()):
+                try:
+                    callback(value)
+                except Exception as e:
+                    print(f"[UI] Lỗi cập nhật {key}: {e}")
+                self.applied += 1
+        for callback in self._flush_callbacks:
+            try:
+                callback(changed)
+            except Exception as e:
+                print(f"[UI] Lỗi flush: {e}")
+        elapsed = (time.monotonic() - t0) * 1000.0
+        self.busy_ticks += 1
+        self._apply_ms_total += elapsed
+        self.apply_ms_max = max(self.apply_ms_max, elapsed)
+
+    def stats(self):
+        return {
+            "refresh_hz": round(self.refresh_hz, 1),
+            "ticks": self.ticks,
+            "busy_ticks": self.busy_ticks,
+            "applied": self.applied,
+            "writes": self.state.writes,
+            "coalesced": self.state.coalesced,
+            "apply_ms_mean": round(self._apply_ms_total / self.busy_ticks, 3) if self.busy_ticks else 0.0,
+            "apply_ms_max": round(self.apply_ms_max, 3),
+        }
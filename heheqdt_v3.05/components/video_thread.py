@@ -1,63 +1,191 @@
-import cv2
-import queue
+import time
 from PyQt5.QtCore import QThread, pyqtSignal
 from PyQt5.QtGui import QImage, QPixmap
+from .frame_bus import FrameBus
+from .latency_stats import LatencyTracker
+from .stream_supervisor import StreamSupervisor
+
+LIVE_PREFIXES = ("rtsp://", "rtmp://", "http://", "https://", "udp://", "tcp://")
+
 
 class VideoThread(QThread):
-    """Luồng phát video từ một nguồn (RTSP, webcam, v.v.)."""
-    frame_updated = pyqtSignal(QPixmap)   # Khung hình đã chuyển QPixmap để hiển thị
-    raw_frame = pyqtSignal(object)        # Khung hình gốc (numpy BGR) cho ghi hình
-    error_occurred = pyqtSignal(str)
+    """Luồng phát video từ một nguồn (RTSP, webcam, v.v.).
+
+    Việc mở/mở lại nguồn do StreamSupervisor đảm nhiệm (backoff + jitter, phát hiện stall).
 
-    def __init__(self, video_source):
+    Nhịp đọc do timestamp của stream quyết định chứ không dùng sleep cố định:
+    - Nguồn live: grab() tự chặn theo tốc độ camera; các gói đã xếp hàng sẵn
+      (grab trả về gần như tức thì) được xả bỏ, chỉ retrieve() frame mới nhất.
+    - Nguồn file: ngủ tới đúng thời điểm theo PTS để phát đúng tốc độ.
+    Tốc độ hiển thị được giới hạn riêng (display_fps) và chỉ có tối đa một frame
+    hiển thị đang chờ GUI, nên khi GUI bị nghẽn hình vẫn bám thời gian thực.
+    """
+    frame_updated = pyqtSignal(QPixmap, object)   # QPixmap để hiển thị + metadata (pts, thời điểm grab)
+    frame_ready = pyqtSignal(object, object)      # Frame numpy BGR cho bề mặt OpenGL + metadata
+    error_occurred = pyqtSignal(str)              # Đã giới hạn tần suất bởi StreamSupervisor
+    state_changed = pyqtSignal(str)               # connecting / streaming / stalled / reconnecting
+
+    MAX_DRAIN = 5             # Số gói tối đa xả bỏ trong một vòng
+    DRAIN_THRESHOLD = 0.004   # grab() nhanh hơn 4ms nghĩa là gói đã nằm sẵn trong buffer
+
+    def __init__(self, video_source, name="camera", display_fps=30.0, stream_options=None, display=True,
+                 capture_options=None):
         super().__init__()
         self.video_source = video_source
+        self.name = name
+        self.display = display   # False: chỉ phát frame lên bus (vd. main stream cho ghi hình)
+        self.output = "pixmap"   # "pixmap": QPixmap cho vẽ raster; "array": numpy BGR cho OpenGL
         self.running = False
-        self.frame_queue = queue.Queue(maxsize=2)  # Giới hạn buffer tránh tràn bộ nhớ
+        # Khung hình gốc (numpy BGR) được phân phối qua bus cho recorder/snapshot/analytics
+        self.frame_bus = FrameBus(name)
+        self.live = isinstance(video_source, int) or str(video_source).startswith(LIVE_PREFIXES)
+
+        # Giới hạn fps hiển thị, độc lập với fps capture
+        self.display_interval = 1.0 / display_fps if display_fps else 0.0
+        self._last_display_time = 0.0
+        self._display_pending = False   # Đã gửi frame cho GUI nhưng GUI chưa nhận
+
+        # Thống kê
+        self.capture_fps = 0.0
+        self.frames_captured = 0
+        self.frames_drained = 0
+        self.frames_displayed = 0
+        self.display_skipped = 0
+        # Histogram độ trễ theo chặng (convert/deliver/paint/glass/record)
+        self.latency = LatencyTracker(name)
+
+        # Mở lại stream với backoff, phát hiện stall, giới hạn tần suất báo lỗi
+        self.supervisor = StreamSupervisor(
+            video_source, name,
+            capture_options=capture_options,
+            on_state=self.state_changed.emit,
+            on_error=self.error_occurred.emit,
+            **(stream_options or {})
+        )
 
     def run(self):
-        """Luồng chính đọc video và phát frame."""
-        cap = cv2.VideoCapture(self.video_source)
-        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # giảm độ trễ
+        """Luồng chính: mở stream qua supervisor, đọc frame, tự mở lại khi mất hình."""
+        self.running = True
+        while self.running:
+            cap = self.supervisor.connect()
+            if cap is None:
+                break
+            try:
+                self._read_loop(cap)
+            finally:
+                cap.release()
+            if self.running:
+                self.supervisor.reconnecting()
+
+    def _read_loop(self, cap):
+        """Đọc frame cho tới khi dừng hoặc supervisor yêu cầu mở lại stream."""
+        import cv2   # Nạp trên luồng video: cửa sổ không phải chờ OpenCV để hiện lên
+        last_pts = None
+        pace_origin = None   # (pts_ms, monotonic) của frame đầu, dùng cho nguồn file
+
+        while self.running:
+            t0 = time.monotonic()
+            if not cap.grab():
+                if self.supervisor.read_failed(f"Lỗi đọc khung hình từ {self.video_source}"):
+                    return
+                continue
 
-        if not cap.isOpened():
-            self.error_occurred.emit(f"Không thể mở nguồn video: {self.video_source}")
-            self.frame_updated.emit(QPixmap())
+            if self.live and time.monotonic() - t0 <= self.DRAIN_THRESHOLD:
+                # grab() trả về ngay → frame vừa lấy đã nằm sẵn trong buffer (cũ).
+                # Xả tiếp chừng nào grab() còn nhanh; grab() phải chờ camera nghĩa là đã tới
+                # frame mới nhất, dừng ở đó và retrieve() chính frame ấy (không lấy thừa frame nào).
+                for _ in range(self.MAX_DRAIN):
+                    t0 = time.monotonic()
+                    if not cap.grab():
+                        break   # Giữ frame đã grab thành công trước đó
+                    self.frames_drained += 1   # Frame grab trước đó bị bỏ qua
+                    if time.monotonic() - t0 > self.DRAIN_THRESHOLD:
+                        break
+
+            t_grab = time.monotonic()
+            pts_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+            ret, frame = cap.retrieve()
+            if not ret or frame is None:
+                if self.supervisor.read_failed(f"Lỗi giải mã khung hình từ {self.video_source}"):
+                    return
+                continue
+            self.supervisor.frame_ok()
+
+            if last_pts is not None and pts_ms > last_pts:
+                fps = 1000.0 / (pts_ms - last_pts)
+                self.capture_fps = fps if not self.capture_fps else 0.9 * self.capture_fps + 0.1 * fps
+            last_pts = pts_ms
+            self.frames_captured += 1
+
+            if not self.live:
+                # Nguồn file: phát theo PTS thay vì nhanh nhất có thể
+                if pace_origin is None or pts_ms < pace_origin[0]:
+                    pace_origin = (pts_ms, t_grab)
+                delay = (pts_ms - pace_origin[0]) / 1000.0 - (t_grab - pace_origin[1])
+                if delay > 0:
+                    self.msleep(int(delay * 1000))
+
+            meta = {"pts_ms": pts_ms, "t_grab": t_grab}
+
+            # ---- phát frame gốc lên bus ----
+            # Không copy — mỗi subscriber tự chọn drop_oldest/block và có bộ đếm drop riêng.
+            self.frame_bus.publish(frame, meta)
+
+            # ---- chuyển sang QPixmap để hiển thị (giới hạn fps, không dồn frame) ----
+            if not self.display:
+                continue
+            if self._display_pending or t_grab - self._last_display_time < self.display_interval:
+                self.display_skipped += 1
+                continue
+            self._last_display_time = t_grab
+            self._display_pending = True
+            if self.output == "array":
+                # OpenGL tự đổi màu và scale trên GPU: gửi thẳng frame, không chuyển đổi
+                LatencyTracker.mark(meta, "t_converted")
+                LatencyTracker.mark(meta, "t_emit")
+                self.frame_ready.emit(frame, meta)
+                continue
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            h, w, ch = rgb.shape
+            image = QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888)
+            pixmap = QPixmap.fromImage(image)
+            LatencyTracker.mark(meta, "t_converted")
+            LatencyTracker.mark(meta, "t_emit")
+            self.frame_updated.emit(pixmap, meta)
+
+    def frame_delivered(self, meta=None):
+        """GUI đã nhận frame hiển thị, cho phép gửi frame tiếp theo."""
+        self._display_pending = False
+        LatencyTracker.mark(meta, "t_delivered")
+
+    def frame_presented(self, meta):
+        """GUI đã vẽ frame lên màn hình: ghi nhận độ trễ các chặng hiển thị."""
+        if not meta:
             return
+        LatencyTracker.mark(meta, "t_painted")
+        self.frames_displayed += 1
+        self.latency.observe(meta, "convert", "deliver", "paint", "glass")
 
-        self.running = True
+    def stats(self):
+        """Thống kê nhịp capture/hiển thị."""
+        return {
+            "name": self.name,
+            "capture_fps": round(self.capture_fps, 1),
+            "frames_captured": self.frames_captured,
+            "frames_drained": self.frames_drained,
+            "frames_displayed": self.frames_displayed,
+            "display_skipped": self.display_skipped,
+            "display_latency_ms": self.latency.histograms["glass"].snapshot()["p50"],
+            "stream": self.supervisor.stats(),
+        }
 
-        try:
-            while self.running:
-                ret, frame = cap.read()
-                if not ret or frame is None:
-                    self.error_occurred.emit(f"Lỗi đọc khung hình từ {self.video_source}")
-                    self.frame_updated.emit(QPixmap())
-                    continue
-
-                # ---- emit raw frame ----
-                # Không cần copy — chỉ đưa reference vào queue để thread khác lấy ra.
-                # Nếu queue đầy (recorder đang bận), bỏ qua frame cũ (giảm lag).
-                try:
-                    if not self.frame_queue.full():
-                        self.frame_queue.put_nowait(frame)
-                        self.raw_frame.emit(frame)
-                except queue.Full:
-                    pass
-
-                # ---- chuyển sang QPixmap để hiển thị ----
-                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h, w, ch = rgb.shape
-                image = QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888)
-                pixmap = QPixmap.fromImage(image)
-
-                self.frame_updated.emit(pixmap)
-                self.msleep(25)  # ~40 FPS (tùy camera)
-        finally:
-            cap.release()
+    def request_stop(self):
+        """Yêu cầu dừng, không chờ luồng kết thúc."""
+        self.running = False
+        self.supervisor.stop()
 
     def stop(self):
         """Dừng luồng video."""
-        self.running = False
+        self.request_stop()
         self.quit()
         self.wait()
@@ -1,17 +1,17 @@
 # Thêm thư viện sys để quản lý đường dẫn hệ thống
 import sys
-# Thêm thư viện yaml để đọc tệp cấu hình YAML
-import yaml
-# Thêm các thành phần giao diện từ PyQt5 (ứng dụng và hộp thoại thông báo)
-from PyQt5.QtWidgets import QApplication, QMessageBox
-# Thêm thuộc tính Qt từ PyQt5 để quản lý thuộc tính giao diện
-from PyQt5.QtCore import Qt
-# Import lớp MainWindow từ module main_window trong thư mục components
-from components.main_window import MainWindow
+# Thêm thư viện time để lấy mốc thời gian khởi động
+import time
+
+# Ở cấp module chỉ import thư viện chuẩn: tiến trình encoder (multiprocessing "spawn") chạy lại
+# file này dưới tên __mp_main__, nên Qt, yaml và toàn bộ giao diện chỉ được import trong khối
+# if __name__ == "__main__" bên dưới.
 
 # Hàm load_config để tải cấu hình từ tệp YAML
 def load_config(config_name):
     """Tải cấu hình từ tệp YAML."""
+    # Thêm thư viện yaml để đọc tệp cấu hình YAML
+    import yaml
     try:
         # Mở tệp config.yaml với mã hóa utf-8 để hỗ trợ tiếng Việt
         with open("config.yaml", "r", encoding="utf-8") as file:
@@ -26,10 +26,26 @@ def load_config(config_name):
 
 # Kiểm tra xem tệp có được chạy trực tiếp không
 if __name__ == "__main__":   
+    # Mốc 0 của startup profiler: lấy trước mọi import nặng
+    T_START = time.monotonic()
+    # Startup profiler (chỉ dùng thư viện chuẩn); bật bằng --profile-startup hoặc HEHEQDT_STARTUP_PROFILE=1.
+    # Phải bật trước các import bên dưới để đo được thời gian import từng module
+    from components.startup_profiler import profiler
+    profiler.configure(sys.argv, T_START)
+    # Thêm các thành phần giao diện từ PyQt5 (ứng dụng và hộp thoại thông báo)
+    from PyQt5.QtWidgets import QApplication, QMessageBox
+    # Thêm thuộc tính Qt từ PyQt5 để quản lý thuộc tính giao diện
+    from PyQt5.QtCore import Qt
+    # Import lớp MainWindow từ module main_window trong thư mục components
+    # (ONVIF/zeep, python-can, pyserial, OpenCV và phần ghi hình được nạp khi cần, không nạp ở đây)
+    from components.main_window import MainWindow
+    profiler.mark("imports_done")
+
     # Tắt tự động điều chỉnh tỷ lệ DPI để giao diện không bị phóng to
     QApplication.setAttribute(Qt.AA_DisableHighDpiScaling, True)
     # Tạo ứng dụng PyQt5 với các tham số dòng lệnh
     app = QApplication(sys.argv)
+    profiler.mark("app_created")
 
     # Chọn cấu hình cho màn hình 10 inch
     config_name = "10inch"
@@ -41,9 +57,13 @@ if __name__ == "__main__":
         sys.exit(1)
 
     # Tạo cửa sổ chính với cấu hình đã tải
-    main_win = MainWindow(config)
+    with profiler.span("main_window"):
+        main_win = MainWindow(config)
     # Hiển thị cửa sổ chính ở chế độ toàn màn hình
     main_win.show()
+    profiler.mark("window_shown")
+    # Báo cáo khởi động in ra khi mọi thiết bị có kết quả và đã có frame video đầu tiên
+    profiler.wait_for("devices", "first_frame", timeout=30.0)
     # Chạy vòng lặp sự kiện của ứng dụng và thoát khi đóng
     sys.exit(app.exec_())
     
\ No newline at end of file